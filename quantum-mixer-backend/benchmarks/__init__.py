@@ -0,0 +1 @@
+from .suite import run_benchmarks, compare_results
@@ -0,0 +1,40 @@
+import argparse
+import json
+import sys
+from .suite import run_benchmarks, compare_results, QUBITS, DEPTHS, SHOTS
+
+def parse_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for parser, executor backends and endpoints')
+    parser.add_argument('--repeat', type=int, default=5, help='Calls per benchmark (median is reported)')
+    parser.add_argument('--qubits', type=parse_list, default=QUBITS, help='Comma separated qubit counts')
+    parser.add_argument('--depths', type=parse_list, default=DEPTHS, help='Comma separated numbers of operations')
+    parser.add_argument('--shots', type=parse_list, default=SHOTS, help='Comma separated shot counts')
+    parser.add_argument('--no-endpoints', action='store_true', help='Skip FastAPI endpoint benchmarks')
+    parser.add_argument('--save', help='Write results as JSON to this path (e.g. a new baseline)')
+    parser.add_argument('--compare', help='Compare against baseline JSON at this path')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Relative slowdown counted as regression')
+    args = parser.parse_args()
+
+    results = run_benchmarks(repeat=args.repeat, qubits=args.qubits, depths=args.depths, shots=args.shots, endpoints=not args.no_endpoints)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        comparison = compare_results(baseline, results, threshold=args.threshold)
+        regressions = [c for c in comparison if c['regression']]
+        print()
+        for c in comparison:
+            print('{:<60} {:>10.3f} ms -> {:>10.3f} ms  x{:.2f}{}'.format(c['name'], c['baseline'] * 1000, c['current'] * 1000, c['ratio'], '  REGRESSION' if c['regression'] else ''))
+        print('\n{} of {} benchmarks regressed by more than {:.0%}'.format(len(regressions), len(comparison), args.threshold))
+        if len(regressions) > 0:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import platform
+import random
+import statistics
+import time
+import warnings
+from typing import Callable, Union
+from quantum_mixer_backend.quantum.circuit_data import CircuitData, OperationData
+from quantum_mixer_backend.quantum.circuit_executor import CircuitExecutor
+from quantum_mixer_backend.quantum.circuit_parser import parse_circuit_data
+
+# (type, number of controls, number of targets, number of parameters) of composer operations
+GATES = [
+    ('h', 0, 1, 0), ('x', 0, 1, 0), ('z', 0, 1, 0), ('ry', 0, 1, 1), ('swap', 0, 2, 0),
+    ('h', 1, 1, 0), ('x', 1, 1, 0), ('z', 1, 1, 0), ('ry', 1, 1, 1), ('x', 2, 1, 0)
+]
+
+QUBITS = [1, 3, 5]
+DEPTHS = [5, 20, 50]
+SHOTS  = [1, 100, 1000]
+
+def random_circuit_data(rng: random.Random, num_qubits: int, num_operations: int) -> CircuitData:
+    """
+    Random circuit of composer operations.
+    """
+    operations = []
+    for i in range(num_operations):
+        gate_type, num_controls, num_targets, num_params = rng.choice([g for g in GATES if g[1] + g[2] <= num_qubits])
+        qubits = rng.sample(range(num_qubits), num_controls + num_targets)
+        operations.append(OperationData(
+            id=str(i),
+            type=gate_type,
+            targetQubits=qubits[num_controls:],
+            controlQubits=qubits[:num_controls],
+            parameterValues=['{}*pi/4'.format(rng.randint(-8, 8)) for _ in range(num_params)]
+        ))
+    return CircuitData(numQubits=num_qubits, operations=operations)
+
+
+def measure_time(fn: Callable, repeat: int, setup: Union[Callable, None] = None) -> dict:
+    """
+    Call fn repeat times (with a fresh argument from setup, if given) and return timing statistics in seconds.
+    A first untimed call warms up caches and lazy initialization.
+    """
+    fn(*((setup(),) if setup is not None else ()))
+    timings = []
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'repeat': repeat
+    }
+
+
+def run_benchmarks(repeat: int = 5, qubits: list[int] = QUBITS, depths: list[int] = DEPTHS, shots: list[int] = SHOTS, endpoints: bool = True, log: Callable = print) -> dict:
+    """
+    Time parser, executor backends, drawing/qasm and (optionally) endpoints for a matrix of circuit sizes.
+    """
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    results = {}
+
+    def record(name: str, timing: dict):
+        results[name] = timing
+        log('{:<60} {:>10.3f} ms'.format(name, timing['median'] * 1000))
+
+    client = None
+    if endpoints:
+        from fastapi.testclient import TestClient
+        from quantum_mixer_backend import app
+        client = TestClient(app)
+
+    for num_qubits in qubits:
+        for depth in depths:
+            rng = random.Random(num_qubits * 1000 + depth)
+            circuit_data = random_circuit_data(rng, num_qubits, depth)
+            executor = CircuitExecutor.from_circuit_data(circuit_data)
+            name = 'q{}.d{}'.format(num_qubits, depth)
+
+            record('parse.{}'.format(name), measure_time(lambda: parse_circuit_data(circuit_data), repeat))
+            record('analytical.{}'.format(name), measure_time(executor.probabilities_analytical, repeat))
+            record('qasm.{}'.format(name), measure_time(executor.probabilities_qasm, repeat))
+            record('mock.{}'.format(name), measure_time(executor.probabilities_mock, repeat))
+            record('draw.{}'.format(name), measure_time(lambda: executor.display_circuit.draw('text').__str__(), repeat))
+            record('qasm_code.{}'.format(name), measure_time(executor.display_circuit.qasm, repeat))
+            for num_shots in shots:
+                record('measurements_qasm.{}.s{}'.format(name, num_shots), measure_time(lambda: executor.measurements_qasm(num_shots), repeat))
+                record('measurements_mock.{}.s{}'.format(name, num_shots), measure_time(lambda: executor.measurements_mock(num_shots), repeat))
+
+            if client is not None:
+                body = circuit_data.dict()
+                # distinct circuits per call (by parameter), so that no result is served from cache
+                record('endpoint.probabilities.cold.{}'.format(name), measure_time(
+                    lambda data: client.post('/api/quantum/probabilities', json=data).raise_for_status(),
+                    repeat,
+                    setup=lambda: {**body, 'operations': body['operations'] + [{'id': 'bench', 'type': 'ry', 'targetQubits': [0], 'controlQubits': [], 'parameterValues': [str(rng.random())]}]}
+                ))
+                record('endpoint.probabilities.cached.{}'.format(name), measure_time(lambda: client.post('/api/quantum/probabilities', json=body).raise_for_status(), repeat))
+                for num_shots in shots:
+                    record('endpoint.measurements.{}.s{}'.format(name, num_shots), measure_time(lambda: client.post('/api/quantum/measurements?shots={}'.format(num_shots), json=body).raise_for_status(), repeat))
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.25) -> list[dict]:
+    """
+    Compare median timings of two runs. Returns one entry per benchmark present in both runs,
+    with regression set if the current median is more than threshold (relative) slower than the baseline.
+    """
+    comparison = []
+    for name, timing in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        base_median = baseline['results'][name]['median']
+        ratio = timing['median'] / base_median if base_median > 0 else float('inf')
+        comparison.append({
+            'name': name,
+            'baseline': base_median,
+            'current': timing['median'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold
+        })
+    return comparison
@@ -0,0 +1 @@
+from .driver import run_load_test, run_load_test_async, find_degradation, percentile
@@ -0,0 +1,35 @@
+import argparse
+import json
+from .driver import run_load_test, CONCURRENCIES
+
+def parse_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test replaying kiosk sessions with increasing concurrency')
+    parser.add_argument('--url', help='Base URL of a running app (default: run the app in this process with the HomeConnect stand-in)')
+    parser.add_argument('--concurrency', type=parse_list, default=CONCURRENCIES, help='Comma separated numbers of concurrent users, one stage each')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per stage')
+    parser.add_argument('--think', type=float, default=0.5, help='Average pause of users between edits in seconds')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the simulated users')
+    parser.add_argument('--factor', type=float, default=2, help='p95 latency relative to the first stage counted as degraded')
+    parser.add_argument('--standin-latency', type=float, default=0.05, help='Latency of the in-process HomeConnect stand-in in seconds')
+    parser.add_argument('--save', help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    results = run_load_test(
+        base_url=args.url,
+        concurrencies=args.concurrency,
+        duration=args.duration,
+        think=args.think,
+        seed=args.seed,
+        factor=args.factor,
+        standin_latency=args.standin_latency
+    )
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
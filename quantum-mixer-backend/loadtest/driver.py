@@ -0,0 +1,277 @@
+import asyncio
+import math
+import platform
+import random
+import time
+import uuid
+from typing import Callable, Union
+import httpx
+from benchmarks.suite import GATES
+
+CONCURRENCIES = [1, 2, 4, 8, 16]
+
+# pseudo endpoint for the time from submitting an order until the coffee machine accepted it
+ORDER_COMPLETED = 'order completed'
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile (q between 0 and 1) of values.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class Recorder:
+
+    def __init__(self):
+        """
+        Latencies (in seconds) and errors per endpoint.
+        """
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def record(self, name: str, seconds: float, ok: bool = True):
+        self.latencies.setdefault(name, []).append(seconds)
+        self.errors[name] = self.errors.get(name, 0) + (0 if ok else 1)
+
+    def summary(self, duration: float) -> dict:
+        """
+        Requests, errors, throughput (requests per second) and p50/p95/p99 latency per endpoint and for all requests.
+        """
+        everything = [seconds for name, latencies in self.latencies.items() if name != ORDER_COMPLETED for seconds in latencies]
+        groups = {**self.latencies, 'all': everything}
+        errors = {**self.errors, 'all': sum(count for name, count in self.errors.items() if name != ORDER_COMPLETED)}
+        return {
+            name: {
+                'requests': len(latencies),
+                'errors': errors.get(name, 0),
+                'throughput': len(latencies) / duration if duration > 0 else 0,
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99)
+            }
+            for name, latencies in groups.items() if len(latencies) > 0
+        }
+
+
+class KioskSession:
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, usecases: list[dict], think: float):
+        """
+        One user at the kiosk: opens a usecase, composes a circuit (probabilities are requested on every edit,
+        in bursts while an operation is dragged), measures within the shot range of the usecase and orders.
+        Users pause for think seconds on average between edits.
+        """
+        self.client   = client
+        self.recorder = recorder
+        self.rng      = rng
+        self.usecases = usecases
+        self.think    = think
+
+    async def request(self, name: str, method: str, url: str, **kwargs) -> Union[httpx.Response, None]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.recorder.record(name, time.perf_counter() - start, response is not None and response.status_code < 400)
+        return response
+
+    async def pause(self):
+        if self.think > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think))
+
+    def random_operation(self, num_qubits: int) -> dict:
+        gate_type, num_controls, num_targets, num_params = self.rng.choice([g for g in GATES if g[1] + g[2] <= num_qubits])
+        qubits = self.rng.sample(range(num_qubits), num_controls + num_targets)
+        return {
+            'id': uuid.uuid4().hex,
+            'type': gate_type,
+            'targetQubits': qubits[num_controls:],
+            'controlQubits': qubits[:num_controls],
+            'parameterValues': ['{}*pi/4'.format(self.rng.randint(-8, 8)) for _ in range(num_params)]
+        }
+
+    async def run(self):
+        await self.request('GET /api/usecase', 'GET', '/api/usecase')
+        usecase = self.rng.choice(self.usecases)
+        prefix = '/api/usecase/{}'.format(usecase['id'])
+        await self.request('GET /api/usecase/*', 'GET', prefix)
+        response = await self.request('GET /api/usecase/*/preferences', 'GET', '{}/preferences'.format(prefix))
+        if response is None or response.status_code >= 400:
+            return
+        shot_range = response.json()['numMeasurements']
+
+        # compose
+        operations = []
+        circuit = {'numQubits': usecase['numQubits'], 'operations': operations}
+        for _ in range(self.rng.randint(3, 12)):
+            for _ in range(self.rng.randint(1, 3)):
+                operation = self.random_operation(usecase['numQubits'])
+                circuit = {'numQubits': usecase['numQubits'], 'operations': operations + [operation]}
+                await self.request('POST /api/quantum/probabilities', 'POST', '/api/quantum/probabilities', json=circuit)
+            operations.append(operation)
+            await self.pause()
+
+        # measure
+        shots = self.rng.randint(shot_range['min'], shot_range['max'] or shot_range['default'])
+        response = await self.request('POST /api/quantum/measurements', 'POST', '/api/quantum/measurements', json=circuit,
+                                      params={'shots': shots, 'device': self.rng.choice(['qasm', 'mock'])})
+        if not usecase['hasOrder'] or response is None or response.status_code >= 400:
+            return
+
+        # order and wait until the order was dispatched
+        start = time.perf_counter()
+        response = await self.request('POST /api/usecase/*/order', 'POST', '{}/order'.format(prefix), json={'items': response.json()['results'][:1]},
+                                      headers={'Idempotency-Key': uuid.uuid4().hex})
+        if response is None or response.status_code >= 400:
+            return
+        order = response.json()
+        while order['status'] not in ('completed', 'failed'):
+            await asyncio.sleep(0.05)
+            response = await self.request('GET /api/usecase/*/order/*', 'GET', '{}/order/{}'.format(prefix, order['id']))
+            if response is None or response.status_code >= 400:
+                return
+            order = response.json()
+        self.recorder.record(ORDER_COMPLETED, time.perf_counter() - start, order['status'] == 'completed')
+
+
+async def login(client: httpx.AsyncClient, homeconnect: httpx.AsyncClient, usecase_id: str = 'qoffee'):
+    """
+    Log in to the HomeConnect stand-in, which grants every login without asking the user.
+    """
+    response = await client.get('/api/usecase/{}/auth/login'.format(usecase_id), params={'redirect': '/'})
+    response = await homeconnect.get(response.headers['location'])
+    callback = httpx.URL(response.headers['location'])
+    response = await client.get(callback.path, params=callback.params)
+    # the callback redirects to the page the login started from
+    if response.status_code >= 400:
+        response.raise_for_status()
+
+
+async def run_stage(client: httpx.AsyncClient, usecases: list[dict], concurrency: int, duration: float, think: float, seed: int) -> dict:
+    """
+    Run concurrency users, each starting new sessions for duration seconds (running sessions are finished).
+    """
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+
+    async def user(i: int):
+        rng = random.Random(seed * 1000 + i)
+        while time.monotonic() < deadline:
+            await KioskSession(client, recorder, rng, usecases, think).run()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[user(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {'concurrency': concurrency, 'duration': elapsed, 'endpoints': recorder.summary(elapsed)}
+
+
+def find_degradation(stages: list[dict], factor: float = 2) -> dict[str, Union[int, None]]:
+    """
+    Lowest concurrency at which the p95 latency of each endpoint exceeded factor times its p95 at the lowest concurrency
+    (None if it never did).
+    """
+    degradation = {}
+    baseline = stages[0]['endpoints']
+    for name, summary in baseline.items():
+        degradation[name] = next((
+            stage['concurrency'] for stage in stages[1:]
+            if name in stage['endpoints'] and stage['endpoints'][name]['p95'] > factor * summary['p95']
+        ), None)
+    return degradation
+
+
+async def run_load_test_async(
+    base_url: Union[str, None] = None,
+    concurrencies: list[int] = CONCURRENCIES,
+    duration: float = 30,
+    think: float = 0.5,
+    seed: int = 0,
+    factor: float = 2,
+    standin_latency: float = 0.05,
+    log: Callable = print
+) -> dict:
+    """
+    Replay kiosk sessions against the app at base_url, with concurrency increasing stage by stage.
+    Without base_url, the app runs in this process with the HomeConnect stand-in instead of the real API
+    (requests are then not sent over the network, and the app shares the event loop with the users).
+    """
+    qoffee, original_client = None, None
+    if base_url is None:
+        from quantum_mixer_backend import app
+        from quantum_mixer_backend.usecases import USECASES
+        from quantum_mixer_backend.usecases.qoffee import QoffeeUsecase
+        from quantum_mixer_backend.usecases.qoffee.homeconnect import HomeConnectClient
+        from quantum_mixer_backend.usecases.qoffee.standin import create_app
+        standin = httpx.ASGITransport(app=create_app(latency=standin_latency))
+        # orders go to the stand-in
+        qoffee = next(usecase for usecase in USECASES if isinstance(usecase, QoffeeUsecase))
+        original_client = qoffee.client
+        qoffee.client = HomeConnectClient(
+            base_url='http://homeconnect',
+            client_id='loadtest',
+            client_secret='loadtest',
+            redirect_uri='http://quantum-mixer/api/usecase/{}/auth/callback'.format(qoffee.data.id),
+            scope=original_client.scope,
+            transport=standin,
+            store=qoffee.store,
+            token_key=qoffee.state_key('token')
+        )
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://quantum-mixer', timeout=60)
+        homeconnect = httpx.AsyncClient(transport=standin, base_url='http://homeconnect')
+    else:
+        limits = httpx.Limits(max_connections=max(concurrencies) * 2, max_keepalive_connections=max(concurrencies) * 2)
+        client = httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits)
+        # the app redirects to the stand-in (or whatever HOMECONNECT_BASE_URL points to)
+        homeconnect = httpx.AsyncClient()
+
+    try:
+        usecases = (await client.get('/api/usecase')).json()
+        if any(usecase['loginRequired'] for usecase in usecases):
+            try:
+                await login(client, homeconnect)
+            except (httpx.HTTPError, KeyError) as e:
+                log('Login to HomeConnect failed ({}), usecases requiring login are skipped'.format(e))
+            usecases = [usecase for usecase in (await client.get('/api/usecase')).json() if not usecase['loginRequired']]
+
+        stages = []
+        for concurrency in concurrencies:
+            stage = await run_stage(client, usecases, concurrency, duration, think, seed)
+            stages.append(stage)
+            log('\nconcurrency {} ({:.1f} s)'.format(concurrency, stage['duration']))
+            for name, summary in stage['endpoints'].items():
+                log('  {:<36} {:>6} req {:>4} err {:>8.1f} req/s   p50 {:>8.1f} ms   p95 {:>8.1f} ms   p99 {:>8.1f} ms'.format(
+                    name, summary['requests'], summary['errors'], summary['throughput'], summary['p50'] * 1000, summary['p95'] * 1000, summary['p99'] * 1000
+                ))
+    finally:
+        await client.aclose()
+        await homeconnect.aclose()
+        if qoffee is not None:
+            await qoffee.client.aclose()
+            qoffee.client = original_client
+
+    degradation = find_degradation(stages, factor) if len(stages) > 0 else {}
+    log('\np95 latency more than {}x the p95 at concurrency {}:'.format(factor, concurrencies[0]))
+    for name, concurrency in degradation.items():
+        log('  {:<36} {}'.format(name, 'at concurrency {}'.format(concurrency) if concurrency is not None else 'not reached'))
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'target': base_url or 'in-process',
+            'think': think,
+            'factor': factor,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'stages': stages,
+        'degradation': degradation
+    }
+
+
+def run_load_test(**kwargs) -> dict:
+    """
+    Synchronous wrapper of run_load_test_async.
+    """
+    return asyncio.run(run_load_test_async(**kwargs))
@@ -4,11 +4,17 @@ dotenv.load_dotenv()
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .frontend import app as frontend_app
+from .metrics import metrics, ServerTimingMiddleware, TimedRoute
 from .quantum import build as build_quantum_app
-from .usecases import set_endpoints as set_usecase_endpoints
+from .quantum.settings import settings as quantum_settings
+from .usecases import set_endpoints as set_usecase_endpoints, USECASES
+from .warmup import Warmup
 
 app = FastAPI()
+# time endpoint functions apart from request validation and response encoding
+app.router.route_class = TimedRoute
 
 # add CORS
 app.add_middleware(
@@ -19,10 +25,28 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# add timings of request stages as Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
+
 # add endpoints
 build_quantum_app(app, '/api/quantum')
 set_usecase_endpoints(app, '/api/usecase')
 
+@app.get('/api/metrics', response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+# warm up backends with the circuit of every usecase after startup
+warmup = Warmup([usecase.get_representative_circuit() for usecase in USECASES], enabled=quantum_settings.warmup)
+app.add_event_handler('startup', warmup.start)
+
+@app.get('/api/ready')
+async def get_ready():
+    """
+    Readiness probe, healthy once the warmup finished successfully.
+    """
+    return JSONResponse(warmup.status(), status_code=200 if warmup.ready else 503)
+
 # mount singlepage application
 app.mount(
     path='/',
@@ -1,15 +1,103 @@
+import gzip
+import hashlib
+import mimetypes
 import os
-from typing import Tuple
+import re
+from typing import Tuple, Union
 
+from fastapi import HTTPException
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+
+# bundle files with a content hash in their name (Angular outputHashing), e.g. main.1f2e3d4c5b6a7980.js
+HASHED_FILE = re.compile(r'\.[0-9a-f]{16,}\.[^./]+$')
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/manifest+json', 'image/svg+xml')
+
+# smaller files are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+# precompressed variants next to a file, by content encoding
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+class StaticAsset:
+
+    def __init__(self, full_path: str, stat_result: os.stat_result, media_type: str, cache_control: str, max_memory_size: int):
+        """
+        A file of the application. Files up to max_memory_size bytes are kept in memory.
+        """
+        self.full_path   = full_path
+        self.stat_result = stat_result
+        self.media_type  = media_type
+        self.compressible = media_type.startswith(COMPRESSIBLE_TYPES)
+        self.content: Union[bytes, None] = None
+        if stat_result.st_size <= max_memory_size:
+            with open(full_path, 'rb') as f:
+                self.content = f.read()
+            etag = hashlib.md5(self.content).hexdigest()
+        else:
+            etag = hashlib.md5('{}-{}'.format(stat_result.st_mtime, stat_result.st_size).encode()).hexdigest()
+        # weak, as all content encodings of a file share it
+        self.etag = 'W/"{}"'.format(etag)
+        self.headers = {'cache-control': cache_control, 'etag': self.etag}
+        if self.compressible:
+            self.headers['vary'] = 'Accept-Encoding'
+        # encoding -> full path of a precompressed file on disk or compressed content
+        self.variants: dict[str, Union[str, bytes]] = {
+            encoding: full_path + suffix
+            for encoding, suffix in ENCODING_SUFFIXES.items()
+            if self.compressible and os.path.isfile(full_path + suffix)
+        }
+
+    def variant(self, encoding: str) -> Union[str, bytes, None]:
+        """
+        Return the precompressed variant for encoding. gzip is created (once) for files held in memory.
+        """
+        variant = self.variants.get(encoding)
+        if variant is None and encoding == 'gzip' and self.compressible and self.content is not None and len(self.content) >= MIN_COMPRESS_SIZE:
+            variant = self.variants[encoding] = gzip.compress(self.content, compresslevel=9, mtime=0)
+        return variant
+
 
 class SinglePageApplication(StaticFiles):
-    """Acts similar to the bripkens/connect-history-api-fallback NPM package."""
+    """Acts similar to the bripkens/connect-history-api-fallback NPM package.
+
+    All files are indexed on startup, so looking up a path (and falling back to the index)
+    never touches the filesystem. Compressed variants are served where the client accepts them,
+    hashed bundle files are cached forever and the index is revalidated with its ETag.
+    """
 
-    def __init__(self, directory: os.PathLike, index='index.html') -> None:
+    def __init__(self, directory: os.PathLike, index='index.html', max_memory_size: int = 1024 * 1024) -> None:
         self.index = index
+        self.max_memory_size = max_memory_size
         # set html=True to resolve the index even when the base path is passed in
         super().__init__(directory=directory, packages=None, html=True, check_dir=True)
+        self.assets = self._build_index()
+
+    def _build_index(self) -> dict[str, StaticAsset]:
+        """
+        Index all files by their path relative to the directory (with forward slashes).
+        """
+        assets = {}
+        root = os.path.realpath(self.directory)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                # precompressed files are variants of the file without suffix
+                if any(filename.endswith(suffix) and os.path.isfile(full_path[:-len(suffix)]) for suffix in ENCODING_SUFFIXES.values()):
+                    continue
+                path = os.path.relpath(full_path, root).replace(os.sep, '/')
+                if HASHED_FILE.search(filename):
+                    cache_control = 'public, max-age=31536000, immutable'
+                else:
+                    # the index and unhashed files are revalidated with their ETag
+                    cache_control = 'no-cache'
+                media_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                assets[path] = StaticAsset(full_path, os.stat(full_path), media_type, cache_control, self.max_memory_size)
+        return assets
 
     def lookup_path(self, path: str) -> Tuple[str, os.stat_result]:
         """Returns the index file when no match is found.
@@ -20,10 +108,55 @@ class SinglePageApplication(StaticFiles):
         Returns:
             [tuple[str, os.stat_result]]: Always retuens a full path and stat result.
         """
-        full_path, stat_result = super().lookup_path(path)
+        asset = self._lookup_asset(path)
+        if asset is None:
+            return super().lookup_path(path)
+        return (asset.full_path, asset.stat_result)
+
+    def _lookup_asset(self, path: str) -> Union[StaticAsset, None]:
+        path = path.replace(os.sep, '/').strip('/')
+        if path in ('', '.'):
+            return self.assets.get(self.index)
+        return self.assets.get(path) or self.assets.get('{}/{}'.format(path, self.index)) or self.assets.get(self.index)
+
+    @staticmethod
+    def _accepted_encodings(accept_encoding: str) -> set[str]:
+        encodings = set()
+        for item in accept_encoding.split(','):
+            name, _, params = item.strip().partition(';')
+            if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                encodings.add(name.strip().lower())
+        return encodings
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope['method'] not in ('GET', 'HEAD'):
+            raise HTTPException(status_code=405)
+
+        asset = self._lookup_asset(path)
+        if asset is None:
+            raise HTTPException(status_code=404)
+
+        request_headers = Headers(scope=scope)
+        if asset.etag in [tag.strip() for tag in request_headers.get('if-none-match', '').split(',')]:
+            return Response(status_code=304, headers=asset.headers)
 
-        # if a file cannot be found
-        if stat_result is None:
-            return super().lookup_path(self.index)
+        # pick the first accepted compressed variant
+        encoding, variant = None, None
+        if asset.compressible:
+            accepted = self._accepted_encodings(request_headers.get('accept-encoding', ''))
+            for candidate in ENCODING_SUFFIXES:
+                if candidate in accepted:
+                    variant = asset.variant(candidate)
+                    if variant is not None:
+                        encoding = candidate
+                        break
 
-        return (full_path, stat_result)
+        headers = dict(asset.headers)
+        if encoding is not None:
+            headers['content-encoding'] = encoding
+        content = variant if encoding is not None else asset.content
+        if isinstance(content, bytes):
+            headers['content-length'] = str(len(content))
+            return Response(b'' if scope['method'] == 'HEAD' else content, media_type=asset.media_type, headers=headers)
+        full_path = content if encoding is not None else asset.full_path
+        return FileResponse(full_path, media_type=asset.media_type, headers=headers, method=scope['method'])
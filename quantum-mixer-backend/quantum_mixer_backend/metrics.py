@@ -0,0 +1,184 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Union
+from fastapi.routing import APIRoute
+from pydantic import BaseSettings
+
+# default buckets of stage latencies in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# timings of the current request as (stage, seconds), set by ServerTimingMiddleware
+request_timings: ContextVar[Union[list, None]] = ContextVar('request_timings', default=None)
+
+class MetricsSettings(BaseSettings):
+    """
+    Settings of metrics, read from environment variables prefixed with METRICS_.
+    """
+    enabled: bool = True
+
+    class Config:
+        env_prefix = 'METRICS_'
+
+
+class Histogram:
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts  = [0] * (len(buckets) + 1)
+        self.sum     = 0.0
+        self.count   = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum   += value
+        self.count += 1
+
+
+class Metrics:
+
+    def __init__(self, enabled: bool = True, prefix: str = 'quantum_mixer'):
+        """
+        Registry of stage latency histograms and of gauges/counters read on export.
+        When disabled, stage() returns a shared no-op context manager.
+        """
+        self.enabled     = enabled
+        self.prefix      = prefix
+        self._histograms: dict[str, Histogram] = {}
+        self._collectors: list[tuple[str, str, str, dict, Callable]] = []
+        self._lock       = threading.Lock()
+        self._noop       = nullcontext()
+
+    def observe(self, stage: str, seconds: float):
+        """
+        Record the duration of a stage in its histogram and in the timings of the current request.
+        """
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((stage, seconds))
+
+    @contextmanager
+    def _stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def stage(self, name: str):
+        """
+        Context manager timing a stage.
+        """
+        return self._stage(name) if self.enabled else self._noop
+
+    def add_gauge(self, name: str, help: str, fn: Callable[[], float], labels: dict = {}):
+        self._collectors.append((name, 'gauge', help, labels, fn))
+
+    def add_counter(self, name: str, help: str, fn: Callable[[], float], labels: dict = {}):
+        self._collectors.append((name, 'counter', help, labels, fn))
+
+    @staticmethod
+    def _labels(labels: dict) -> str:
+        if len(labels) == 0:
+            return ''
+        return '{' + ','.join('{}="{}"'.format(k, v) for k, v in labels.items()) + '}'
+
+    def render(self) -> str:
+        """
+        Export all metrics in the Prometheus text format.
+        """
+        lines = []
+        name = '{}_stage_seconds'.format(self.prefix)
+        lines.append('# HELP {} Latency of request stages'.format(name))
+        lines.append('# TYPE {} histogram'.format(name))
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip([*histogram.buckets, '+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append('{}_bucket{} {}'.format(name, self._labels({'stage': stage, 'le': bound}), cumulative))
+                lines.append('{}_sum{} {}'.format(name, self._labels({'stage': stage}), histogram.sum))
+                lines.append('{}_count{} {}'.format(name, self._labels({'stage': stage}), histogram.count))
+
+        documented = set()
+        for collector_name, collector_type, help, labels, fn in self._collectors:
+            full_name = '{}_{}'.format(self.prefix, collector_name)
+            if full_name not in documented:
+                lines.append('# HELP {} {}'.format(full_name, help))
+                lines.append('# TYPE {} {}'.format(full_name, collector_type))
+                documented.add(full_name)
+            lines.append('{}{} {}'.format(full_name, self._labels(labels), fn()))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics(enabled=MetricsSettings().enabled)
+
+
+class ServerTimingMiddleware:
+
+    def __init__(self, app):
+        """
+        Collect stage timings of a request and return them as Server-Timing header.
+        """
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not metrics.enabled:
+            return await self.app(scope, receive, send)
+
+        timings = []
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start' and len(timings) > 0:
+                entries = ['{};dur={:.3f}'.format(stage, seconds * 1000) for stage, seconds in timings]
+                entries.append('total;dur={:.3f}'.format((time.perf_counter() - start) * 1000))
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (b'server-timing', ', '.join(entries).encode('latin-1')),
+                    (b'timing-allow-origin', b'*')
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+
+
+def timed(name: str, fn: Callable) -> Callable:
+    """
+    Wrap a (sync or async) function to time it as a stage, keeping its signature.
+    """
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with metrics.stage(name):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with metrics.stage(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Route timing its endpoint function as stage 'endpoint'. Together with the total of a request this
+    separates the endpoint from request validation and response encoding done by FastAPI.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, timed('endpoint', endpoint) if metrics.enabled else endpoint, **kwargs)
@@ -1,55 +1,332 @@
-from fastapi import FastAPI
-from .circuit_data import CircuitData, ProbabilitiesResponse, MeasurementResponse, DeviceEnum
-from .circuit_executor import CircuitExecutor
+import asyncio
+import json
+from enum import Enum
+from typing import Union
+from fastapi import Body, FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from ..metrics import metrics
+from .cache import LRUCache, circuit_hash
+from .circuit_data import CircuitData, ProbabilitiesResponse, MeasurementResponse, DeviceEnum, CacheStatsResponse, ResponsePartEnum, ResultModeEnum, SessionMessage, SessionResponse
+from .editor_session import EditorSessionManager
+from .circuit_executor import CircuitTooLargeError
+from .jobs import compute_result_keys, create_executors, compute_device_probabilities, compute_drawings, compute_qasms, compute_measurements, measure
+from .request_control import SingleFlight, RequestCanceller
+from .result_modes import format_bits, parse_qubits, reduce_probabilities
+from .settings import settings
+from .wire_format import BINARY_MEDIA_TYPE, accepts_binary, encode_batch, encode_probabilities, encode_reduced_probabilities, encode_measurements, probabilities_to_json, reduced_probabilities_to_json, measurements_to_json
+from .worker_pool import WorkerPool, WorkerTimeoutError
+
+SAMPLED_DEVICES = [DeviceEnum.QASM, DeviceEnum.MOCK]
+
+# devices computed without a devices parameter, the exact mock device is expensive and only runs when named
+DEFAULT_DEVICES = [DeviceEnum.ANALYTICAL, DeviceEnum.QASM, DeviceEnum.MOCK]
+
+PART_JOBS = {
+    ResponsePartEnum.CIRCUIT.value: compute_drawings,
+    ResponsePartEnum.QASM.value:    compute_qasms
+}
+
+def is_unavailable(stage_result) -> bool:
+    """
+    A stage which timed out or found no free worker, its results are reported as missing instead of failing the response.
+    """
+    return isinstance(stage_result, WorkerTimeoutError) or (isinstance(stage_result, HTTPException) and stage_result.status_code == 503)
+
+def parse_selection(value: Union[str, None], enum: type[Enum], name: str, default: Union[list, None] = None) -> list:
+    """
+    Parse a comma separated query parameter into enum members, None selects default (all members if not given).
+    """
+    if value is None:
+        return list(enum) if default is None else list(default)
+    try:
+        return [enum(item.strip()) for item in value.split(',') if item.strip() != '']
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail='Invalid value for {}: {} (allowed: {})'.format(name, value, ', '.join(e.value for e in enum))
+        )
+
+def select_qubits(circuit_datas: list[CircuitData], mode: ResultModeEnum, epsilon: float, k: int, qubits: Union[str, None]) -> list[Union[list[int], None]]:
+    """
+    Check the parameters of a result mode before anything is computed, returns the qubits of the marginals per circuit.
+    """
+    if epsilon < 0 or k < 1:
+        raise HTTPException(status_code=422, detail='epsilon must be >= 0 and k >= 1')
+    return [parse_qubits(qubits, circuit_data.numQubits) if mode == ResultModeEnum.MARGINAL else None for circuit_data in circuit_datas]
+
+def encode_result(item: dict, num_qubits: int, binary: bool, mode: ResultModeEnum, epsilon: float, k: int, qubits: Union[list[int], None]) -> Union[dict, bytes]:
+    """
+    Encode a probabilities result in a result mode, as JSON or binary.
+    """
+    if mode == ResultModeEnum.DENSE:
+        return encode_probabilities(item, num_qubits) if binary else probabilities_to_json(item, num_qubits)
+    reduced = {
+        **item,
+        'results': {device: reduce_probabilities(probabilities, num_qubits, mode, epsilon, k, qubits) for device, probabilities in item['results'].items()},
+        'mode': mode,
+        'qubits': qubits
+    }
+    num_bits = num_qubits if qubits is None else len(qubits)
+    return encode_reduced_probabilities(reduced, num_bits) if binary else reduced_probabilities_to_json(reduced, num_bits)
 
 def build(app: FastAPI, prefix: str):
+
+    # cache of results, keyed by the canonical hash of a circuit
+    result_cache = LRUCache(max_entries=settings.cache_max_entries, ttl=settings.cache_ttl)
+
+    # workers for simulations, keeps the event loop free
+    pool = WorkerPool(
+        kind=settings.pool_kind,
+        size=settings.pool_size,
+        queue_depth=settings.pool_queue_depth,
+        timeout=settings.pool_timeout
+    )
+    app.add_event_handler('shutdown', pool.shutdown)
+
+    # raised by jobs for circuits a device does not support
+    async def circuit_too_large(request: Request, exc: CircuitTooLargeError) -> JSONResponse:
+        return JSONResponse(status_code=422, content={'detail': str(exc)})
+    app.add_exception_handler(CircuitTooLargeError, circuit_too_large)
+
+    # incremental editor sessions
+    sessions = EditorSessionManager(max_memory=settings.session_max_memory, idle_timeout=settings.session_idle_timeout, max_session_memory=settings.session_max_state_memory)
+
+    # identical requests in flight share one computation, work of disconnected or superseded requests is cancelled
+    flights   = SingleFlight()
+    canceller = RequestCanceller()
+
+    # metrics read on export
+    metrics.add_gauge('pool_pending', 'Simulation jobs running or waiting for a worker', lambda: pool.pending)
+    metrics.add_gauge('cache_entries', 'Entries in the result cache', lambda: len(result_cache))
+    metrics.add_counter('cache_requests_total', 'Result cache lookups', lambda: result_cache.stats()['hits'], {'result': 'hit'})
+    metrics.add_counter('cache_requests_total', 'Result cache lookups', lambda: result_cache.stats()['misses'], {'result': 'miss'})
+    metrics.add_gauge('editor_sessions', 'Open editor sessions', lambda: len(sessions))
+    metrics.add_gauge('probabilities_in_flight', 'Distinct probabilities computations running', lambda: len(flights))
+    metrics.add_counter('probabilities_coalesced_total', 'Probabilities requests served by a computation already running', lambda: flights.coalesced)
+    metrics.add_counter('requests_cancelled_total', 'Requests cancelled as their client disconnected or a newer request superseded them', lambda: canceller.cancelled)
     
-    @app.post('{}/probabilities'.format(prefix))
-    async def get_probabilities(circuit_data: CircuitData) -> ProbabilitiesResponse:
-
-        # create executor
-        executor = CircuitExecutor.from_circuit_data(circuit_data)
-
-        # calculate probabilities
-        result_analytical = executor.probabilities_analytical()
-        result_qasm = executor.probabilities_qasm()
-        result_mock = executor.probabilities_mock()
-
-        # get an ASCII drawing
-        circuit_drawing = executor.circuit.draw('text').__str__()
-
-        # get qasm code
-        circuit_qasm = executor.circuit.qasm()
-
-        # return data
-        return {
-            'bits': executor.bit_order,
-            'results': {
-                DeviceEnum.ANALYTICAL: [result_analytical[b] for b in executor.bit_order],
-                DeviceEnum.QASM: [result_qasm[b] for b in executor.bit_order],
-                DeviceEnum.MOCK: [result_mock[b] for b in executor.bit_order],
-            },
-            'circuit': circuit_drawing,
-            'qasm': circuit_qasm
-        }
-
-
-    @app.post('{}/measurements'.format(prefix))
-    async def get_measurements(circuit_data: CircuitData, shots: int = 1, device: DeviceEnum = DeviceEnum.QASM) -> MeasurementResponse:
-
-        # create executor
-        executor = CircuitExecutor.from_circuit_data(circuit_data)
-
-        # get results
-        results = []
-        for _ in range(shots):
-            result_qasm = executor.probabilities_qasm(num_shots=1) if device == DeviceEnum.QASM else executor.probabilities_mock(num_shots=1)
-            result_qasm_bits = max(result_qasm, key=result_qasm.get)
-            results.append(result_qasm_bits)
-        
-        # return data
-        return {
-            'device': device,
-            'results': results,
-            'shots': shots
-        }
+    async def compute_probabilities(circuit_datas: list[CircuitData], selected_devices: list[DeviceEnum], selected_parts: list[str], stage_timeout: float, stage_timeout_mock: float) -> list[dict]:
+        """
+        Compute probabilities responses for several circuits.
+        Results are taken from cache where possible, missing results are computed with one job per device.
+        """
+        # results are shared by equivalent circuits, drawings and QASM code show the circuit as entered
+        # simplifying evaluates parameter expressions, so it runs on a worker
+        keys, simplified = await pool.run(compute_result_keys, circuit_datas)
+        part_keys = [('parts', circuit_hash(circuit_data)) if len(selected_parts) > 0 else None for circuit_data in circuit_datas]
+
+        # lookup cache
+        with metrics.stage('cache_lookup'):
+            cached = [result_cache.get(key, {}, count=False) for key in keys]
+            cached_parts = [result_cache.get(key, {}, count=False) if key is not None else {} for key in part_keys]
+        data = [
+            {
+                'results': {d: r for d, r in item.get('results', {}).items() if d in selected_devices},
+                **{part: parts[part] for part in selected_parts if part in parts}
+            }
+            for item, parts in zip(cached, cached_parts)
+        ]
+
+        # indices of circuits with missing devices or parts
+        device_todo = {device: [i for i, item in enumerate(data) if device not in item['results']] for device in selected_devices}
+        device_todo = {device: indices for device, indices in device_todo.items() if len(indices) > 0}
+        part_todo = {part: [i for i, item in enumerate(data) if part not in item] for part in selected_parts}
+        part_todo = {part: indices for part, indices in part_todo.items() if len(indices) > 0}
+        todo = sorted({i for indices in [*device_todo.values(), *part_todo.values()] for i in indices})
+        missing = [[] for _ in circuit_datas]
+        # one lookup per circuit, a hit if nothing has to be computed
+        for i in range(len(circuit_datas)):
+            result_cache.record(i not in todo)
+
+        if len(todo) > 0:
+            # create executors only for circuits where something has to be computed
+            executors = dict(zip(todo, await pool.run(create_executors, [circuit_datas[i] for i in todo], [keys[i] for i in todo], [simplified[i] for i in todo])))
+
+            # run all missing stages concurrently, each with its own timeout
+            device_stages = [
+                pool.run(compute_device_probabilities, [executors[i] for i in indices], device, timeout=stage_timeout_mock if device in (DeviceEnum.MOCK, DeviceEnum.MOCK_EXACT) else stage_timeout)
+                for device, indices in device_todo.items()
+            ]
+            part_stages = [
+                pool.run(PART_JOBS[part], [executors[i] for i in indices], timeout=stage_timeout)
+                for part, indices in part_todo.items()
+            ]
+            stage_results = await asyncio.gather(*device_stages, *part_stages, return_exceptions=True)
+
+            # collect results, devices which timed out, found the workers busy (or do not support a circuit) are reported as missing
+            for (device, indices), stage_result in zip(device_todo.items(), stage_results[:len(device_todo)]):
+                if is_unavailable(stage_result):
+                    for i in indices:
+                        missing[i].append(device)
+                elif isinstance(stage_result, BaseException):
+                    raise stage_result
+                else:
+                    for i, result in zip(indices, stage_result):
+                        if result is None:
+                            missing[i].append(device)
+                        else:
+                            data[i]['results'][device] = result
+            # parts which timed out or found the workers busy are left out
+            for (part, indices), stage_result in zip(part_todo.items(), stage_results[len(device_todo):]):
+                if is_unavailable(stage_result):
+                    continue
+                if isinstance(stage_result, BaseException):
+                    raise stage_result
+                for i, result in zip(indices, stage_result):
+                    data[i][part] = result
+
+            # merge into cache, sampled devices are cached only if configured
+            for i in todo:
+                result_cache.put(keys[i], {
+                    'results': {
+                        **cached[i].get('results', {}),
+                        **{d: r for d, r in data[i]['results'].items() if settings.cache_sampled_devices or d not in SAMPLED_DEVICES}
+                    }
+                })
+                if part_keys[i] is not None:
+                    result_cache.put(part_keys[i], {**cached_parts[i], **{part: data[i][part] for part in selected_parts if part in data[i]}})
+
+        # return data, devices in the order they were selected
+        return [
+            {
+                **item,
+                'results': {d: item['results'][d] for d in selected_devices if d in item['results']},
+                'missing': item_missing
+            }
+            for item, item_missing in zip(data, missing)
+        ]
+
+    
+    @app.post('{}/probabilities'.format(prefix), response_model_exclude_none=True)
+    async def get_probabilities(request: Request, circuit_data: CircuitData, devices: Union[str, None] = None, include: Union[str, None] = None,
+                                mode: ResultModeEnum = ResultModeEnum.DENSE, epsilon: float = 1e-9, k: int = 16, qubits: Union[str, None] = None,
+                                x_editor_session: Union[str, None] = Header(None)) -> ProbabilitiesResponse:
+        """
+        Probabilities of a circuit. Instead of all 2^n bit configurations (dense), return only outcomes with a probability
+        above epsilon (sparse), the k most probable outcomes (top) or the marginal probabilities of comma separated qubits (marginal).
+        A request with an X-Editor-Session header cancels the previous request with the same header (answered with 409).
+        """
+
+        # only compute requested devices and parts (default: all)
+        selected_devices = parse_selection(devices, DeviceEnum, 'devices', DEFAULT_DEVICES)
+        selected_parts   = [p.value for p in parse_selection(include, ResponsePartEnum, 'include')]
+        selected_qubits  = select_qubits([circuit_data], mode, epsilon, k, qubits)
+
+        # result modes are applied to the shared result, so they are not part of the key
+        flight_key = (circuit_hash(circuit_data), tuple(selected_devices), tuple(selected_parts))
+        results = await canceller.run(
+            request,
+            flights.run(flight_key, lambda: compute_probabilities([circuit_data], selected_devices, selected_parts, settings.stage_timeout, settings.stage_timeout_mock)),
+            x_editor_session
+        )
+        with metrics.stage('encode'):
+            binary = accepts_binary(request)
+            encoded = encode_result(results[0], circuit_data.numQubits, binary, mode, epsilon, k, selected_qubits[0])
+            return Response(encoded, media_type=BINARY_MEDIA_TYPE) if binary else encoded
+
+
+    @app.post('{}/probabilities/batch'.format(prefix), response_model_exclude_none=True)
+    async def get_probabilities_batch(request: Request, circuit_datas: list[CircuitData] = Body(..., max_items=settings.max_batch_size), devices: Union[str, None] = None, include: Union[str, None] = None,
+                                      mode: ResultModeEnum = ResultModeEnum.DENSE, epsilon: float = 1e-9, k: int = 16, qubits: Union[str, None] = None) -> list[ProbabilitiesResponse]:
+
+        # only compute requested devices and parts (default: all)
+        selected_devices = parse_selection(devices, DeviceEnum, 'devices', DEFAULT_DEVICES)
+        selected_parts   = [p.value for p in parse_selection(include, ResponsePartEnum, 'include')]
+        selected_qubits  = select_qubits(circuit_datas, mode, epsilon, k, qubits)
+
+        # a batch takes longer than a single circuit, stages are only limited by the pool timeout
+        results = await canceller.run(request, compute_probabilities(circuit_datas, selected_devices, selected_parts, settings.pool_timeout, settings.pool_timeout))
+        with metrics.stage('encode'):
+            binary = accepts_binary(request)
+            encoded = [encode_result(r, c.numQubits, binary, mode, epsilon, k, q) for r, c, q in zip(results, circuit_datas, selected_qubits)]
+            return Response(encode_batch(encoded), media_type=BINARY_MEDIA_TYPE) if binary else encoded
+
+
+    @app.get('{}/cache'.format(prefix))
+    async def get_cache_stats() -> CacheStatsResponse:
+        return result_cache.stats()
+
+
+    @app.post('{}/measurements'.format(prefix), response_model_exclude_none=True)
+    async def get_measurements(request: Request, circuit_data: CircuitData, shots: int = Query(1, ge=0), device: DeviceEnum = DeviceEnum.QASM, aggregate: bool = False, seed: Union[int, None] = None) -> MeasurementResponse:
+        results = await canceller.run(request, pool.run(compute_measurements, [circuit_data], shots, device, seed))
+        with metrics.stage('encode'):
+            if accepts_binary(request):
+                return Response(encode_measurements(results[0], circuit_data.numQubits, device, aggregate), media_type=BINARY_MEDIA_TYPE)
+            return measurements_to_json(results[0], circuit_data.numQubits, device, aggregate)
+
+
+    @app.post('{}/measurements/batch'.format(prefix), response_model_exclude_none=True)
+    async def get_measurements_batch(request: Request, circuit_datas: list[CircuitData] = Body(..., max_items=settings.max_batch_size), shots: int = Query(1, ge=0), device: DeviceEnum = DeviceEnum.QASM, aggregate: bool = False, seed: Union[int, None] = None) -> list[MeasurementResponse]:
+        # backends reject jobs without circuits
+        results = [] if len(circuit_datas) == 0 else await canceller.run(request, pool.run(compute_measurements, circuit_datas, shots, device, seed))
+        with metrics.stage('encode'):
+            if accepts_binary(request):
+                return Response(encode_batch([encode_measurements(r, c.numQubits, device, aggregate) for r, c in zip(results, circuit_datas)]), media_type=BINARY_MEDIA_TYPE)
+            return [measurements_to_json(r, c.numQubits, device, aggregate) for r, c in zip(results, circuit_datas)]
+
+
+    @app.post('{}/measurements/stream'.format(prefix))
+    async def stream_measurements(request: Request, circuit_data: CircuitData, shots: int = 0, device: DeviceEnum = DeviceEnum.QASM, chunk_size: int = settings.stream_chunk_size, seed: Union[int, None] = None) -> StreamingResponse:
+        """
+        Stream measurements as server-sent events, in chunks of chunk_size shots (at most stream_max_chunk_size).
+        shots=0 streams until the client disconnects.
+        A seed makes the stream reproducible (chunk i uses seed + i).
+        """
+        if shots < 0 or chunk_size < 1:
+            raise HTTPException(status_code=422, detail='shots must be >= 0 and chunk_size >= 1')
+        # memory per connection is bounded by the size of a chunk
+        chunk_size = min(chunk_size, settings.stream_max_chunk_size)
+
+        # parse circuit once for all chunks
+        executors = await pool.run(create_executors, [circuit_data])
+        if device == DeviceEnum.MOCK_EXACT and (await pool.run(compute_device_probabilities, executors, device))[0] is None:
+            # errors can not be reported once the stream started
+            raise CircuitTooLargeError('Mock Device (exact) supports circuits on up to {} physical qubits'.format(settings.mock_exact_max_qubits))
+
+        async def events():
+            done = 0
+            chunk = 0
+            # only one chunk is held in memory at a time
+            while shots == 0 or done < shots:
+                if await request.is_disconnected():
+                    # nobody is left to receive the end event
+                    return
+                num_shots = chunk_size if shots == 0 else min(chunk_size, shots - done)
+                results = (await pool.run(measure, executors, num_shots, device, None if seed is None else seed + chunk))[0]
+                done += num_shots
+                chunk += 1
+                yield 'data: {}\n\n'.format(json.dumps({'device': device, 'results': format_bits(results, circuit_data.numQubits), 'shots': done}))
+            yield 'event: end\ndata: {}\n\n'.format(json.dumps({'shots': done}))
+
+        return StreamingResponse(events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+    @app.websocket('{}/session'.format(prefix))
+    async def editor_session(websocket: WebSocket, session: Union[str, None] = None):
+        """
+        Editor session: receives SessionMessage changes and answers with the updated analytical probabilities.
+        Pass the id of a previous session to resume it.
+        """
+        await websocket.accept()
+        editor = sessions.get(session)
+        try:
+            while True:
+                data = await websocket.receive_json()
+                try:
+                    message = SessionMessage.parse_obj(data)
+                    # sessions hold state, so they run on a thread and never on a process pool
+                    bits, probabilities, recomputed = await pool.run(editor.handle, message, local=True)
+                except Exception as e:
+                    # busy or timed out workers answer with their HTTP detail
+                    await websocket.send_json({'session': editor.id, 'error': e.detail if isinstance(e, HTTPException) else str(e)})
+                    continue
+                sessions.evict()
+                await websocket.send_json(SessionResponse(
+                    session=editor.id,
+                    bits=bits,
+                    results={DeviceEnum.ANALYTICAL: probabilities},
+                    recomputed=recomputed
+                ).dict())
+        except WebSocketDisconnect:
+            pass
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Union
+from .circuit_data import CircuitData
+
+def circuit_hash(circuit_data: CircuitData) -> str:
+    """
+    Canonical hash of a circuit. Operation ids do not change the result and are left out.
+    """
+    canonical = {
+        'numQubits': circuit_data.numQubits,
+        'operations': [
+            [
+                operation.type.value,
+                operation.targetQubits,
+                operation.controlQubits,
+                [''.join(p.lower().split()) for p in operation.parameterValues]
+            ]
+            for operation in circuit_data.operations
+        ]
+    }
+    encoded = json.dumps(canonical, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+
+    def __init__(self, max_entries: int = 1024, ttl: Union[float, None] = None):
+        """
+        Thread-safe LRU cache with a maximum number of entries and an optional time-to-live in seconds.
+        """
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.hits        = 0
+        self.misses      = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """
+        Return the value for key (and mark it as recently used) or default if missing or expired.
+        Lookups are counted as hit or miss unless count is False (see record).
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and self.ttl is not None and time.monotonic() - item[0] > self.ttl:
+                del self._entries[key]
+                item = None
+            if item is None:
+                if count:
+                    self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return item[1]
+
+    def record(self, hit: bool):
+        """
+        Count a lookup made of several uncounted gets.
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Store value for key, evicting the least recently used entries if the cache is full.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Return size and hit/miss counters.
+        """
+        return {
+            'size': len(self._entries),
+            'maxEntries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses
+        }
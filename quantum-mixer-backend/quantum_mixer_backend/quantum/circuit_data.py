@@ -1,6 +1,7 @@
-from typing import Annotated
-from pydantic import BaseModel
+from typing import Annotated, Optional, Union
+from pydantic import BaseModel, validator
 from enum import Enum
+from .settings import settings
 
 class OperationTypeEnum(str, Enum):
     HADAMARD = 'h'
@@ -21,18 +22,73 @@ class CircuitData(BaseModel):
     numQubits: Annotated[int, "Number of qubits"]
     operations: Annotated[list[OperationData], "List of operations"]
 
+    @validator('numQubits')
+    def check_num_qubits(cls, num_qubits: int) -> int:
+        # checked before the operations are parsed, the cost of a circuit grows with 2^numQubits
+        if num_qubits < 1 or num_qubits > settings.max_qubits:
+            raise ValueError('numQubits must be between 1 and {}'.format(settings.max_qubits))
+        return num_qubits
+
+    @validator('operations', each_item=True)
+    def check_qubits(cls, operation: OperationData, values: dict) -> OperationData:
+        num_qubits = values.get('numQubits')
+        if num_qubits is not None and any(q < 0 or q >= num_qubits for q in [*operation.targetQubits, *operation.controlQubits]):
+            raise ValueError('qubits of operation {} must be between 0 and {}'.format(operation.id, num_qubits - 1))
+        return operation
+
 class DeviceEnum(str, Enum):
     ANALYTICAL = 'analytical'
     QASM       = 'qasm'
     MOCK       = 'mock'
+    MOCK_EXACT = 'mock_exact'
+
+class ResponsePartEnum(str, Enum):
+    CIRCUIT = 'circuit'
+    QASM    = 'qasm'
+
+class ResultModeEnum(str, Enum):
+    DENSE    = 'dense'
+    SPARSE   = 'sparse'
+    TOP      = 'top'
+    MARGINAL = 'marginal'
 
 class ProbabilitiesResponse(BaseModel):
-    bits: Annotated[list[str], "Ordered list of bit configuration, corrsponds to order in results"]
-    results: Annotated[dict[DeviceEnum, list[float]], "Results for each device"]
-    circuit: Annotated[str, "ASCII drawing of circuit"]
-    qasm: Annotated[str, "QASM code of circuit"]
+    bits: Annotated[Optional[list[str]], "Ordered list of bit configuration, corrsponds to order in results (dense mode)"]
+    results: Annotated[dict[DeviceEnum, Union[list[float], dict[str, float]]], "Results for each device, probabilities by bit configuration if not in dense mode"]
+    missing: Annotated[list[DeviceEnum], "Devices without results, e.g. because they timed out"] = []
+    mode: Annotated[Optional[ResultModeEnum], "Result mode (if not dense)"]
+    qubits: Annotated[Optional[list[int]], "Qubits of the bit configurations, from the highest qubit (marginal mode)"]
+    circuit: Annotated[Optional[str], "ASCII drawing of circuit (if included)"]
+    qasm: Annotated[Optional[str], "QASM code of circuit (if included)"]
 
 class MeasurementResponse(BaseModel):
     shots: Annotated[int, "Number of shots"]
     device: Annotated[DeviceEnum, "Device used to do measurement"]
-    results: Annotated[list[str], "List of measured bit configurations"]
+    results: Annotated[Optional[list[str]], "List of measured bit configurations (omitted if aggregated)"]
+    counts: Annotated[Optional[dict[str, int]], "Number of occurrences per bit configuration (only if aggregated)"]
+
+class CacheStatsResponse(BaseModel):
+    size: Annotated[int, "Number of cached circuits"]
+    maxEntries: Annotated[int, "Maximum number of cached circuits"]
+    hits: Annotated[int, "Number of cache hits"]
+    misses: Annotated[int, "Number of cache misses"]
+
+class SessionActionEnum(str, Enum):
+    SET    = 'set'
+    ADD    = 'add'
+    UPDATE = 'update'
+    MOVE   = 'move'
+    REMOVE = 'remove'
+
+class SessionMessage(BaseModel):
+    action: Annotated[SessionActionEnum, "Change to apply to the circuit of the session"]
+    circuit: Annotated[Optional[CircuitData], "New circuit (set)"]
+    operation: Annotated[Optional[OperationData], "Operation to add or update (add, update)"]
+    id: Annotated[Optional[str], "Id of operation to move or remove (move, remove)"]
+    index: Annotated[Optional[int], "Position of operation (add, move), appended if missing"]
+
+class SessionResponse(BaseModel):
+    session: Annotated[str, "Session id, pass it to resume the session"]
+    bits: Annotated[list[str], "Ordered list of bit configuration, corrsponds to order in results"]
+    results: Annotated[dict[DeviceEnum, list[float]], "Results for each device"]
+    recomputed: Annotated[int, "Number of operations applied to compute the result"]
@@ -1,62 +1,183 @@
+import threading
 import numpy as np
+from functools import lru_cache
 from itertools import product
-from random import randint
-from qiskit import transpile, execute, QuantumCircuit
-from qiskit_aer import StatevectorSimulator, QasmSimulator
-from qiskit.test.mock import FakeMontreal
-from typing import Union, Dict
+from qiskit import execute, QuantumCircuit
+from typing import Callable, Union, Dict, Hashable
+from ..metrics import metrics
+from .cache import circuit_hash
 from .circuit_parser import parse_circuit_data
-from .circuit_data import CircuitData
+from .circuit_data import CircuitData, DeviceEnum
+from .sampling import Sampler
+from .settings import settings
+from .simplify import simplify_circuit_data
+from .statevector_engine import simulate_statevector, UnsupportedOperationError
+from .transpiler import transpile
 
-# initialize backends
-backend_ideal = StatevectorSimulator()
-backend_qasm = QasmSimulator()
-backend_mock = FakeMontreal()
+# backends are created on first use, importing Aer and loading the fake device takes seconds
+_backends: dict[str, object] = {}
+_backends_lock = threading.Lock()
+
+def _get_backend(name: str, create: Callable):
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = create()
+    return backend
+
+def _create_backend_ideal():
+    from qiskit_aer import StatevectorSimulator
+    return StatevectorSimulator()
+
+def _create_backend_qasm():
+    from qiskit_aer import QasmSimulator
+    return QasmSimulator()
+
+def _create_mock_device():
+    from qiskit.test.mock import FakeMontreal
+    from .mock_device import MockDevice
+    # noise model, coupling map and transpiled circuits of the mock device are reused across requests
+    return MockDevice(FakeMontreal(), max_transpiled=settings.transpile_cache_max_entries)
+
+def get_backend_ideal():
+    """
+    State vector simulator
+    """
+    return _get_backend('ideal', _create_backend_ideal)
+
+def get_backend_qasm():
+    """
+    QASM simulator
+    """
+    return _get_backend('qasm', _create_backend_qasm)
+
+def get_mock_device():
+    """
+    Noisy simulator of FakeMontreal
+    """
+    return _get_backend('mock', _create_mock_device)
+
+class CircuitTooLargeError(ValueError):
+    pass
+
+
+# distributions of circuits for the NumPy sampling engine
+sampler = Sampler(max_entries=settings.sampling_cache_max_entries)
+
+@lru_cache(maxsize=32)
+def get_bit_order(num_qubits: int) -> list[str]:
+    """
+    All bit configurations of num_qubits qubits, index i is the binary representation of i (shared, do not modify)
+    """
+    return list(map(''.join, product(['0', '1'], repeat=num_qubits)))
 
 # execute circuit
 class CircuitExecutor:
     
-    def __init__(self, circuit: QuantumCircuit):
+    def __init__(self, circuit: QuantumCircuit, key: Union[Hashable, None] = None, display_circuit_data: Union[CircuitData, None] = None):
         """
         Helper Class to execute circuits on different backends.
+        The optional key identifies the circuit to reuse transpiled circuits.
+        If the executed circuit is a simplified one, display_circuit_data is the circuit of the user.
         """
         self.circuit = circuit
-        self.bit_order = list(map(''.join, product(['0', '1'], repeat=circuit.num_qubits)))
-        
+        self.key = key
+        self._display_circuit_data = display_circuit_data
+        self._display_circuit: Union[QuantumCircuit, None] = None
 
-    def _fill_with_zero(self, results: Dict[str, float]):
+    @property
+    def display_circuit(self) -> QuantumCircuit:
         """
-        Make sure that all keys defined in bit_order are present in the resulting dict.
+        Circuit as entered by the user, for drawings and QASM code (parsed on access)
         """
-        new_results = {}
-        for bit in self.bit_order:
-            if bit not in results:
-                new_results[bit] = 0
-            else:
-                new_results[bit] = results[bit]
-        return new_results
-    
+        if self._display_circuit is None:
+            self._display_circuit = self.circuit if self._display_circuit_data is None else parse_circuit_data(self._display_circuit_data)
+        return self._display_circuit
 
-    def _probabilities_backend(self, backend, num_shots: int = 800, seed: Union[int, None] = None, result_options={}, transpile_before: bool = False):
+    @property
+    def bit_order(self) -> list[str]:
         """
-        Calculate probabilities on a given backend.
+        All bit configurations, only built on access as it has 2^n entries
+        """
+        return get_bit_order(self.circuit.num_qubits)
+
+    def _indices(self, hex_values: list[str]) -> np.ndarray:
+        """
+        Convert hexadecimal results of Aer to indices into bit_order.
+        """
+        return np.fromiter((int(value, 16) for value in hex_values), dtype=np.int64, count=len(hex_values))
+        
+
+    def _measured_circuit(self) -> QuantumCircuit:
+        """
+        Copy of the circuit with a measurement of all qubits.
         """
         # copy current circuit
         mqc = self.circuit.copy()
         # add measurement
         mqc.measure(range(mqc.num_qubits), range(mqc.num_qubits))
-        # transpile
-        mqc_transpiled = mqc if not transpile_before else transpile(mqc, backend)
-        # run job
-        job = backend.run(mqc_transpiled, shots=num_shots, seed=seed)
-        # get results
-        result = job.result(**result_options)
-        counts = result.get_counts(mqc_transpiled)
-        # divide by num_shots to get probabilities
-        assert num_shots == np.sum([c for c in counts.values()]), (num_shots, counts)
-        for b in counts:
-            counts[b] = float(counts[b])/num_shots
-        return self._fill_with_zero(counts)
+        return mqc
+
+
+    @staticmethod
+    def _run_backend_batch(backend, executors: list['CircuitExecutor'], num_shots: int = 800, seed: Union[int, None] = None, transpile_before: bool = False, memory: bool = False) -> list:
+        """
+        Run the measured circuits of several executors in a single job on a given backend.
+        Returns the counts (or the memory of every shot, if memory is set) for each executor,
+        as arrays indexed by (or holding) positions in bit_order.
+        """
+        circuits = [executor._measured_circuit() for executor in executors]
+        # Aer only takes the seed as seed_simulator, without a seed it seeds every job randomly
+        run_options = {'shots': num_shots, 'memory': memory}
+        if seed is not None:
+            run_options['seed_simulator'] = seed
+        # the mock device transpiles itself (memoized)
+        if backend is _backends.get('mock'):
+            experiments = backend.run_batch(circuits, keys=[executor.key for executor in executors], **run_options)
+        else:
+            # transpile
+            with metrics.stage('transpile'):
+                circuits_transpiled = circuits if not transpile_before else transpile(circuits, backend)
+            # run job
+            with metrics.stage('aer_run'):
+                result = backend.run(circuits_transpiled, **run_options).result()
+            experiments = [(result, i) for i in range(len(circuits))]
+        # get results, raw hexadecimal data avoids formatting bit strings
+        outputs = []
+        for executor, (result, i) in zip(executors, experiments):
+            data = result.data(i)
+            if memory:
+                outputs.append(executor._indices(data['memory']))
+            else:
+                counts = np.zeros(2 ** executor.circuit.num_qubits, dtype=np.int64)
+                counts[executor._indices(list(data['counts'].keys()))] = list(data['counts'].values())
+                outputs.append(counts)
+        return outputs
+
+
+    def _counts_to_probabilities(self, counts: np.ndarray, num_shots: int) -> np.ndarray:
+        """
+        Divide counts by num_shots to get probabilities.
+        """
+        assert num_shots == np.sum(counts), (num_shots, counts)
+        return counts / num_shots
+    
+
+    def _probabilities_backend(self, backend, num_shots: int = 800, seed: Union[int, None] = None, transpile_before: bool = False):
+        """
+        Calculate probabilities on a given backend.
+        """
+        counts = CircuitExecutor._run_backend_batch(backend, [self], num_shots=num_shots, seed=seed, transpile_before=transpile_before)[0]
+        return self._counts_to_probabilities(counts, num_shots)
+
+
+    def _memory_backend(self, backend, num_shots: int, seed: Union[int, None] = None, transpile_before: bool = False):
+        """
+        Run num_shots shots in one job and return the index (into bit_order) of the measured bit configuration of every shot (in order).
+        """
+        return CircuitExecutor._run_backend_batch(backend, [self], num_shots=num_shots, seed=seed, transpile_before=transpile_before, memory=True)[0]
     
     
     def get_maximum_key(self, results: Dict[str, float]):
@@ -67,39 +188,206 @@ class CircuitExecutor:
         return max_key
     
     
-    def probabilities_qasm(self, num_shots: int = 800):
+    def distribution(self, device: DeviceEnum) -> np.ndarray:
+        """
+        Distribution drawn from by the NumPy sampling engine, cached per circuit: the state vector
+        probabilities for QASM Simulator, probabilities of sampling_mock_shots shots for Mock Device
+        and the exact noisy distribution for Mock Device (exact).
+        """
+        if device == DeviceEnum.MOCK_EXACT:
+            probabilities = CircuitExecutor.probabilities_mock_exact_batch([self])[0]
+            if probabilities is None:
+                # a plain exception, jobs on a process pool send it back pickled
+                raise CircuitTooLargeError('Mock Device (exact) supports circuits on up to {} physical qubits'.format(settings.mock_exact_max_qubits))
+            return probabilities
+        if device == DeviceEnum.MOCK:
+            return sampler.distribution(self.key, device, lambda: self._probabilities_backend(get_mock_device(), num_shots=settings.sampling_mock_shots))
+        return sampler.distribution(self.key, device, self.probabilities_analytical)
+
+
+    def _sample(self, device: DeviceEnum, num_shots: int, seed: Union[int, None] = None, memory: bool = False) -> np.ndarray:
+        """
+        Draw num_shots shots from the distribution of the circuit on a device.
+        Returns counts (or the memory of every shot, if memory is set) like _run_backend_batch.
+        """
+        probabilities = self.distribution(device)
+        with metrics.stage('sample'):
+            return Sampler.sample(probabilities, num_shots, seed=seed, memory=memory)
+
+
+    def probabilities_qasm(self, num_shots: int = 800, seed: Union[int, None] = None):
         """
         Calculate probabilities on QASM Simulator
         """
-        return self._probabilities_backend(backend_qasm, num_shots=num_shots, seed=randint(0, 2500), transpile_before=True)
+        if settings.sampling_engine == 'numpy':
+            return self._counts_to_probabilities(self._sample(DeviceEnum.QASM, num_shots, seed=seed), num_shots)
+        return self._probabilities_backend(get_backend_qasm(), num_shots=num_shots, seed=seed, transpile_before=True)
     
     
-    def probabilities_mock(self, num_shots: int = 800):
+    def probabilities_mock(self, num_shots: int = 800, seed: Union[int, None] = None):
         """
         Calculate probabilities on Mock Device
         """
-        return self._probabilities_backend(backend_mock, num_shots=num_shots, transpile_before=True)
+        if settings.sampling_engine == 'numpy':
+            return self._counts_to_probabilities(self._sample(DeviceEnum.MOCK, num_shots, seed=seed), num_shots)
+        return self._probabilities_backend(get_mock_device(), num_shots=num_shots, seed=seed)
+
+
+    @staticmethod
+    def probabilities_mock_exact_batch(executors: list['CircuitExecutor']) -> list[Union[np.ndarray, None]]:
+        """
+        Exact noisy probabilities of several circuits on Mock Device (one job per qubit layout), cached per circuit.
+        None for circuits using more than mock_exact_max_qubits physical qubits.
+        """
+        probabilities = [sampler.cached_distribution(executor.key, DeviceEnum.MOCK_EXACT) for executor in executors]
+        todo = [i for i, item in enumerate(probabilities) if item is None]
+        if len(todo) > 0:
+            computed = get_mock_device().exact_probabilities(
+                [executors[i]._measured_circuit() for i in todo],
+                keys=[executors[i].key for i in todo],
+                max_qubits=settings.mock_exact_max_qubits
+            )
+            for i, item in zip(todo, computed):
+                if item is not None:
+                    probabilities[i] = sampler.distribution(executors[i].key, DeviceEnum.MOCK_EXACT, lambda: item)
+        return probabilities
+
+
+    def measurements_qasm(self, num_shots: int = 1, seed: Union[int, None] = None):
+        """
+        Measure num_shots times on QASM Simulator
+        """
+        if settings.sampling_engine == 'numpy':
+            return self._sample(DeviceEnum.QASM, num_shots, seed=seed, memory=True)
+        return self._memory_backend(get_backend_qasm(), num_shots=num_shots, seed=seed, transpile_before=True)
+
+
+    def measurements_mock(self, num_shots: int = 1, seed: Union[int, None] = None):
+        """
+        Measure num_shots times on Mock Device
+        """
+        if settings.sampling_engine == 'numpy':
+            return self._sample(DeviceEnum.MOCK, num_shots, seed=seed, memory=True)
+        return self._memory_backend(get_mock_device(), num_shots=num_shots, seed=seed)
 
     
-    def probabilities_analytical(self):
+    def statevector(self) -> np.ndarray:
         """
-        Calculate probabilities using the state vector (analytical solution)
+        Calculate the state vector, using the NumPy engine if enabled and Aer otherwise
         """
+        if settings.statevector_engine == 'numpy':
+            try:
+                with metrics.stage('statevector'):
+                    return simulate_statevector(self.circuit)
+            except UnsupportedOperationError:
+                # fall back to Aer for operations unknown to the NumPy engine
+                pass
         mqc = self.circuit.copy()
         # run circuit on state vector
-        result = execute(mqc, backend_ideal).result()
-        # get state vector and calculate probabilities
-        state_vector = result.get_statevector(mqc, decimals=5)
-        probs = state_vector.probabilities() if hasattr(state_vector, "probabilities") else np.abs(state_vector ** 2)
-        # map back to bit configurations
-        results = {
-            key: probs[i] for i, key in enumerate(self.bit_order)
-        }
-        return self._fill_with_zero(results)
+        with metrics.stage('aer_run'):
+            result = execute(mqc, get_backend_ideal()).result()
+        return np.asarray(result.get_statevector(mqc, decimals=5))
+
+
+    def _statevector_probabilities(self, state_vector: np.ndarray) -> np.ndarray:
+        """
+        Probabilities of a state vector, ordered like bit_order
+        """
+        return np.abs(state_vector) ** 2
+
+    
+    def probabilities_analytical(self):
+        """
+        Calculate probabilities using the state vector (analytical solution)
+        """
+        return self._statevector_probabilities(self.statevector())
+
+
+    @staticmethod
+    def probabilities_analytical_batch(executors: list['CircuitExecutor']):
+        """
+        Calculate analytical probabilities of several circuits, on Aer as a single job
+        """
+        if settings.statevector_engine == 'numpy':
+            # the NumPy engine has no per-job overhead
+            return [executor.probabilities_analytical() for executor in executors]
+        circuits = [executor.circuit.copy() for executor in executors]
+        with metrics.stage('aer_run'):
+            result = execute(circuits, get_backend_ideal()).result()
+        return [executor._statevector_probabilities(np.asarray(result.get_statevector(i, decimals=5))) for i, executor in enumerate(executors)]
+
+
+    @staticmethod
+    def probabilities_qasm_batch(executors: list['CircuitExecutor'], num_shots: int = 800, seed: Union[int, None] = None):
+        """
+        Calculate probabilities of several circuits on QASM Simulator as a single job
+        """
+        if settings.sampling_engine == 'numpy':
+            return [executor.probabilities_qasm(num_shots, seed=seed) for executor in executors]
+        all_counts = CircuitExecutor._run_backend_batch(get_backend_qasm(), executors, num_shots=num_shots, seed=seed, transpile_before=True)
+        return [executor._counts_to_probabilities(counts, num_shots) for executor, counts in zip(executors, all_counts)]
+
+
+    @staticmethod
+    def probabilities_mock_batch(executors: list['CircuitExecutor'], num_shots: int = 800, seed: Union[int, None] = None):
+        """
+        Calculate probabilities of several circuits on Mock Device (one job per qubit layout)
+        """
+        if settings.sampling_engine == 'numpy':
+            return [executor.probabilities_mock(num_shots, seed=seed) for executor in executors]
+        all_counts = CircuitExecutor._run_backend_batch(get_mock_device(), executors, num_shots=num_shots, seed=seed)
+        return [executor._counts_to_probabilities(counts, num_shots) for executor, counts in zip(executors, all_counts)]
+
+
+    @staticmethod
+    def measurements_qasm_batch(executors: list['CircuitExecutor'], num_shots: int = 1, seed: Union[int, None] = None):
+        """
+        Measure several circuits num_shots times on QASM Simulator as a single job
+        """
+        if settings.sampling_engine == 'numpy':
+            return [executor.measurements_qasm(num_shots, seed=seed) for executor in executors]
+        return CircuitExecutor._run_backend_batch(get_backend_qasm(), executors, num_shots=num_shots, seed=seed, transpile_before=True, memory=True)
+
+
+    @staticmethod
+    def measurements_mock_exact_batch(executors: list['CircuitExecutor'], num_shots: int = 1, seed: Union[int, None] = None):
+        """
+        Measure several circuits num_shots times by sampling their exact distribution on Mock Device
+        """
+        CircuitExecutor.probabilities_mock_exact_batch(executors)
+        return [executor._sample(DeviceEnum.MOCK_EXACT, num_shots, seed=seed, memory=True) for executor in executors]
+
+
+    @staticmethod
+    def measurements_mock_batch(executors: list['CircuitExecutor'], num_shots: int = 1, seed: Union[int, None] = None):
+        """
+        Measure several circuits num_shots times on Mock Device (one job per qubit layout)
+        """
+        if settings.sampling_engine == 'numpy':
+            return [executor.measurements_mock(num_shots, seed=seed) for executor in executors]
+        return CircuitExecutor._run_backend_batch(get_mock_device(), executors, num_shots=num_shots, seed=seed, memory=True)
     
     
     @staticmethod
-    def from_circuit_data(circuit_data: CircuitData):
+    def from_circuit_data(circuit_data: CircuitData, key: Union[Hashable, None] = None, simplified: Union[CircuitData, None] = None):
+        # simplify (unless already done), the executed circuit and its key are the same for equivalent circuits
+        if simplified is None:
+            simplified = simplify(circuit_data)
         # parse data
-        qc = parse_circuit_data(circuit_data)
-        return CircuitExecutor(qc)
\ No newline at end of file
+        with metrics.stage('parse'):
+            qc = parse_circuit_data(simplified)
+        if key is None:
+            with metrics.stage('hash'):
+                key = circuit_hash(simplified)
+        return CircuitExecutor(qc, key=key, display_circuit_data=None if simplified is circuit_data else circuit_data)
+
+
+def simplify(circuit_data: CircuitData) -> CircuitData:
+    """
+    Simplified circuit to execute, if enabled.
+    """
+    if not settings.simplify:
+        return circuit_data
+    with metrics.stage('simplify'):
+        return simplify_circuit_data(circuit_data)
+
@@ -1,6 +1,6 @@
 from qiskit import QuantumCircuit
 from .circuit_data import CircuitData
-from sympy.parsing.sympy_parser import parse_expr
+from .expression import evaluate_expression
 
 def parse_circuit_data(circuit_data: CircuitData) -> QuantumCircuit:
 
@@ -13,7 +13,7 @@ def parse_circuit_data(circuit_data: CircuitData) -> QuantumCircuit:
         method_name = 'c'*len(operation.controlQubits) + operation.type
         
         # transform parameters
-        parameterValueFloats = list(map(lambda x: float(parse_expr(x.lower()).evalf()), operation.parameterValues))
+        parameterValueFloats = list(map(evaluate_expression, operation.parameterValues))
 
         # get method arguments (order: parameters, control qubits, target qubits)
         method_arguments = parameterValueFloats + operation.controlQubits + operation.targetQubits
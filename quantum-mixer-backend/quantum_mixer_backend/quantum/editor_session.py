@@ -0,0 +1,191 @@
+import threading
+import time
+import uuid
+import numpy as np
+from itertools import product
+from typing import Union
+from qiskit import QuantumCircuit
+from .circuit_data import CircuitData, OperationData, SessionMessage, SessionActionEnum
+from .circuit_parser import parse_circuit_data
+from .statevector_engine import simulate_statevector
+
+class EditorSession:
+
+    def __init__(self, session_id: str, max_memory: int = 32 * 1024 * 1024):
+        """
+        Circuit of an editor, changed by operation deltas.
+
+        The state vector before every operation is kept, so after a change only the operations
+        from the first changed position onward have to be applied again.
+        Cached state vectors use at most max_memory bytes, the states before the first operations are dropped first.
+        Circuits whose state vector alone exceeds max_memory are rejected.
+        """
+        self.id = session_id
+        self.max_memory = max_memory
+        self.lock = threading.Lock()
+        self.last_access = time.monotonic()
+        self.num_qubits = 0
+        self.operations: list[OperationData] = []
+        # parsed single-operation circuits by operation id
+        self._circuits: dict[str, QuantumCircuit] = {}
+        # _states[i] is the state vector before operation _offset + i
+        self._states: list[np.ndarray] = []
+        self._offset = 0
+
+    @property
+    def memory(self) -> int:
+        """
+        Bytes used by cached state vectors.
+        """
+        return sum(state.nbytes for state in self._states)
+
+    def _parse(self, operation: OperationData) -> QuantumCircuit:
+        return parse_circuit_data(CircuitData(numQubits=self.num_qubits, operations=[operation]))
+
+    def _index_of(self, operation_id: str) -> int:
+        for i, operation in enumerate(self.operations):
+            if operation.id == operation_id:
+                return i
+        raise KeyError('Unknown operation {}'.format(operation_id))
+
+    def _invalidate(self, index: int):
+        """
+        Drop cached state vectors after position index.
+        """
+        if index < self._offset:
+            self._states = []
+            self._offset = 0
+        else:
+            del self._states[index - self._offset + 1:]
+
+    @property
+    def max_states(self) -> int:
+        """
+        Number of state vectors which fit into max_memory.
+        """
+        return self.max_memory // (16 * 2 ** self.num_qubits)
+
+    def apply(self, message: SessionMessage):
+        """
+        Apply a change to the circuit. Operations are parsed before the circuit is changed,
+        so an invalid message leaves the session untouched.
+        """
+        self.last_access = time.monotonic()
+
+        if message.action == SessionActionEnum.SET:
+            if 16 * 2 ** message.circuit.numQubits > self.max_memory:
+                raise ValueError('Circuits of editor sessions are limited to {} qubits'.format(int(np.log2(self.max_memory // 16))))
+            circuits = {operation.id: parse_circuit_data(CircuitData(numQubits=message.circuit.numQubits, operations=[operation])) for operation in message.circuit.operations}
+            if len(circuits) < len(message.circuit.operations):
+                raise ValueError('Operation ids must be unique')
+            self.num_qubits = message.circuit.numQubits
+            self.operations = list(message.circuit.operations)
+            self._circuits = circuits
+            self._states = []
+            self._offset = 0
+
+        elif message.action == SessionActionEnum.ADD:
+            if message.operation.id in self._circuits:
+                raise ValueError('Operation {} already exists'.format(message.operation.id))
+            circuit = self._parse(message.operation)
+            index = len(self.operations) if message.index is None else min(max(message.index, 0), len(self.operations))
+            self.operations.insert(index, message.operation)
+            self._circuits[message.operation.id] = circuit
+            self._invalidate(index)
+
+        elif message.action == SessionActionEnum.UPDATE:
+            index = self._index_of(message.operation.id)
+            self._circuits[message.operation.id] = self._parse(message.operation)
+            self.operations[index] = message.operation
+            self._invalidate(index)
+
+        elif message.action == SessionActionEnum.MOVE:
+            old_index = self._index_of(message.id)
+            operation = self.operations.pop(old_index)
+            new_index = len(self.operations) if message.index is None else min(max(message.index, 0), len(self.operations))
+            self.operations.insert(new_index, operation)
+            self._invalidate(min(old_index, new_index))
+
+        elif message.action == SessionActionEnum.REMOVE:
+            index = self._index_of(message.id)
+            self.operations.pop(index)
+            del self._circuits[message.id]
+            self._invalidate(index)
+
+    def probabilities(self) -> tuple[list[str], list[float], int]:
+        """
+        Calculate analytical probabilities, returns bit order, probabilities and the number of operations applied.
+        """
+        self.last_access = time.monotonic()
+        if len(self._states) == 0:
+            initial_state = np.zeros(2 ** self.num_qubits, dtype=complex)
+            initial_state[0] = 1
+            self._states.append(initial_state)
+            self._offset = 0
+
+        # apply operations from the first position without cached state
+        recomputed = 0
+        for operation in self.operations[self._offset + len(self._states) - 1:]:
+            self._states.append(simulate_statevector(self._circuits[operation.id], self._states[-1]))
+            recomputed += 1
+            # keep the states of the last operations, which change most while editing
+            if len(self._states) > self.max_states:
+                self._states.pop(0)
+                self._offset += 1
+
+        probs = np.abs(self._states[-1]) ** 2
+        bit_order = list(map(''.join, product(['0', '1'], repeat=self.num_qubits)))
+        return bit_order, probs.tolist(), recomputed
+
+    def handle(self, message: SessionMessage) -> tuple[list[str], list[float], int]:
+        """
+        Apply a change and return the updated probabilities.
+        """
+        with self.lock:
+            self.apply(message)
+            return self.probabilities()
+
+
+class EditorSessionManager:
+
+    def __init__(self, max_memory: int, idle_timeout: float, max_session_memory: int = 32 * 1024 * 1024):
+        """
+        Keeps editor sessions by id. Sessions idle for longer than idle_timeout seconds are evicted,
+        as are the least recently used sessions while all sessions together use more than max_memory bytes.
+        Every session caches at most max_session_memory bytes, also while its websocket keeps it after eviction.
+        """
+        self.max_memory         = max_memory
+        self.idle_timeout       = idle_timeout
+        self.max_session_memory = max_session_memory
+        self._sessions: dict[str, EditorSession] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id: Union[str, None] = None) -> EditorSession:
+        """
+        Return the session with session_id, or a new session if it does not exist (anymore).
+        """
+        with self._lock:
+            session = self._sessions.get(session_id) if session_id is not None else None
+            if session is None:
+                session = EditorSession(session_id or uuid.uuid4().hex, self.max_session_memory)
+                self._sessions[session.id] = session
+            session.last_access = time.monotonic()
+            return session
+
+    def evict(self):
+        """
+        Remove idle sessions and the least recently used sessions above the memory cap.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for session_id in [s.id for s in self._sessions.values() if now - s.last_access > self.idle_timeout]:
+                del self._sessions[session_id]
+            total_memory = sum(session.memory for session in self._sessions.values())
+            for session in sorted(self._sessions.values(), key=lambda s: s.last_access):
+                if total_memory <= self.max_memory:
+                    break
+                del self._sessions[session.id]
+                total_memory -= session.memory
@@ -0,0 +1,53 @@
+import ast
+import math
+import operator
+from functools import lru_cache
+
+CONSTANTS = {
+    'pi': math.pi
+}
+
+BINARY_OPERATORS = {
+    ast.Add:  operator.add,
+    ast.Sub:  operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div:  operator.truediv
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg
+}
+
+class UnsupportedExpressionError(ValueError):
+    pass
+
+
+def _evaluate_node(node: ast.AST) -> float:
+    """
+    Evaluate a node of the syntax tree, only numbers, pi, + - * / and parentheses are allowed.
+    """
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in CONSTANTS:
+        return CONSTANTS[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        return BINARY_OPERATORS[type(node.op)](_evaluate_node(node.left), _evaluate_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](_evaluate_node(node.operand))
+    raise UnsupportedExpressionError(ast.dump(node))
+
+
+@lru_cache(maxsize=4096)
+def evaluate_expression(expression: str) -> float:
+    """
+    Evaluate a parameter expression (case insensitive) to a float.
+    Expressions beyond the simple arithmetic produced by the composer are evaluated with sympy.
+    """
+    expression = expression.lower()
+    try:
+        return float(_evaluate_node(ast.parse(expression.strip(), mode='eval').body))
+    except (SyntaxError, UnsupportedExpressionError, ZeroDivisionError):
+        # sympy is slow to import and to parse, only use it as fallback
+        from sympy.parsing.sympy_parser import parse_expr
+        return float(parse_expr(expression).evalf())
@@ -0,0 +1,92 @@
+import numpy as np
+from typing import Union
+from ..metrics import metrics
+from .circuit_data import CircuitData, DeviceEnum
+from .cache import circuit_hash
+from .circuit_executor import CircuitExecutor, sampler, simplify
+from .sampling import Sampler
+from .settings import settings
+
+# Jobs are module-level functions taking plain data, so they can be sent to a process pool.
+# They work on lists of circuits, so a batch of circuits is executed as one backend job per device.
+
+def compute_result_keys(circuit_datas: list[CircuitData]) -> tuple[list[str], list[Union[CircuitData, None]]]:
+    """
+    Simplify circuits and compute the keys of their results, the hashes of the simplified circuits.
+    Also returns the simplified circuits (None if a circuit did not change) to pass on to create_executors.
+    """
+    simplified = [simplify(circuit_data) for circuit_data in circuit_datas]
+    with metrics.stage('hash'):
+        keys = [circuit_hash(circuit_data) for circuit_data in simplified]
+    return keys, [None if simple is circuit_data else simple for simple, circuit_data in zip(simplified, circuit_datas)]
+
+
+def create_executors(circuit_datas: list[CircuitData], keys: Union[list[str], None] = None, simplified: Union[list[Union[CircuitData, None]], None] = None) -> list[CircuitExecutor]:
+    """
+    Parse circuits and create their executors, pass the result keys and simplified circuits of compute_result_keys if they are known.
+    """
+    if keys is None or simplified is None:
+        return [CircuitExecutor.from_circuit_data(circuit_data) for circuit_data in circuit_datas]
+    return [
+        CircuitExecutor.from_circuit_data(circuit_data, key=key, simplified=circuit_data if simple is None else simple)
+        for circuit_data, key, simple in zip(circuit_datas, keys, simplified)
+    ]
+
+
+def compute_device_probabilities(executors: list[CircuitExecutor], device: DeviceEnum) -> list[np.ndarray]:
+    """
+    Compute the probabilities of circuits on a device, each ordered like its executor.bit_order.
+    """
+    if device == DeviceEnum.ANALYTICAL:
+        return CircuitExecutor.probabilities_analytical_batch(executors)
+    elif device == DeviceEnum.QASM:
+        return CircuitExecutor.probabilities_qasm_batch(executors)
+    elif device == DeviceEnum.MOCK_EXACT:
+        return CircuitExecutor.probabilities_mock_exact_batch(executors)
+    return CircuitExecutor.probabilities_mock_batch(executors)
+
+
+def compute_drawings(executors: list[CircuitExecutor]) -> list[str]:
+    """
+    Get ASCII drawings of circuits (as entered, not simplified).
+    """
+    with metrics.stage('draw'):
+        return [executor.display_circuit.draw('text').__str__() for executor in executors]
+
+
+def compute_qasms(executors: list[CircuitExecutor]) -> list[str]:
+    """
+    Get the QASM code of circuits (as entered, not simplified).
+    """
+    with metrics.stage('qasm_code'):
+        return [executor.display_circuit.qasm() for executor in executors]
+
+
+def measure(executors: list[CircuitExecutor], shots: int, device: DeviceEnum, seed: Union[int, None] = None) -> list[np.ndarray]:
+    """
+    Measure parsed circuits shots times on a device in a single job.
+    Returns for each circuit the measured indices into bit_order.
+    """
+    if device == DeviceEnum.QASM:
+        return CircuitExecutor.measurements_qasm_batch(executors, num_shots=shots, seed=seed)
+    elif device == DeviceEnum.MOCK_EXACT:
+        return CircuitExecutor.measurements_mock_exact_batch(executors, num_shots=shots, seed=seed)
+    return CircuitExecutor.measurements_mock_batch(executors, num_shots=shots, seed=seed)
+
+
+def compute_measurements(circuit_datas: list[CircuitData], shots: int, device: DeviceEnum, seed: Union[int, None] = None) -> list[np.ndarray]:
+    """
+    Measure circuits shots times on a device in a single job.
+    """
+    if shots == 0:
+        # backends reject jobs without shots
+        return [np.zeros(0, dtype=np.int64) for _ in circuit_datas]
+    if settings.sampling_engine == 'numpy' or device == DeviceEnum.MOCK_EXACT:
+        # circuits with a known distribution are sampled without parsing them
+        keys, simplified = compute_result_keys(circuit_datas)
+        distributions = [sampler.cached_distribution(key, device) for key in keys]
+        if all(distribution is not None for distribution in distributions):
+            with metrics.stage('sample'):
+                return [Sampler.sample(distribution, shots, seed=seed, memory=True) for distribution in distributions]
+        return measure(create_executors(circuit_datas, keys, simplified), shots, device, seed=seed)
+    return measure(create_executors(circuit_datas), shots, device, seed=seed)
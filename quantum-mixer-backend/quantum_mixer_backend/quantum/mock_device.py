@@ -0,0 +1,161 @@
+import numpy as np
+from typing import Hashable, Union
+from qiskit import QuantumCircuit
+from qiskit.providers.models import BackendProperties
+from qiskit_aer import AerSimulator
+from qiskit_aer.noise import NoiseModel
+from ..metrics import metrics
+from .cache import LRUCache
+from .transpiler import transpile
+
+class MockDevice:
+
+    def __init__(self, backend, max_transpiled: int = 256, max_layouts: int = 64):
+        """
+        Precompiled noisy simulator of a fake device.
+
+        The device configuration is loaded once and transpiled circuits are memoized per circuit key.
+        Circuits are run on a simulator whose noise model only covers the physical qubits in use,
+        which avoids loading the noise of all device qubits into Aer on every run.
+        """
+        self.backend    = backend
+        self.target     = AerSimulator.from_backend(backend)
+        self.dt         = backend.configuration().dt
+        self.properties = backend.properties().to_dict()
+        self._transpiled = LRUCache(max_entries=max_transpiled)
+        self._simulators = LRUCache(max_entries=max_layouts)
+
+    def _compact(self, circuit: QuantumCircuit) -> tuple[QuantumCircuit, tuple[int]]:
+        """
+        Map a transpiled circuit from all device qubits to the physical qubits it uses.
+        """
+        physical_qubits = tuple(sorted({circuit.find_bit(q).index for instruction in circuit.data for q in instruction.qubits}))
+        mapping = {p: i for i, p in enumerate(physical_qubits)}
+        compact = QuantumCircuit(len(physical_qubits), circuit.num_clbits)
+        for instruction in circuit.data:
+            compact.append(
+                instruction.operation,
+                [mapping[circuit.find_bit(q).index] for q in instruction.qubits],
+                [circuit.find_bit(c).index for c in instruction.clbits]
+            )
+        return compact, physical_qubits
+
+    def transpile(self, circuits: list[QuantumCircuit], keys: Union[list[Hashable], None] = None) -> list[tuple[QuantumCircuit, tuple[int]]]:
+        """
+        Transpile circuits for the device, returns the compact circuits and the physical qubits they use.
+        Circuits not found in the cache are transpiled together in a single call.
+        """
+        keys = keys or [None] * len(circuits)
+        transpiled = [self._transpiled.get(key) if key is not None else None for key in keys]
+        todo = [i for i, item in enumerate(transpiled) if item is None]
+        if len(todo) > 0:
+            with metrics.stage('transpile'):
+                new_circuits = transpile([circuits[i] for i in todo], self.target)
+                compacts = [self._compact(new_circuit) for new_circuit in new_circuits]
+            for i, compact in zip(todo, compacts):
+                transpiled[i] = compact
+                if keys[i] is not None:
+                    self._transpiled.put(keys[i], transpiled[i])
+        return transpiled
+
+    def simulator(self, physical_qubits: tuple[int], exact: bool = False) -> AerSimulator:
+        """
+        Simulator with the noise model of the given physical qubits (relabeled to 0..n-1).
+        The exact simulator evolves the density matrix and leaves out readout errors (see exact_probabilities).
+        """
+        simulator = self._simulators.get((physical_qubits, exact))
+        if simulator is None:
+            with metrics.stage('noise_model'):
+                mapping = {p: i for i, p in enumerate(physical_qubits)}
+                properties = {
+                    **self.properties,
+                    'qubits': [self.properties['qubits'][p] for p in physical_qubits],
+                    'gates': [
+                        {**gate, 'qubits': [mapping[q] for q in gate['qubits']]}
+                        for gate in self.properties['gates'] if all(q in mapping for q in gate['qubits'])
+                    ]
+                }
+                noise_model = NoiseModel.from_backend_properties(BackendProperties.from_dict(properties), readout_error=not exact, dt=self.dt)
+                simulator = AerSimulator(method='density_matrix', noise_model=noise_model) if exact else AerSimulator(noise_model=noise_model)
+            self._simulators.put((physical_qubits, exact), simulator)
+        return simulator
+
+    def readout_confusion(self, physical_qubit: int) -> np.ndarray:
+        """
+        Readout confusion matrix of a physical qubit, entry [measured, prepared] (as Aer's readout error from the properties).
+        """
+        values = {item['name']: item['value'] for item in self.properties['qubits'][physical_qubit]}
+        p01 = values.get('prob_meas0_prep1', values.get('readout_error', 0))
+        p10 = values.get('prob_meas1_prep0', values.get('readout_error', 0))
+        return np.array([[1 - p10, p01], [p10, 1 - p01]])
+
+    @staticmethod
+    def _without_measurements(compact: QuantumCircuit) -> tuple[QuantumCircuit, list[int]]:
+        """
+        Copy of a compact circuit without its final measurements, saving the probabilities of the measured qubits
+        ordered by classical bit instead. Returns the circuit and the measured qubit of every classical bit.
+        """
+        circuit = QuantumCircuit(compact.num_qubits)
+        measured = [None] * compact.num_clbits
+        for instruction in compact.data:
+            qubits = [compact.find_bit(q).index for q in instruction.qubits]
+            if instruction.operation.name == 'measure':
+                measured[compact.find_bit(instruction.clbits[0]).index] = qubits[0]
+            else:
+                circuit.append(instruction.operation, qubits)
+        circuit.save_probabilities(measured)
+        return circuit, measured
+
+    def _apply_readout(self, probabilities: np.ndarray, physical_qubits: list[int]) -> np.ndarray:
+        """
+        Apply the readout confusion of the physical qubit of every classical bit (bit c is axis n-1-c).
+        """
+        n = len(physical_qubits)
+        tensor = probabilities.reshape((2,) * n)
+        for clbit, physical_qubit in enumerate(physical_qubits):
+            axis = n - 1 - clbit
+            tensor = np.moveaxis(np.tensordot(self.readout_confusion(physical_qubit), tensor, axes=([1], [axis])), 0, axis)
+        return tensor.reshape(-1)
+
+    def exact_probabilities(self, circuits: list[QuantumCircuit], keys: Union[list[Hashable], None] = None, max_qubits: int = 10) -> list[Union[np.ndarray, None]]:
+        """
+        Noisy outcome distributions without sampling: the density matrix is evolved under the gate errors and
+        thermal relaxation of the calibration data, then the readout confusion matrices are applied.
+        Equals the distribution sampled by run_batch. Circuits using more than max_qubits physical qubits get None.
+        """
+        probabilities = [None] * len(circuits)
+        groups: dict[tuple[int], list[tuple[int, QuantumCircuit, list[int]]]] = {}
+        for i, (compact, physical_qubits) in enumerate(self.transpile(circuits, keys)):
+            if len(physical_qubits) <= max_qubits:
+                circuit, measured = self._without_measurements(compact)
+                groups.setdefault(physical_qubits, []).append((i, circuit, [physical_qubits[q] for q in measured]))
+        # run one job per qubit layout
+        for physical_qubits, items in groups.items():
+            simulator = self.simulator(physical_qubits, exact=True)
+            with metrics.stage('aer_run'):
+                result = simulator.run([circuit for _, circuit, _ in items]).result()
+            with metrics.stage('readout'):
+                for experiment, (i, _, measured_physical) in enumerate(items):
+                    probabilities[i] = self._apply_readout(np.asarray(result.data(experiment)['probabilities']), measured_physical)
+        return probabilities
+
+    def run_batch(self, circuits: list[QuantumCircuit], keys: Union[list[Hashable], None] = None, **run_options) -> list[tuple]:
+        """
+        Run several circuits with one job per qubit layout.
+        Returns for each circuit the result of its job and its experiment index in that result.
+        """
+        # group compact circuits by the physical qubits they use
+        groups: dict[tuple[int], list[int]] = {}
+        compacts = []
+        for i, (compact, physical_qubits) in enumerate(self.transpile(circuits, keys)):
+            compacts.append(compact)
+            groups.setdefault(physical_qubits, []).append(i)
+        # run one job per group
+        experiments = [None] * len(circuits)
+        for physical_qubits, indices in groups.items():
+            simulator = self.simulator(physical_qubits)
+            with metrics.stage('aer_run'):
+                result = simulator.run([compacts[i] for i in indices], **run_options).result()
+            for experiment, i in enumerate(indices):
+                experiments[i] = (result, experiment)
+        return experiments
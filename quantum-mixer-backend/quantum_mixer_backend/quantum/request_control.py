@@ -0,0 +1,113 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Union
+from fastapi import HTTPException, Request
+
+class ClientDisconnectedError(HTTPException):
+
+    def __init__(self):
+        # nginx' status for requests closed by the client, nobody receives it
+        super().__init__(status_code=499, detail='Client closed request')
+
+
+class SupersededError(HTTPException):
+
+    def __init__(self):
+        super().__init__(status_code=409, detail='Superseded by a newer request of the same editor')
+
+
+class _Flight:
+
+    def __init__(self, task: asyncio.Task):
+        self.task    = task
+        self.waiters = 0
+
+
+class SingleFlight:
+
+    def __init__(self):
+        """
+        Concurrent calls with the same key share one computation. The computation is cancelled
+        once no caller waits for it anymore.
+        """
+        self._flights: dict[Hashable, _Flight] = {}
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._flights)
+
+    def _remove(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable]) -> Any:
+        """
+        Return the result of fn(), or of the running computation with the same key.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda _: self._remove(key, flight))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            # a cancelled caller must not cancel the computation of the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._remove(key, flight)
+
+
+async def wait_for_disconnect(request: Request):
+    """
+    Return once the client disconnected. The body must have been read already.
+    """
+    while True:
+        message = await request.receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+class RequestCanceller:
+
+    def __init__(self):
+        """
+        Cancels the work of a request when its client disconnects, or when a newer request with the same
+        editor token arrives (e.g. the probabilities of a circuit which has changed since).
+        """
+        self._latest: dict[str, asyncio.Task] = {}
+        self.cancelled = 0
+
+    def _remove(self, token: str, task: asyncio.Task):
+        if self._latest.get(token) is task:
+            del self._latest[token]
+
+    async def run(self, request: Request, awaitable: Awaitable, token: Union[str, None] = None) -> Any:
+        """
+        Await awaitable unless the client disconnects (499) or it is superseded (409) before.
+        """
+        task = asyncio.ensure_future(awaitable)
+        if token is not None:
+            previous = self._latest.get(token)
+            if previous is not None and not previous.done():
+                previous.cancel()
+                self.cancelled += 1
+            self._latest[token] = task
+            task.add_done_callback(lambda _: self._remove(token, task))
+        disconnect = asyncio.ensure_future(wait_for_disconnect(request))
+        try:
+            await asyncio.wait({task, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            disconnect.cancel()
+        if not task.done():
+            task.cancel()
+            self.cancelled += 1
+            raise ClientDisconnectedError()
+        if task.cancelled():
+            raise SupersededError()
+        return task.result()
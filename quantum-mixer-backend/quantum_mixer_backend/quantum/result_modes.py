@@ -0,0 +1,72 @@
+import numpy as np
+from typing import Union
+from fastapi import HTTPException
+from .circuit_data import ResultModeEnum
+
+# A reduced result holds the indices (binary representation of the bit configuration, as in bit_order)
+# and probabilities of selected outcomes. Bit strings are only formatted for these outcomes,
+# so the list of all 2^n bit configurations is never built.
+
+def format_bits(indices: np.ndarray, num_bits: int) -> list[str]:
+    """
+    Bit configurations of indices, e.g. 5 -> '101' for three bits.
+    """
+    return [format(int(i), '0{}b'.format(num_bits)) for i in indices]
+
+
+def parse_qubits(value: Union[str, None], num_qubits: int) -> list[int]:
+    """
+    Parse a comma separated list of qubits, sorted from the highest to the lowest qubit
+    (the order of their bits in a bit configuration).
+    """
+    try:
+        qubits = sorted({int(item) for item in (value or '').split(',') if item.strip() != ''}, reverse=True)
+    except ValueError:
+        raise HTTPException(status_code=422, detail='Invalid value for qubits: {}'.format(value))
+    if len(qubits) == 0 or qubits[0] >= num_qubits or qubits[-1] < 0:
+        raise HTTPException(status_code=422, detail='qubits must be a non-empty list of qubits between 0 and {}'.format(num_qubits - 1))
+    return qubits
+
+
+def sparse(probabilities: np.ndarray, epsilon: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Outcomes with a probability above epsilon.
+    """
+    indices = np.flatnonzero(probabilities > epsilon)
+    return indices, probabilities[indices]
+
+
+def top_k(probabilities: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The k most probable outcomes, most probable first.
+    """
+    k = min(k, probabilities.size)
+    # partial sort, only the selected k outcomes are sorted
+    indices = np.argpartition(probabilities, probabilities.size - k)[probabilities.size - k:]
+    # ties in the order of bit configurations
+    indices = indices[np.lexsort((indices, -probabilities[indices]))]
+    return indices, probabilities[indices]
+
+
+def marginal(probabilities: np.ndarray, num_qubits: int, qubits: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Probabilities of the bit configurations of qubits (sorted from the highest qubit), summed over all other qubits.
+    """
+    # qiskit orders qubits little-endian, qubit q is axis num_qubits-1-q; the kept axes stay in order
+    summed = tuple(num_qubits - 1 - q for q in range(num_qubits) if q not in qubits)
+    values = probabilities.reshape((2,) * num_qubits).sum(axis=summed).reshape(-1)
+    return np.arange(values.size), values
+
+
+def reduce_probabilities(probabilities: np.ndarray, num_qubits: int, mode: ResultModeEnum, epsilon: float = 1e-9, k: int = 16, qubits: Union[list[int], None] = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce the dense probabilities of a circuit to the outcomes of a result mode.
+    """
+    probabilities = np.asarray(probabilities)
+    if mode == ResultModeEnum.SPARSE:
+        return sparse(probabilities, epsilon)
+    if mode == ResultModeEnum.TOP:
+        return top_k(probabilities, k)
+    if mode == ResultModeEnum.MARGINAL:
+        return marginal(probabilities, num_qubits, qubits)
+    return np.arange(probabilities.size), probabilities
@@ -0,0 +1,43 @@
+import numpy as np
+from typing import Callable, Hashable, Union
+from .cache import LRUCache
+
+class Sampler:
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Draws shots from the probability distribution of a circuit instead of simulating every shot.
+        Distributions are computed once per circuit and device and kept in an LRU cache.
+        """
+        self.distributions = LRUCache(max_entries=max_entries)
+
+    def cached_distribution(self, key: Union[Hashable, None], device: str) -> Union[np.ndarray, None]:
+        """
+        Return the cached distribution of a circuit on a device, or None.
+        """
+        return self.distributions.get((key, device)) if key is not None else None
+
+    def distribution(self, key: Union[Hashable, None], device: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Return the distribution of a circuit on a device, calling compute() if it is not cached.
+        Circuits without key are not cached.
+        """
+        probabilities = self.cached_distribution(key, device)
+        if probabilities is None:
+            probabilities = np.asarray(compute(), dtype=float)
+            # remove rounding errors, numpy requires probabilities summing up to 1
+            probabilities = probabilities / probabilities.sum()
+            if key is not None:
+                self.distributions.put((key, device), probabilities)
+        return probabilities
+
+    @staticmethod
+    def sample(probabilities: np.ndarray, num_shots: int, seed: Union[int, None] = None, memory: bool = False) -> np.ndarray:
+        """
+        Draw num_shots shots. Returns the counts per index (or the index of every shot, if memory is set).
+        The same seed gives the same shots.
+        """
+        rng = np.random.default_rng(seed)
+        if memory:
+            return rng.choice(probabilities.size, size=num_shots, p=probabilities)
+        return rng.multinomial(num_shots, probabilities)
@@ -0,0 +1,37 @@
+import os
+from typing import Literal
+from pydantic import BaseSettings
+
+class QuantumSettings(BaseSettings):
+    """
+    Settings of the quantum endpoints, read from environment variables prefixed with QUANTUM_.
+    """
+    cache_max_entries: int = 1024
+    cache_ttl: float = 3600
+    cache_sampled_devices: bool = False
+    pool_kind: Literal['thread', 'process'] = 'thread'
+    pool_size: int = os.cpu_count() or 1
+    pool_queue_depth: int = 16
+    pool_timeout: float = 30
+    stage_timeout: float = 10
+    stage_timeout_mock: float = 5
+    stream_chunk_size: int = 100
+    stream_max_chunk_size: int = 10000
+    session_max_memory: int = 64 * 1024 * 1024
+    session_max_state_memory: int = 32 * 1024 * 1024
+    session_idle_timeout: float = 600
+    transpile_cache_max_entries: int = 256
+    statevector_engine: Literal['numpy', 'aer'] = 'numpy'
+    warmup: bool = True
+    sampling_engine: Literal['aer', 'numpy'] = 'aer'
+    sampling_cache_max_entries: int = 1024
+    sampling_mock_shots: int = 8192
+    mock_exact_max_qubits: int = 10
+    max_qubits: int = 20
+    max_batch_size: int = 64
+    simplify: bool = True
+
+    class Config:
+        env_prefix = 'QUANTUM_'
+
+settings = QuantumSettings()
@@ -0,0 +1,114 @@
+import math
+from typing import Union
+from .circuit_data import CircuitData, OperationData, OperationTypeEnum
+from .expression import evaluate_expression
+
+# gates which are their own inverse, two in a row cancel out
+SELF_INVERSE = {OperationTypeEnum.HADAMARD, OperationTypeEnum.NOT, OperationTypeEnum.Z, OperationTypeEnum.SWAP}
+
+# angles are rounded after merging, so equivalent sums (pi/4 + pi/4 and pi/2) are equal
+ANGLE_DIGITS = 12
+
+def _format_angle(angle: float, digits: Union[int, None] = None) -> str:
+    # adding 0.0 turns -0.0 into 0.0
+    return repr((angle if digits is None else round(angle, digits)) + 0.0)
+
+
+def _is_identity_rotation(operation: OperationData) -> bool:
+    """
+    RY(4*pi*n) is the identity. RY(2*pi) is -I, only a global phase if the rotation is not controlled.
+    """
+    period = 4 * math.pi if len(operation.controlQubits) > 0 else 2 * math.pi
+    return round(math.remainder(float(operation.parameterValues[0]), period), ANGLE_DIGITS) == 0
+
+
+def _normalize(operation: OperationData) -> OperationData:
+    """
+    Canonical form of an operation: sorted controls, evaluated parameters and interchangeable qubits in order.
+    """
+    controls, targets = sorted(operation.controlQubits), list(operation.targetQubits)
+    if operation.type == OperationTypeEnum.SWAP:
+        targets = sorted(targets)
+    elif operation.type == OperationTypeEnum.Z:
+        # a controlled Z is symmetric in all its qubits, the highest qubit is the target
+        qubits = sorted(controls + targets)
+        controls, targets = qubits[:-1], qubits[-1:]
+    return operation.copy(update={
+        'controlQubits': controls,
+        'targetQubits': targets,
+        'parameterValues': [_format_angle(evaluate_expression(p)) for p in operation.parameterValues]
+    })
+
+
+def simplify_operations(operations: list[OperationData]) -> list[OperationData]:
+    """
+    Remove identities, cancel adjacent pairs of self-inverse gates and merge adjacent RY rotations.
+    Operations are adjacent if no other operation acts on any of their qubits in between.
+    """
+    result: list[Union[OperationData, None]] = []
+    # qubit -> indices into result of the remaining operations on the qubit
+    stacks: dict[int, list[int]] = {}
+
+    def remove(index: int):
+        for qubit in result[index].controlQubits + result[index].targetQubits:
+            stacks[qubit].pop()
+        result[index] = None
+
+    for operation in map(_normalize, operations):
+        if operation.type == OperationTypeEnum.IDENTITY:
+            continue
+        if operation.type == OperationTypeEnum.RY and _is_identity_rotation(operation):
+            continue
+        qubits = operation.controlQubits + operation.targetQubits
+
+        # the last operation on all qubits of this operation, if it is the same for all
+        previous_indices = {stacks[q][-1] if len(stacks.get(q, [])) > 0 else None for q in qubits}
+        previous_index = previous_indices.pop() if len(previous_indices) == 1 else None
+        previous = result[previous_index] if previous_index is not None else None
+        if previous is not None and previous.type == operation.type and previous.controlQubits == operation.controlQubits and previous.targetQubits == operation.targetQubits:
+            if operation.type in SELF_INVERSE:
+                remove(previous_index)
+                continue
+            if operation.type == OperationTypeEnum.RY:
+                merged = previous.copy(update={'parameterValues': [_format_angle(float(previous.parameterValues[0]) + float(operation.parameterValues[0]))]})
+                if _is_identity_rotation(merged):
+                    remove(previous_index)
+                else:
+                    result[previous_index] = merged
+                continue
+
+        result.append(operation)
+        for qubit in qubits:
+            stacks.setdefault(qubit, []).append(len(result) - 1)
+
+    return [operation for operation in result if operation is not None]
+
+
+def order_operations(operations: list[OperationData]) -> list[OperationData]:
+    """
+    Canonical order: operations are placed in the earliest layer after the operations on their qubits,
+    and sorted by their lowest qubit within a layer. Operations of a layer act on different qubits and commute.
+    """
+    depths: dict[int, int] = {}
+    layered = []
+    for operation in operations:
+        qubits = operation.controlQubits + operation.targetQubits
+        layer = 1 + max(depths.get(q, -1) for q in qubits)
+        for qubit in qubits:
+            depths[qubit] = layer
+        layered.append((layer, min(qubits), operation))
+    return [operation for _, _, operation in sorted(layered, key=lambda item: item[:2])]
+
+
+def simplify_circuit_data(circuit_data: CircuitData) -> CircuitData:
+    """
+    Equivalent circuit with fewer operations in canonical order, equivalent circuits often simplify to the same one.
+    Returns circuit_data itself if nothing changed.
+    """
+    operations = [
+        operation.copy(update={'parameterValues': [_format_angle(float(p), ANGLE_DIGITS) for p in operation.parameterValues]})
+        for operation in order_operations(simplify_operations(circuit_data.operations))
+    ]
+    if operations == circuit_data.operations:
+        return circuit_data
+    return circuit_data.copy(update={'operations': operations})
@@ -0,0 +1,97 @@
+import numpy as np
+from functools import lru_cache
+from typing import Sequence, Union
+from qiskit import QuantumCircuit
+from qiskit.circuit import ControlledGate, Gate
+
+# instructions without effect on the state vector
+SKIPPED_INSTRUCTIONS = {'measure', 'barrier', 'delay'}
+
+class UnsupportedOperationError(ValueError):
+    pass
+
+
+# matrices of the parameterless gates of the composer
+FIXED_MATRICES = {
+    'h':    np.array([[1, 1], [1, -1]], dtype=complex) / np.sqrt(2),
+    'x':    np.array([[0, 1], [1, 0]], dtype=complex),
+    'z':    np.array([[1, 0], [0, -1]], dtype=complex),
+    'id':   np.eye(2, dtype=complex),
+    'swap': np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]], dtype=complex)
+}
+
+@lru_cache(maxsize=1024)
+def ry_matrix(theta: float) -> np.ndarray:
+    cos, sin = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[cos, -sin], [sin, cos]], dtype=complex)
+
+
+def gate_matrix(gate: Gate) -> np.ndarray:
+    """
+    Matrix of a gate, using precomputed matrices for the composer gate set.
+    """
+    if gate.name in FIXED_MATRICES:
+        return FIXED_MATRICES[gate.name]
+    if gate.name == 'ry':
+        return ry_matrix(float(gate.params[0]))
+    try:
+        return np.asarray(gate.to_matrix(), dtype=complex)
+    except Exception as e:
+        raise UnsupportedOperationError('Unable to get matrix for {}'.format(gate.name)) from e
+
+
+def apply_gate(state: np.ndarray, num_qubits: int, matrix: np.ndarray, targets: Sequence[int], controls: Sequence[int] = (), ctrl_state: int = None) -> np.ndarray:
+    """
+    Apply a (multi-)controlled gate in-place to a state vector.
+
+    The state vector is viewed as a tensor with one axis per qubit. Qiskit orders qubits little-endian,
+    so qubit q is axis num_qubits-1-q. Controls are applied by slicing their axes, the gate matrix is
+    contracted with the target axes of the remaining sub-tensor.
+    """
+    psi = state.reshape((2,) * num_qubits)
+    ctrl_state = (1 << len(controls)) - 1 if ctrl_state is None else ctrl_state
+
+    # select the sub-tensor where all controls are in their control state
+    index = [slice(None)] * num_qubits
+    for i, control in enumerate(controls):
+        index[num_qubits - 1 - control] = (ctrl_state >> i) & 1
+    index = tuple(index)
+    sub = psi[index]
+
+    # axes of targets in the sub-tensor, most significant target first (as in the gate matrix)
+    free_axes   = [axis for axis in range(num_qubits) if isinstance(index[axis], slice)]
+    target_axes = [free_axes.index(num_qubits - 1 - t) for t in reversed(targets)]
+
+    # contract gate with target axes and move resulting axes back into place
+    k = len(targets)
+    gate = matrix.reshape((2,) * (2 * k))
+    result = np.tensordot(gate, sub, axes=(list(range(k, 2 * k)), target_axes))
+    psi[index] = np.moveaxis(result, list(range(k)), target_axes)
+    return state
+
+
+def simulate_statevector(circuit: QuantumCircuit, initial_state: Union[np.ndarray, None] = None) -> np.ndarray:
+    """
+    Calculate the final state vector of a circuit starting in |0...0> or a copy of initial_state.
+    """
+    num_qubits = circuit.num_qubits
+    if initial_state is None:
+        state = np.zeros(2 ** num_qubits, dtype=complex)
+        state[0] = 1
+    else:
+        state = np.array(initial_state, dtype=complex)
+
+    for instruction in circuit.data:
+        operation = instruction.operation
+        if operation.name in SKIPPED_INSTRUCTIONS:
+            continue
+        if not isinstance(operation, Gate):
+            raise UnsupportedOperationError('Unable to simulate {}'.format(operation.name))
+        qubits = [circuit.find_bit(q).index for q in instruction.qubits]
+        if isinstance(operation, ControlledGate):
+            num_ctrl = operation.num_ctrl_qubits
+            apply_gate(state, num_qubits, gate_matrix(operation.base_gate), qubits[num_ctrl:], qubits[:num_ctrl], operation.ctrl_state)
+        else:
+            apply_gate(state, num_qubits, gate_matrix(operation), qubits)
+
+    return state
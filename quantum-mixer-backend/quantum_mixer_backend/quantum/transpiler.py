@@ -0,0 +1,12 @@
+import threading
+from qiskit import transpile as qiskit_transpile
+
+# the transpiler is not thread-safe (passes share state of the target), jobs on a thread pool transpile one at a time
+_lock = threading.Lock()
+
+def transpile(circuits, backend):
+    """
+    Transpile circuits for a backend, holding the transpiler lock of this process.
+    """
+    with _lock:
+        return qiskit_transpile(circuits, backend)
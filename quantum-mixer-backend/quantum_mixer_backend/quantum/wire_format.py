@@ -0,0 +1,143 @@
+import struct
+from typing import Union
+import numpy as np
+from fastapi import Request
+from .circuit_data import DeviceEnum
+from .circuit_executor import get_bit_order
+from .result_modes import format_bits
+
+# Compact binary encoding, selected with "Accept: application/vnd.quantum-mixer.binary".
+# All numbers are little-endian. Strings are encoded as uint32 length followed by UTF-8 bytes,
+# a missing string has length 0xFFFFFFFF. Bit configurations are implied by their index i,
+# the binary representation of i (as in bit_order).
+#
+# probabilities:
+#   'QMP1' | uint8 numQubits | uint8 numDevices | numDevices x (string device | float32[2^numQubits])
+#          | uint8 numMissing | numMissing x string device | string circuit | string qasm
+# reduced probabilities (sparse, top and marginal mode), numBits is the number of qubits of the bit configurations:
+#   'QMR1' | uint8 numBits | uint8 numDevices | numDevices x (string device | uint32 count | uint32[count] indices | float32[count])
+#          | uint8 numMissing | numMissing x string device | string circuit | string qasm
+# measurements:
+#   'QMM1' | uint8 numQubits | uint32 shots | string device | uint8 aggregated
+#          | aggregated ? uint32[2^numQubits] counts : uint32[shots] measured indices
+# batches:
+#   'QMB1' | uint32 numItems | numItems x (uint32 length | item)
+
+BINARY_MEDIA_TYPE = 'application/vnd.quantum-mixer.binary'
+
+NO_STRING = 0xFFFFFFFF
+
+def accepts_binary(request: Request) -> bool:
+    """
+    Check if the client asked for the binary encoding.
+    """
+    return BINARY_MEDIA_TYPE in request.headers.get('accept', '')
+
+
+def _encode_string(value: Union[str, None]) -> bytes:
+    if value is None:
+        return struct.pack('<I', NO_STRING)
+    encoded = value.encode('utf-8')
+    return struct.pack('<I', len(encoded)) + encoded
+
+
+def encode_probabilities(item: dict, num_qubits: int) -> bytes:
+    """
+    Encode a probabilities result with probabilities as float32 arrays.
+    """
+    parts = [b'QMP1', struct.pack('<BB', num_qubits, len(item['results']))]
+    for device, probabilities in item['results'].items():
+        parts.append(_encode_string(DeviceEnum(device).value))
+        parts.append(np.asarray(probabilities, dtype='<f4').tobytes())
+    parts.append(_encode_trailer(item))
+    return b''.join(parts)
+
+
+def encode_reduced_probabilities(item: dict, num_bits: int) -> bytes:
+    """
+    Encode a reduced probabilities result, results hold (indices, probabilities) per device.
+    """
+    parts = [b'QMR1', struct.pack('<BB', num_bits, len(item['results']))]
+    for device, (indices, probabilities) in item['results'].items():
+        parts.append(_encode_string(DeviceEnum(device).value))
+        parts.append(struct.pack('<I', len(indices)))
+        parts.append(np.asarray(indices, dtype='<u4').tobytes())
+        parts.append(np.asarray(probabilities, dtype='<f4').tobytes())
+    parts.append(_encode_trailer(item))
+    return b''.join(parts)
+
+
+def _encode_trailer(item: dict) -> bytes:
+    """
+    Missing devices, drawing and QASM code of a probabilities result.
+    """
+    parts = []
+    missing = item.get('missing', [])
+    parts.append(struct.pack('<B', len(missing)))
+    parts.extend(_encode_string(DeviceEnum(device).value) for device in missing)
+    parts.append(_encode_string(item.get('circuit')))
+    parts.append(_encode_string(item.get('qasm')))
+    return b''.join(parts)
+
+
+def encode_measurements(indices: np.ndarray, num_qubits: int, device: DeviceEnum, aggregate: bool = False) -> bytes:
+    """
+    Encode measured indices into bit_order, or their counts if aggregated.
+    """
+    values = np.bincount(indices, minlength=2 ** num_qubits) if aggregate else indices
+    return b''.join([
+        b'QMM1',
+        struct.pack('<BI', num_qubits, len(indices)),
+        _encode_string(DeviceEnum(device).value),
+        struct.pack('<B', aggregate),
+        np.asarray(values, dtype='<u4').tobytes()
+    ])
+
+
+def encode_batch(items: list[bytes]) -> bytes:
+    """
+    Encode a list of encoded items.
+    """
+    return b''.join([b'QMB1', struct.pack('<I', len(items)), *[struct.pack('<I', len(item)) + item for item in items]])
+
+
+def probabilities_to_json(item: dict, num_qubits: int) -> dict:
+    """
+    Convert probability arrays of a result to lists, ordered like bits.
+    """
+    return {
+        **item,
+        'bits': get_bit_order(num_qubits),
+        'results': {device: np.asarray(probabilities).tolist() for device, probabilities in item['results'].items()}
+    }
+
+
+def reduced_probabilities_to_json(item: dict, num_bits: int) -> dict:
+    """
+    Convert a reduced probabilities result to probabilities by bit configuration.
+    """
+    return {
+        **item,
+        'results': {
+            device: dict(zip(format_bits(indices, num_bits), np.asarray(probabilities).tolist()))
+            for device, (indices, probabilities) in item['results'].items()
+        }
+    }
+
+
+def measurements_to_json(indices: np.ndarray, num_qubits: int, device: DeviceEnum, aggregate: bool = False) -> dict:
+    """
+    Convert measured indices into bit configurations, or counts per measured bit configuration if aggregated.
+    """
+    if aggregate:
+        measured, counts = np.unique(indices, return_counts=True)
+        return {
+            'device': device,
+            'counts': dict(zip(format_bits(measured, num_qubits), counts.tolist())),
+            'shots': len(indices)
+        }
+    return {
+        'device': device,
+        'results': format_bits(indices, num_qubits),
+        'shots': len(indices)
+    }
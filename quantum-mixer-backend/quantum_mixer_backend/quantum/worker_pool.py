@@ -0,0 +1,119 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Union
+from fastapi import HTTPException
+from ..metrics import metrics
+
+class WorkerTimeoutError(HTTPException):
+
+    def __init__(self):
+        super().__init__(status_code=504, detail='Simulation timed out')
+
+
+class WorkerCrashedError(HTTPException):
+
+    def __init__(self):
+        super().__init__(status_code=503, detail='Simulation worker crashed, please retry', headers={'Retry-After': '1'})
+
+
+def _run_timed(submitted: float, fn: Callable, *args):
+    """
+    Run fn(*args), recording how long the job waited for a free worker.
+    """
+    metrics.observe('queue_wait', time.perf_counter() - submitted)
+    return fn(*args)
+
+
+class WorkerPool:
+
+    def __init__(self, kind: str = 'thread', size: int = 4, queue_depth: int = 16, timeout: Union[float, None] = 30):
+        """
+        Bounded pool to run blocking simulation work off the event loop.
+
+        At most size jobs run at the same time and at most queue_depth jobs wait for a free worker.
+        Further jobs are rejected with 503, jobs exceeding timeout seconds are answered with 504.
+        Stage timings of jobs on a process pool are recorded in the worker processes and do not show up in metrics.
+        Jobs on state of this process (local jobs, e.g. editor sessions) run on threads also for a process pool,
+        they count towards the same limits.
+        """
+        self.kind        = kind
+        self.size        = size
+        self.queue_depth = queue_depth
+        self.timeout     = timeout
+        self._pending    = 0
+        self._lock       = threading.Lock()
+        self._executor: Executor = self._create_executor()
+        self._local_executor: Union[Executor, None] = ThreadPoolExecutor(max_workers=size, thread_name_prefix='quantum-local') if kind == 'process' else None
+
+    def _create_executor(self) -> Executor:
+        if self.kind == 'process':
+            return ProcessPoolExecutor(max_workers=self.size)
+        return ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='quantum-worker')
+
+    def _replace_broken(self, executor: Executor):
+        """
+        Replace a process pool which broke (a worker died or a result could not be sent back), once.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = self._create_executor()
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of jobs running or waiting in the queue.
+        """
+        return self._pending
+
+    def _release(self, _):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable, *args, timeout: Union[float, None] = None, local: bool = False):
+        """
+        Run fn(*args) on a worker and wait for its result. Local jobs always run on a thread of this process.
+        """
+        with self._lock:
+            if self._pending >= self.size + self.queue_depth:
+                raise HTTPException(
+                    status_code=503,
+                    detail='Simulation workers are busy, please retry later',
+                    headers={'Retry-After': '1'}
+                )
+            self._pending += 1
+            executor = self._local_executor if local and self._local_executor is not None else self._executor
+        try:
+            if executor is not self._local_executor and self.kind == 'process':
+                future = executor.submit(fn, *args)
+            elif metrics.enabled:
+                # threads run in a copy of the request context, so stage timings reach the request
+                future = executor.submit(contextvars.copy_context().run, _run_timed, time.perf_counter(), fn, *args)
+            else:
+                future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._release(None)
+            self._replace_broken(executor)
+            raise WorkerCrashedError()
+        except BaseException:
+            self._release(None)
+            raise
+        # a slot is freed once the job actually finished, not when the request gave up waiting
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise WorkerTimeoutError()
+        except BrokenProcessPool:
+            # later jobs run on a new pool
+            self._replace_broken(executor)
+            raise WorkerCrashedError()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._local_executor is not None:
+            self._local_executor.shutdown(wait=False, cancel_futures=True)
@@ -1 +1 @@
-from .app import set_endpoints
\ No newline at end of file
+from .app import set_endpoints, USECASES
\ No newline at end of file
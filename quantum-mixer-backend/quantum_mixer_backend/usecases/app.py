@@ -1,32 +1,35 @@
 import os
 from fastapi import FastAPI
 from .qoffee import QoffeeUsecase
+from .state_store import create_state_store
 from .usecase import Usecase
 from .usecase_data import UsecaseData
 
+# state of usecases, use sqlite to share it between several workers
+STATE_STORE = create_state_store(os.getenv('STATE_STORE', 'memory'), os.getenv('STATE_STORE_PATH', 'state.sqlite3'))
+
 USECASES = [
     QoffeeUsecase.from_file(
-        os.path.join(os.path.dirname(os.path.realpath(__file__)), 'qoffee', 'usecase.yml')
+        os.path.join(os.path.dirname(os.path.realpath(__file__)), 'qoffee', 'usecase.yml'),
+        STATE_STORE
     ),
     Usecase.from_file(
-        os.path.join(os.path.dirname(os.path.realpath(__file__)), 'usecase_ice.yml')
+        os.path.join(os.path.dirname(os.path.realpath(__file__)), 'usecase_ice.yml'),
+        STATE_STORE
     ),
     Usecase.from_file(
-        os.path.join(os.path.dirname(os.path.realpath(__file__)), 'usecase_cocktail.yml')
+        os.path.join(os.path.dirname(os.path.realpath(__file__)), 'usecase_cocktail.yml'),
+        STATE_STORE
     )
 ]
 
 def set_endpoints(app: FastAPI, prefix: str):
 
-    usecase_data = []
-
     for usecase in USECASES:
-        # create overview
-        overview = usecase.get_data()
-        usecase_data.append(overview)
         # append endpoints
-        usecase.set_endpoints(app, '{}/{}'.format(prefix, overview.id))
+        usecase.set_endpoints(app, '{}/{}'.format(prefix, usecase.get_data().id))
         
     @app.get('{}'.format(prefix))
     def get_usecases() -> list[UsecaseData]:
-        return usecase_data
\ No newline at end of file
+        # overview is created on request, as it depends on state (e.g. login)
+        return [usecase.get_data() for usecase in USECASES]
\ No newline at end of file
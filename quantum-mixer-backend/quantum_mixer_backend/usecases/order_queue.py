@@ -0,0 +1,170 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Union
+from fastapi import HTTPException
+from quantum_mixer_backend.usecases.state_store import StateStore, MemoryStateStore
+from quantum_mixer_backend.usecases.usecase_data import OrderData, OrderStatus, OrderStatusEnum
+
+# errors of the appliance worth another attempt: busy, rate limited, unavailable or timed out
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+FINAL_STATES = {OrderStatusEnum.COMPLETED, OrderStatusEnum.FAILED}
+
+
+class OrderQueue:
+
+    def __init__(
+        self,
+        dispatch: Callable[[OrderData], Awaitable],
+        max_attempts: int = 5,
+        backoff: float = 1,
+        max_backoff: float = 30,
+        ttl: float = 3600,
+        store: Union[StateStore, None] = None,
+        key_prefix: str = 'orders',
+        poll_interval: float = 0.5
+    ):
+        """
+        Queue of orders, dispatched one after another by a background worker.
+
+        A failed dispatch is retried with exponential backoff (backoff * 2^attempt seconds, at most max_backoff)
+        if the error is temporary, up to max_attempts attempts. Orders with the same idempotency key are
+        only accepted once. Orders are kept for ttl seconds after they were created.
+
+        The status of orders and the idempotency keys are kept in store, so all workers sharing it know every order.
+        Orders are dispatched by the worker that accepted them, subscribers of other workers poll the store
+        every poll_interval seconds.
+        """
+        self.dispatch      = dispatch
+        self.max_attempts  = max_attempts
+        self.backoff       = backoff
+        self.max_backoff   = max_backoff
+        self.ttl           = ttl
+        self.store         = store or MemoryStateStore()
+        self.key_prefix    = key_prefix
+        self.poll_interval = poll_interval
+        # orders dispatched by this worker
+        self._orders: dict[str, OrderStatus] = {}
+        self._created: dict[str, float] = {}
+        # queue, worker and events are created in the event loop on first use
+        self._queue: Union[asyncio.Queue, None] = None
+        self._worker: Union[asyncio.Task, None] = None
+        self._changed: dict[str, asyncio.Event] = {}
+
+    def _order_key(self, order_id: str) -> str:
+        return '{}:order:{}'.format(self.key_prefix, order_id)
+
+    def _idempotency_key(self, idempotency_key: str) -> str:
+        return '{}:idempotency:{}'.format(self.key_prefix, idempotency_key)
+
+    def _save(self, order: OrderStatus):
+        self.store.set(self._order_key(order.id), {'order': json.loads(order.json()), 'created': self._created[order.id]})
+
+    def _evict(self):
+        now = time.time()
+        for key in self.store.keys(self._order_key('')):
+            record = self.store.get(key)
+            if record is None or now - record['created'] <= self.ttl or record['order']['status'] not in FINAL_STATES:
+                continue
+            order = OrderStatus.parse_obj(record['order'])
+            self.store.delete(key)
+            if order.idempotencyKey is not None:
+                self.store.delete(self._idempotency_key(order.idempotencyKey))
+            self._orders.pop(order.id, None)
+            self._created.pop(order.id, None)
+            self._changed.pop(order.id, None)
+
+    def _update(self, order: OrderStatus, **changes):
+        for name, value in changes.items():
+            setattr(order, name, value)
+        self._save(order)
+        # wake up subscribers, they wait for the next change on a new event
+        event = self._changed.pop(order.id, None)
+        if event is not None:
+            event.set()
+
+    def submit(self, data: OrderData, idempotency_key: Union[str, None] = None) -> OrderStatus:
+        """
+        Accept an order and return its status immediately. Submitting an idempotency key again returns the first order.
+        """
+        self._evict()
+        if idempotency_key is not None:
+            order_id = self.store.get(self._idempotency_key(idempotency_key))
+            if order_id is not None:
+                return self.get(order_id)
+
+        order = OrderStatus(id=uuid.uuid4().hex, items=data.items, status=OrderStatusEnum.QUEUED, attempts=0, idempotencyKey=idempotency_key)
+        self._created[order.id] = time.time()
+        self._save(order)
+        if idempotency_key is not None:
+            # another worker may have accepted the same key in the meantime, the first order wins
+            order_id = self.store.setdefault(self._idempotency_key(idempotency_key), order.id)
+            if order_id != order.id:
+                self.store.delete(self._order_key(order.id))
+                del self._created[order.id]
+                return self.get(order_id)
+        self._orders[order.id] = order
+
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+        self._queue.put_nowait(order.id)
+        return order
+
+    def get(self, order_id: str) -> OrderStatus:
+        order = self._orders.get(order_id)
+        if order is not None:
+            return order
+        record = self.store.get(self._order_key(order_id))
+        if record is None:
+            raise HTTPException(status_code=404, detail='Unknown order {}'.format(order_id))
+        return OrderStatus.parse_obj(record['order'])
+
+    async def subscribe(self, order_id: str) -> AsyncIterator[OrderStatus]:
+        """
+        Yield the status of an order now and after every change, until it is completed or failed.
+        """
+        last = None
+        while True:
+            # the event is created before reading, so no change of this worker is missed
+            event = self._changed.setdefault(order_id, asyncio.Event())
+            order = self.get(order_id)
+            if order != last:
+                last = order.copy()
+                yield last
+                if order.status in FINAL_STATES:
+                    return
+            try:
+                # changes of other workers are only seen in the store
+                await asyncio.wait_for(event.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self):
+        while True:
+            order = self._orders.get(await self._queue.get())
+            if order is not None:
+                await self._process(order)
+
+    async def _process(self, order: OrderStatus):
+        while True:
+            self._update(order, status=OrderStatusEnum.DISPATCHING, attempts=order.attempts + 1)
+            try:
+                await self.dispatch(OrderData(items=order.items))
+                self._update(order, status=OrderStatusEnum.COMPLETED, error=None)
+                return
+            except Exception as e:
+                retry = not isinstance(e, HTTPException) or e.status_code in RETRY_STATUS_CODES
+                error = str(e.detail) if isinstance(e, HTTPException) else str(e)
+                if not retry or order.attempts >= self.max_attempts:
+                    self._update(order, status=OrderStatusEnum.FAILED, error=error)
+                    return
+                self._update(order, status=OrderStatusEnum.RETRYING, error=error)
+                await asyncio.sleep(min(self.backoff * 2 ** (order.attempts - 1), self.max_backoff))
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
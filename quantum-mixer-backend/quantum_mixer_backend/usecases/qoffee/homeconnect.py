@@ -0,0 +1,168 @@
+import asyncio
+import secrets
+import time
+from typing import Union
+from urllib.parse import urlencode
+import httpx
+from fastapi import HTTPException
+from quantum_mixer_backend.usecases.state_store import StateStore, MemoryStateStore
+from quantum_mixer_backend.usecases.utils import handle_response
+
+class HomeConnectClient:
+
+    def __init__(
+        self,
+        base_url: str,
+        client_id: str,
+        client_secret: str,
+        redirect_uri: str,
+        scope: list[str],
+        timeout: float = 10,
+        max_connections: int = 10,
+        appliance_ttl: float = 300,
+        transport: Union[httpx.AsyncBaseTransport, None] = None,
+        store: Union[StateStore, None] = None,
+        token_key: str = 'homeconnect:token'
+    ):
+        """
+        Async client of the HomeConnect API with OAuth2 (authorization code flow).
+
+        Connections are pooled and every request is limited by timeout seconds. The list of
+        home appliances is cached for appliance_ttl seconds and dropped on login.
+        Pass a transport (e.g. httpx.ASGITransport of the stand-in server) to test without network.
+        The token is kept in store under token_key, so all workers sharing the store share the login.
+        """
+        self.base_url      = base_url
+        self.client_id     = client_id
+        self.client_secret = client_secret
+        self.redirect_uri  = redirect_uri
+        self.scope         = scope
+        self.timeout       = timeout
+        self.appliance_ttl = appliance_ttl
+        self.store         = store or MemoryStateStore()
+        self.token_key     = token_key
+        self._appliances: Union[tuple[float, dict], None] = None
+        # a login (also in another worker) invalidates the appliances
+        self.store.add_listener(self._handle_state_change)
+        # locks are created in the event loop on first use
+        self._appliances_lock: Union[asyncio.Lock, None] = None
+        self._refresh_lock: Union[asyncio.Lock, None] = None
+        self._client = httpx.AsyncClient(
+            base_url=base_url or '',
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+
+    def authorization_url(self) -> tuple[str, str]:
+        """
+        URL to redirect the user to for login, and the state passed along.
+        """
+        state = secrets.token_urlsafe(16)
+        query = urlencode({
+            'response_type': 'code',
+            'client_id': self.client_id,
+            'redirect_uri': self.redirect_uri,
+            'scope': ' '.join(self.scope),
+            'state': state
+        })
+        return '{}/security/oauth/authorize?{}'.format(self.base_url, query), state
+
+    @property
+    def token(self) -> Union[dict, None]:
+        return self.store.get(self.token_key)
+
+    def _handle_state_change(self, key: str, value):
+        if key == self.token_key:
+            self._appliances = None
+
+    def _set_token(self, token: dict):
+        if 'expires_in' in token:
+            token['expires_at'] = time.time() + float(token['expires_in'])
+        self.store.set(self.token_key, token)
+
+    async def _send(self, method: str, path: str, **kwargs):
+        """
+        Send a request, raises HTTPException if it fails or HomeConnect is not reachable.
+        """
+        try:
+            # the timeout of httpx applies to single reads and writes, wait_for limits the whole request
+            response = await asyncio.wait_for(self._client.request(method, path, **kwargs), self.timeout)
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            raise HTTPException(status_code=504, detail='HomeConnect did not answer in time')
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail='HomeConnect is not reachable: {}'.format(e))
+        status, data = handle_response(response)
+
+        if status >= 300:
+            raise HTTPException(
+                status_code=status,
+                detail=data,
+            )
+
+        return data
+
+    async def _request_token(self, data: dict) -> dict:
+        token = await self._send('POST', '/security/oauth/token', data={
+            **data,
+            'client_id': self.client_id,
+            'client_secret': self.client_secret
+        })
+        self._set_token(token)
+        return token
+
+    async def fetch_token(self, code: str) -> dict:
+        """
+        Exchange the code of the authorization callback for a token (login).
+        """
+        # another user may log in, the new token drops the cached appliances
+        return await self._request_token({
+            'grant_type': 'authorization_code',
+            'code': code,
+            'redirect_uri': self.redirect_uri
+        })
+
+    async def refresh_token(self) -> dict:
+        """
+        Get a new token with the refresh token.
+        """
+        return await self._request_token({
+            'grant_type': 'refresh_token',
+            'refresh_token': self.token['refresh_token']
+        })
+
+    async def _auth_headers(self) -> dict:
+        if self.token is None:
+            raise HTTPException(status_code=401, detail='Not logged in to HomeConnect')
+        # refresh tokens shortly before they expire, concurrent requests wait for a single refresh
+        if self.token.get('expires_at', float('inf')) - 30 < time.time() and 'refresh_token' in self.token:
+            self._refresh_lock = self._refresh_lock or asyncio.Lock()
+            async with self._refresh_lock:
+                if self.token.get('expires_at', float('inf')) - 30 < time.time():
+                    await self.refresh_token()
+        return {'Authorization': 'Bearer {}'.format(self.token['access_token'])}
+
+    async def request(self, method: str, path: str, body=None):
+        """
+        Send an authorized request to the API, raises HTTPException if it fails.
+        """
+        return await self._send(method, path, json=body, headers=await self._auth_headers())
+
+    async def get(self, path: str):
+        return await self.request('GET', path)
+
+    async def put(self, path: str, body):
+        return await self.request('PUT', path, body)
+
+    async def get_appliances(self) -> dict:
+        """
+        List of home appliances, cached for appliance_ttl seconds.
+        """
+        self._appliances_lock = self._appliances_lock or asyncio.Lock()
+        async with self._appliances_lock:
+            if self._appliances is None or time.monotonic() - self._appliances[0] > self.appliance_ttl:
+                self._appliances = (time.monotonic(), await self.get('/api/homeappliances'))
+            return self._appliances[1]
+
+    async def aclose(self):
+        await self._client.aclose()
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import secrets
+from urllib.parse import parse_qs, urlencode
+from fastapi import FastAPI, Header, HTTPException, Request
+from starlette.responses import RedirectResponse, Response
+
+# Stand-in of the HomeConnect API for tests and load tests, with a single coffee machine.
+# Run it with `uvicorn quantum_mixer_backend.usecases.qoffee.standin:app --port 8001`
+# and set HOMECONNECT_BASE_URL=http://localhost:8001. HOMECONNECT_STANDIN_LATENCY adds
+# a delay (in seconds) to every API call.
+
+COFFEE_MACHINE = {
+    'haId': 'SIEMENS-TI9575X1DE-000000000001',
+    'name': 'Coffee Machine',
+    'type': 'CoffeeMaker',
+    'brand': 'Siemens',
+    'vib': 'TI9575X1DE',
+    'connected': True
+}
+
+def create_app(latency: float = 0) -> FastAPI:
+    """
+    Create a stand-in server. Logins are granted without asking, every issued token is valid.
+    """
+    app = FastAPI()
+    app.state.tokens = set()
+    app.state.orders = []
+    app.state.appliance_requests = 0
+
+    async def authorize(authorization: str):
+        if latency > 0:
+            await asyncio.sleep(latency)
+        if authorization is None or authorization.removeprefix('Bearer ') not in app.state.tokens:
+            raise HTTPException(status_code=401, detail={'error': {'key': 'invalid_token'}})
+
+    @app.get('/security/oauth/authorize')
+    async def authorize_user(redirect_uri: str, state: str = ''):
+        return RedirectResponse('{}?{}'.format(redirect_uri, urlencode({'code': secrets.token_urlsafe(8), 'state': state})))
+
+    @app.post('/security/oauth/token')
+    async def issue_token(request: Request):
+        # form encoded, parsed here to not depend on python-multipart
+        grant_type = parse_qs((await request.body()).decode()).get('grant_type', [None])[0]
+        if grant_type not in ('authorization_code', 'refresh_token'):
+            raise HTTPException(status_code=400, detail={'error': 'unsupported_grant_type'})
+        token = secrets.token_urlsafe(16)
+        app.state.tokens.add(token)
+        return {
+            'access_token': token,
+            'refresh_token': secrets.token_urlsafe(16),
+            'token_type': 'Bearer',
+            'expires_in': 86400,
+            'scope': 'IdentifyAppliance CoffeeMaker'
+        }
+
+    @app.get('/api/homeappliances')
+    async def get_home_appliances(authorization: str = Header(None)):
+        await authorize(authorization)
+        app.state.appliance_requests += 1
+        return {'data': {'homeappliances': [COFFEE_MACHINE]}}
+
+    @app.put('/api/homeappliances/{ha_id}/settings/{setting}')
+    async def put_setting(ha_id: str, setting: str, authorization: str = Header(None)):
+        await authorize(authorization)
+        return Response(status_code=204)
+
+    @app.put('/api/homeappliances/{ha_id}/programs/active')
+    async def put_active_program(ha_id: str, request: Request, authorization: str = Header(None)):
+        await authorize(authorization)
+        if ha_id != COFFEE_MACHINE['haId']:
+            raise HTTPException(status_code=404, detail={'error': {'key': 'SDK.Error.HomeAppliance.Connection.Initialization.Failed'}})
+        app.state.orders.append(await request.json())
+        return Response(status_code=204)
+
+    return app
+
+
+app = create_app(latency=float(os.getenv('HOMECONNECT_STANDIN_LATENCY', '0')))
@@ -1,13 +1,16 @@
 from typing import Optional, Annotated, Union
 import json
 import os
+import secrets
 from pydantic import BaseModel
-from fastapi import FastAPI, Request, HTTPException
-from starlette.responses import RedirectResponse
-from requests_oauthlib import OAuth2Session
+from fastapi import FastAPI, Header, Request, HTTPException
+from starlette.responses import RedirectResponse, StreamingResponse
 from quantum_mixer_backend.usecases.usecase import Usecase
-from quantum_mixer_backend.usecases.usecase_data import OrderData, UsecaseData, UsecasePreferences, UsecaseBitMappingItem
-from quantum_mixer_backend.usecases.utils import handle_response, get_return_type, StrEnum
+from quantum_mixer_backend.usecases.order_queue import OrderQueue
+from quantum_mixer_backend.usecases.state_store import StateStore
+from quantum_mixer_backend.usecases.usecase_data import OrderData, OrderStatus, UsecaseData, UsecasePreferences, UsecaseBitMappingItem
+from quantum_mixer_backend.usecases.utils import StrEnum
+from .homeconnect import HomeConnectClient
 
 class QoffeeUsecaseDrinkOptions(BaseModel):
     key: Annotated[str, 'Key for option']
@@ -24,39 +27,55 @@ class QoffeeUsecasePreferences(UsecasePreferences):
 class QoffeeUsecase(Usecase):
 
     preferences: QoffeeUsecasePreferences
-    post_login_redirect: Union[str, None] = None
 
-    def __init__(self, data: UsecaseData, preferences: QoffeeUsecasePreferences):
-        super().__init__(data, preferences)
+    def __init__(self, data: UsecaseData, preferences: QoffeeUsecasePreferences, store: Union[StateStore, None] = None):
+        super().__init__(data, preferences, store)
 
         self.client_id     = os.getenv('HOMECONNECT_CLIENT_ID')
         self.client_secret = os.getenv('HOMECONNECT_CLIENT_SECRET')
         self.base_url      = os.getenv('HOMECONNECT_BASE_URL')
         self.host_address  = os.getenv('HOST_ADDRESS')
 
-        # create oauth2 session
-        self.session = OAuth2Session(
-            client_id=self.client_id, 
+        # create async homeconnect client
+        self.client = HomeConnectClient(
+            base_url=self.base_url,
+            client_id=self.client_id,
+            client_secret=self.client_secret,
             redirect_uri='{}/api/usecase/qoffee/auth/callback'.format(self.host_address),
             scope=["IdentifyAppliance", "CoffeeMaker"],
-            auto_refresh_url='{}/security/oauth/token'.format(self.base_url),
-            auto_refresh_kwargs={
-                'client_id': self.client_id,
-                'client_secret': self.client_secret
-            },
-            token_updater=self.set_token
+            timeout=float(os.getenv('HOMECONNECT_TIMEOUT', '10')),
+            appliance_ttl=float(os.getenv('HOMECONNECT_APPLIANCE_TTL', '300')),
+            store=self.store,
+            token_key=self.state_key('token')
+        )
+
+        # orders are dispatched to the coffee machine in the background, retrying while it is busy
+        self.orders = OrderQueue(
+            self.handle_order,
+            max_attempts=int(os.getenv('QOFFEE_ORDER_ATTEMPTS', '5')),
+            backoff=float(os.getenv('QOFFEE_ORDER_BACKOFF', '2')),
+            store=self.store,
+            key_prefix=self.state_key('orders')
         )
     
-    def set_token(self, token):
-        self.data.loginRequired = False
-        self.token = token
+    @property
+    def post_login_redirect(self) -> Union[str, None]:
+        return self.store.get(self.state_key('post_login_redirect'))
+
+    @post_login_redirect.setter
+    def post_login_redirect(self, redirect: Union[str, None]):
+        self.store.set(self.state_key('post_login_redirect'), redirect)
+
+    def get_data(self) -> UsecaseData:
+        # login is required until any worker received a token
+        return self.data.copy(update={'loginRequired': self.data.loginRequired and self.client.token is None})
 
     def get_preferences(self) -> QoffeeUsecasePreferences:
         return super().get_preferences()
     
-    def get_preferences_schema(self):
+    async def get_preferences_schema(self):
         # get all available coffee machines
-        coffee_machines = self.get_coffee_machines()
+        coffee_machines = await self.get_coffee_machines()
         # create a new pydantic model and allow selectedMachineHaId to be only one of the coffee machines
         CoffeeMachines = StrEnum('CoffeeMachines', {'cm{}'.format(i): x['haId'] for i, x in enumerate(coffee_machines)})
         class QoffeeUsecasePreferences_(QoffeeUsecasePreferences):
@@ -64,14 +83,14 @@ class QoffeeUsecase(Usecase):
         # return schema
         return QoffeeUsecasePreferences_.schema()
     
-    def set_preferences(self, preferences: QoffeeUsecasePreferences) -> bool:
+    async def set_preferences(self, preferences: QoffeeUsecasePreferences) -> bool:
         worked = super().set_preferences(preferences)
         # return early
         if not worked:
             return False
         # make sure coffee machine is turned on
         if preferences.selectedMachineHaId is not None:
-            self.fetch_put('/api/homeappliances/{}/settings/BSH.Common.Setting.PowerState'.format(preferences.selectedMachineHaId), {
+            await self.fetch_put('/api/homeappliances/{}/settings/BSH.Common.Setting.PowerState'.format(preferences.selectedMachineHaId), {
                 "data": {
                     "key": "BSH.Common.Setting.PowerState",
                     "value": "BSH.Common.EnumType.PowerState.On"
@@ -79,72 +98,81 @@ class QoffeeUsecase(Usecase):
             })
         return True
 
-    def fetch_put(self, path: str, body) -> tuple[int, any]:
-        response = self.session.put('{}{}'.format(self.base_url, path), json.dumps(body), headers={
-            'Content-Type': 'application/json'
-        })
-        status, data = handle_response(response)
-
-        if status >= 300:
-            raise HTTPException(
-                status_code=status,
-                detail=data,
-            )
+    async def fetch_put(self, path: str, body) -> any:
+        return await self.client.put(path, body)
 
-        return data
+    async def fetch_get(self, path: str) -> any:
+        return await self.client.get(path)
 
-    def fetch_get(self, path: str) -> tuple[int, any]:
-        response = self.session.get('{}{}'.format(self.base_url, path))
-        status, data = handle_response(response)
-
-        if status >= 300:
-            raise HTTPException(
-                status_code=status,
-                detail=data,
-            )
-
-        return data
-
-    def get_coffee_machines(self):
-        data = self.fetch_get('/api/homeappliances')
+    async def get_coffee_machines(self):
+        data = await self.client.get_appliances()
         coffee_machines = list(filter(lambda x: x['type'] == 'CoffeeMaker', data['data']['homeappliances']))
         return coffee_machines
         
     def set_endpoints(self, app: FastAPI, prefix: str):
         super().set_endpoints(app, prefix)
+        app.add_event_handler('shutdown', self.client.aclose)
+        app.add_event_handler('shutdown', self.orders.stop)
 
         @app.get('{}/auth/login'.format(prefix))
         def login(redirect: str = '') -> RedirectResponse:
-            authorization_url, _ = self.session.authorization_url(
-                '{}/security/oauth/authorize'.format(self.base_url),
-            )
+            authorization_url, state = self.client.authorization_url()
+            # the callback must return the state of this login (CSRF protection)
+            self.store.set(self.state_key('oauth_state'), state)
             self.post_login_redirect = redirect
             return RedirectResponse(authorization_url)
 
         @app.get('{}/auth/callback'.format(prefix))
-        def handle_authorization_callback(request: Request, code: str = '') -> RedirectResponse: 
-            token = self.session.fetch_token(
-                '{}/security/oauth/token'.format(self.base_url),
-                client_secret=self.client_secret,
-                authorization_response=request.url._url.replace('http://', 'https://')
-            )
-            self.set_token(token)
-            coffee_machines = self.get_coffee_machines()
+        async def handle_authorization_callback(request: Request, code: str = '', state: str = '') -> RedirectResponse: 
+            expected_state = self.store.get(self.state_key('oauth_state'))
+            if expected_state is None or not secrets.compare_digest(state, expected_state):
+                raise HTTPException(status_code=400, detail='Invalid OAuth state')
+            # a state is used only once
+            self.store.set(self.state_key('oauth_state'), None)
+            await self.client.fetch_token(code)
+            coffee_machines = await self.get_coffee_machines()
             if len(coffee_machines) > 0:
-                self.preferences.selectedMachineHaId = coffee_machines[0]['haId']
+                self.preferences = self.preferences.copy(update={'selectedMachineHaId': coffee_machines[0]['haId']})
             return RedirectResponse(self.post_login_redirect)
 
-        @app.post('{}/order'.format(prefix))
-        async def handle_order(data: OrderData) -> get_return_type(self.handle_order):
-            return self.handle_order(data)
-
-    def handle_order(self, data: OrderData) -> bool:
+        @app.post('{}/order'.format(prefix), status_code=202)
+        async def submit_order(data: OrderData, idempotency_key: Union[str, None] = Header(None)) -> OrderStatus:
+            """
+            Queue an order, repeated requests with the same Idempotency-Key header return the first order.
+            """
+            self.validate_order(data)
+            return self.orders.submit(data, idempotency_key)
+
+        @app.get('{}/order/{{order_id}}'.format(prefix))
+        async def get_order(order_id: str) -> OrderStatus:
+            return self.orders.get(order_id)
+
+        @app.get('{}/order/{{order_id}}/events'.format(prefix))
+        async def get_order_events(order_id: str) -> StreamingResponse:
+            """
+            Status of an order as server-sent events, on every change until it is completed or failed.
+            """
+            self.orders.get(order_id)
+            updates = self.orders.subscribe(order_id)
+
+            async def events():
+                async for order in updates:
+                    yield 'data: {}\n\n'.format(json.dumps(order.dict()))
+
+            return StreamingResponse(events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    def validate_order(self, data: OrderData):
         if len(data.items) != 1:
-            raise RuntimeError("Unable to process other than 1 item, got {}".format(len(data.items)))
+            raise HTTPException(status_code=422, detail="Unable to process other than 1 item, got {}".format(len(data.items)))
+        if self.get_bit_mapping_item(data.items[0]) is None:
+            raise HTTPException(status_code=422, detail="No drink for {}".format(data.items[0]))
+        if self.preferences.selectedMachineHaId is None:
+            raise HTTPException(status_code=400, detail="No coffee machine selected")
 
-        drink_data = next(
-            filter(lambda x: x.bits == data.items[0], self.preferences.bitMapping)
-        )
+    async def handle_order(self, data: OrderData) -> bool:
+        self.validate_order(data)
+
+        drink_data = self.get_bit_mapping_item(data.items[0])
         drink_data_key     = drink_data.key
         drink_data_options = [] if drink_data.options is None else list(map(lambda x: x.dict(), drink_data.options))
 
@@ -153,7 +181,7 @@ class QoffeeUsecase(Usecase):
             if option["value"].isnumeric():
                 option["value"] = int(option["value"])
 
-        self.fetch_put('/api/homeappliances/{}/programs/active'.format(self.preferences.selectedMachineHaId), {
+        await self.fetch_put('/api/homeappliances/{}/programs/active'.format(self.preferences.selectedMachineHaId), {
             'data': {
                 'key': drink_data_key,
                 'options': drink_data_options
@@ -0,0 +1,195 @@
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable
+
+class StateStore(ABC):
+    """
+    Key-value store of usecase state (preferences, tokens, orders, ...). Values must be JSON serializable.
+    Listeners are called with key and value whenever a value changes (None if it was deleted).
+    """
+
+    def __init__(self):
+        self._listeners: list[Callable[[str, Any], None]] = []
+
+    def add_listener(self, listener: Callable[[str, Any], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, key: str, value: Any):
+        for listener in self._listeners:
+            listener(key, value)
+
+    @abstractmethod
+    def get(self, key: str, default: Any = None) -> Any:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        pass
+
+    @abstractmethod
+    def setdefault(self, key: str, value: Any) -> Any:
+        """
+        Set key to value unless it has a value already (atomically), return the value of key.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def keys(self, prefix: str = '') -> list[str]:
+        pass
+
+    def refresh(self):
+        """
+        Pick up changes made by other processes and notify listeners about them.
+        """
+        pass
+
+
+class MemoryStateStore(StateStore):
+    """
+    State of a single process.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._values: dict[str, Any] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._values.get(key, default)
+
+    def set(self, key: str, value: Any):
+        self._values[key] = value
+        self._notify(key, value)
+
+    def setdefault(self, key: str, value: Any) -> Any:
+        if key in self._values:
+            return self._values[key]
+        self.set(key, value)
+        return value
+
+    def delete(self, key: str):
+        if key in self._values:
+            del self._values[key]
+            self._notify(key, None)
+
+    def keys(self, prefix: str = '') -> list[str]:
+        return [key for key in self._values if key.startswith(prefix)]
+
+
+class SQLiteStateStore(StateStore):
+    """
+    State shared by all processes using the same SQLite file, e.g. several uvicorn workers.
+
+    Values are cached in memory. refresh() checks SQLite's data_version, which only changes when
+    another connection committed, so it costs a single pragma unless something changed.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # key -> (row version, value)
+        self._values: dict[str, tuple[int, Any]] = {}
+        connection = self._connection()
+        connection.execute('CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, version INTEGER NOT NULL, value TEXT NOT NULL)')
+        connection.commit()
+        self._load()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections must not be shared between threads
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+            self._local.data_version = None
+        return connection
+
+    def _load(self) -> list[tuple[str, Any]]:
+        """
+        Read all rows, returns the changed ones (deleted ones with value None).
+        """
+        changed = []
+        rows = self._connection().execute('SELECT key, version, value FROM state').fetchall()
+        with self._lock:
+            for key, version, value in rows:
+                cached = self._values.get(key)
+                if cached is None or cached[0] != version:
+                    self._values[key] = (version, json.loads(value))
+                    changed.append((key, self._values[key][1]))
+            for key in set(self._values) - {row[0] for row in rows}:
+                del self._values[key]
+                changed.append((key, None))
+        return changed
+
+    def refresh(self):
+        connection = self._connection()
+        data_version = connection.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self._local.data_version:
+            self._local.data_version = data_version
+            for key, value in self._load():
+                self._notify(key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self.refresh()
+        cached = self._values.get(key)
+        return default if cached is None else cached[1]
+
+    def set(self, key: str, value: Any):
+        connection = self._connection()
+        with connection:
+            # versions increase across the table, so a key deleted and set again gets a new version
+            connection.execute(
+                'INSERT INTO state (key, version, value) VALUES (?, (SELECT COALESCE(MAX(version), 0) + 1 FROM state), ?) '
+                'ON CONFLICT(key) DO UPDATE SET version = excluded.version, value = excluded.value',
+                (key, json.dumps(value))
+            )
+            version = connection.execute('SELECT version FROM state WHERE key = ?', (key,)).fetchone()[0]
+        with self._lock:
+            self._values[key] = (version, value)
+        self._notify(key, value)
+
+    def setdefault(self, key: str, value: Any) -> Any:
+        connection = self._connection()
+        with connection:
+            inserted = connection.execute(
+                'INSERT INTO state (key, version, value) VALUES (?, (SELECT COALESCE(MAX(version), 0) + 1 FROM state), ?) ON CONFLICT(key) DO NOTHING',
+                (key, json.dumps(value))
+            ).rowcount == 1
+            version, stored = connection.execute('SELECT version, value FROM state WHERE key = ?', (key,)).fetchone()
+        if inserted:
+            with self._lock:
+                self._values[key] = (version, value)
+            self._notify(key, value)
+            return value
+        return json.loads(stored)
+
+    def delete(self, key: str):
+        connection = self._connection()
+        with connection:
+            deleted = connection.execute('DELETE FROM state WHERE key = ?', (key,)).rowcount == 1
+        with self._lock:
+            self._values.pop(key, None)
+        if deleted:
+            self._notify(key, None)
+
+    def keys(self, prefix: str = '') -> list[str]:
+        self.refresh()
+        return [key for key in self._values if key.startswith(prefix)]
+
+
+def create_state_store(kind: str = 'memory', path: str = 'state.sqlite3') -> StateStore:
+    """
+    Create the state store of the given kind ('memory' or 'sqlite').
+    """
+    if kind == 'sqlite':
+        return SQLiteStateStore(path)
+    if kind == 'memory':
+        return MemoryStateStore()
+    raise ValueError('Unknown state store {} (allowed: memory, sqlite)'.format(kind))
@@ -1,18 +1,62 @@
 import yaml
 import json
+from typing import Any, Union
 from fastapi import FastAPI
-from quantum_mixer_backend.usecases.usecase_data import UsecaseData, UsecasePreferences
-from quantum_mixer_backend.usecases.utils import get_return_type
+from quantum_mixer_backend.quantum.circuit_data import CircuitData, OperationData
+from quantum_mixer_backend.usecases.state_store import StateStore, MemoryStateStore
+from quantum_mixer_backend.usecases.usecase_data import UsecaseData, UsecasePreferences, UsecaseBitMappingItem
+from quantum_mixer_backend.usecases.utils import get_return_type, resolve
 
 
 class Usecase:
 
     data: UsecaseData
-    preferences: UsecasePreferences
 
-    def __init__(self, data: UsecaseData, preferences: UsecasePreferences):
-        self.data        = data
-        self.preferences = preferences
+    def __init__(self, data: UsecaseData, preferences: UsecasePreferences, store: Union[StateStore, None] = None):
+        """
+        Usecase with state (preferences, ...) kept in store, shared by all workers if the store is.
+        Preferences from the file are only used if the store has none yet.
+        """
+        self.data  = data
+        self.store = store or MemoryStateStore()
+        self._preferences_class = type(preferences)
+        # parsed preferences and bit index, updated when the stored preferences change
+        self._preferences = preferences
+        self._bit_index   = self._build_bit_index()
+        self.store.add_listener(self._handle_state_change)
+        stored = self.store.get(self.state_key('preferences'))
+        if stored is None:
+            self.store.set(self.state_key('preferences'), json.loads(preferences.json()))
+        else:
+            self._handle_state_change(self.state_key('preferences'), stored)
+
+    def state_key(self, name: str) -> str:
+        return '{}:{}'.format(self.data.id, name)
+
+    def _handle_state_change(self, key: str, value: Any):
+        if key == self.state_key('preferences'):
+            self._preferences = self._preferences_class.parse_obj(value)
+            self._bit_index   = self._build_bit_index()
+
+    @property
+    def preferences(self) -> UsecasePreferences:
+        # pick up changes of other workers
+        self.store.refresh()
+        return self._preferences
+
+    @preferences.setter
+    def preferences(self, preferences: UsecasePreferences):
+        self.store.set(self.state_key('preferences'), json.loads(preferences.json()))
+
+    def _build_bit_index(self) -> dict[str, UsecaseBitMappingItem]:
+        return {item.bits: item for item in self._preferences.bitMapping}
+
+    def get_bit_mapping_item(self, bits: str) -> Union[UsecaseBitMappingItem, None]:
+        """
+        Item mapped to a bit configuration, or None
+        """
+        self.store.refresh()
+        return self._bit_index.get(bits)
 
     def get_data(self) -> UsecaseData:
         return self.data
@@ -27,29 +71,41 @@ class Usecase:
     def get_preferences_schema(self):
         return self.preferences.schema()
 
+    def get_representative_circuit(self) -> CircuitData:
+        """
+        Circuit typical for the usecase, used to warm up the simulators: all items in equal superposition.
+        """
+        return CircuitData(
+            numQubits=self.data.numQubits,
+            operations=[
+                OperationData(id='warmup-{}'.format(i), type='h', targetQubits=[i], controlQubits=[], parameterValues=[])
+                for i in range(self.data.numQubits)
+            ]
+        )
+
     def set_endpoints(self, app: FastAPI, prefix: str):
 
         @app.get('{}'.format(prefix))
         async def get_data() -> get_return_type(self.get_data):
-            return self.get_data()
+            return await resolve(self.get_data())
         
         @app.get('{}/preferences'.format(prefix))
         async def get_preferences() -> get_return_type(self.get_preferences):
-            return self.get_preferences()
+            return await resolve(self.get_preferences())
 
         @app.post('{}/preferences'.format(prefix))
         async def set_preferences(data: get_return_type(self.get_preferences)) -> bool:
-            return self.set_preferences(data)
+            return await resolve(self.set_preferences(data))
         
         @app.get('{}/preferences/schema'.format(prefix))
         async def get_schema():
-            return self.get_preferences_schema()
+            return await resolve(self.get_preferences_schema())
     
     @classmethod
-    def from_file(cls, path: str):
+    def from_file(cls, path: str, store: Union[StateStore, None] = None):
         with open(path, 'r') as f:
             all_data = yaml.safe_load(f)
         usecase_data_class = get_return_type(cls.get_data)
         usecase_pref_class = get_return_type(cls.get_preferences)
-        obj = cls(usecase_data_class(**all_data), usecase_pref_class(**all_data))
+        obj = cls(usecase_data_class(**all_data), usecase_pref_class(**all_data), store)
         return obj
\ No newline at end of file
@@ -1,3 +1,4 @@
+from enum import Enum
 from pydantic import BaseSettings, BaseModel, Extra
 from typing import Annotated, Optional
 from quantum_mixer_backend.quantum.circuit_data import CircuitData
@@ -36,3 +37,18 @@ class UsecasePreferences(BaseSettings):
 
 class OrderData(BaseModel):
     items: Annotated[list[str], "Bit configurations of items to order"]
+
+class OrderStatusEnum(str, Enum):
+    QUEUED      = 'queued'
+    DISPATCHING = 'dispatching'
+    RETRYING    = 'retrying'
+    COMPLETED   = 'completed'
+    FAILED      = 'failed'
+
+class OrderStatus(BaseModel):
+    id: Annotated[str, "Order id"]
+    items: Annotated[list[str], "Bit configurations of ordered items"]
+    status: Annotated[OrderStatusEnum, "Status of order"]
+    attempts: Annotated[int, "Number of attempts to dispatch the order"]
+    error: Annotated[Optional[str], "Error of the last attempt"] = None
+    idempotencyKey: Annotated[Optional[str], "Idempotency key the order was submitted with"] = None
@@ -1,6 +1,7 @@
-from typing import Callable
+from typing import Any, Callable
 import enum
-from requests import Response
+import inspect
+from httpx import Response
 import json
 
 def get_return_type(fn: Callable):
@@ -9,6 +10,14 @@ def get_return_type(fn: Callable):
     """
     return fn.__annotations__["return"]
 
+async def resolve(value: Any) -> Any:
+    """
+    Await value if it is awaitable, so usecases can implement methods sync or async
+    """
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
 def handle_response(request_response: Response):
     """
     Try to parse the response and return tuple of (statusCode, body)
@@ -0,0 +1,53 @@
+import logging
+import threading
+import time
+from typing import Union
+from .quantum.circuit_data import CircuitData, DeviceEnum
+from .quantum.jobs import create_executors, compute_device_probabilities, compute_drawings, compute_qasms, measure
+
+logger = logging.getLogger(__name__)
+
+class Warmup:
+
+    def __init__(self, circuit_datas: list[CircuitData], enabled: bool = True):
+        """
+        Runs circuits once on all devices in the background, so backends are created, the mock device
+        transpiler is loaded and the first real requests do not pay these costs.
+        The warmup runs in the server process, workers of a process pool warm up on their first jobs.
+        A failed warmup (e.g. a backend which can not be created) is reported with its error and never gets ready.
+        """
+        self.circuit_datas = circuit_datas
+        self.enabled       = enabled
+        self.ready         = not enabled
+        self.duration: Union[float, None] = None
+        self.error: Union[str, None] = None
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            executors = create_executors(self.circuit_datas)
+            for device in DeviceEnum:
+                compute_device_probabilities(executors, device)
+            compute_drawings(executors)
+            compute_qasms(executors)
+            for device in [DeviceEnum.QASM, DeviceEnum.MOCK]:
+                measure(executors, 1, device)
+        except Exception as e:
+            logger.exception('Warmup failed')
+            self.error = str(e)
+        self.duration = time.perf_counter() - start
+        self.ready = self.error is None
+
+    def start(self):
+        """
+        Start the warmup on a background thread.
+        """
+        if self.enabled:
+            threading.Thread(target=self.run, name='quantum-warmup', daemon=True).start()
+
+    def status(self) -> dict:
+        return {
+            'ready': self.ready,
+            'warmupSeconds': self.duration,
+            'error': self.error
+        }
@@ -1 +1,6 @@
-uvicorn quantum_mixer_backend:app --host 0.0.0.0 --port $PORT
+WORKERS=${WORKERS:-1}
+# workers share the usecase state (login, preferences, orders) through sqlite
+if [ "$WORKERS" -gt 1 ]; then
+    export STATE_STORE=${STATE_STORE:-sqlite}
+fi
+uvicorn quantum_mixer_backend:app --host 0.0.0.0 --port $PORT --workers $WORKERS
@@ -0,0 +1,10 @@
+from benchmarks import run_benchmarks, compare_results
+
+def test_benchmarks_compare_against_baseline():
+    baseline = run_benchmarks(repeat=1, qubits=[2], depths=[3], shots=[1], endpoints=False, log=lambda _: None)
+    assert 'parse.q2.d3' in baseline['results']
+    assert 'measurements_mock.q2.d3.s1' in baseline['results']
+
+    slower = {'results': {name: {**timing, 'median': timing['median'] * 2} for name, timing in baseline['results'].items()}}
+    assert not any(c['regression'] for c in compare_results(baseline, baseline, threshold=0.25))
+    assert all(c['regression'] for c in compare_results(baseline, slower, threshold=0.25))
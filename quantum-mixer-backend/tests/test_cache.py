@@ -0,0 +1,39 @@
+import time
+from quantum_mixer_backend.quantum.cache import LRUCache, circuit_hash
+from quantum_mixer_backend.quantum.circuit_data import CircuitData
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(max_entries=2, ttl=0.01)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    time.sleep(0.02)
+    assert cache.get('a', 'expired') == 'expired'
+    assert len(cache) == 0
+
+
+def test_hits_and_misses_are_counted():
+    cache = LRUCache(max_entries=2)
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+    # uncounted gets of one lookup, counted once
+    cache.get('a', count=False)
+    cache.get('b', count=False)
+    cache.record(hit=False)
+    assert cache.stats() == {'size': 1, 'maxEntries': 2, 'hits': 1, 'misses': 2}
+
+
+def test_circuit_hash_ignores_operation_ids():
+    circuit = lambda id: CircuitData(numQubits=1, operations=[{'id': id, 'type': 'ry', 'targetQubits': [0], 'controlQubits': [], 'parameterValues': ['pi / 2']}])
+    assert circuit_hash(circuit('a')) == circuit_hash(circuit('b'))
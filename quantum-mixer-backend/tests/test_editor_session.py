@@ -0,0 +1,132 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from quantum_mixer_backend.quantum import build
+from quantum_mixer_backend.quantum.circuit_data import SessionMessage
+from quantum_mixer_backend.quantum.editor_session import EditorSession
+
+def operation(id: str, type: str, target: int, controls: list[int] = [], parameters: list[str] = []) -> dict:
+    return {'id': id, 'type': type, 'targetQubits': [target], 'controlQubits': controls, 'parameterValues': parameters}
+
+
+@pytest.fixture(scope='module')
+def client():
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        yield client
+
+
+def test_changes_reuse_cached_states(client):
+    with client.websocket_connect('/api/quantum/session') as websocket:
+        websocket.send_json({'action': 'set', 'circuit': {'numQubits': 2, 'operations': [operation('h', 'h', 0)]}})
+        response = websocket.receive_json()
+        assert response['bits'] == ['00', '01', '10', '11']
+        assert response['results']['analytical'] == pytest.approx([0.5, 0.5, 0, 0])
+        assert response['recomputed'] == 1
+
+        # appended operations are applied to the cached state
+        websocket.send_json({'action': 'add', 'operation': operation('cx', 'x', 1, [0])})
+        response = websocket.receive_json()
+        assert response['results']['analytical'] == pytest.approx([0.5, 0, 0, 0.5])
+        assert response['recomputed'] == 1
+
+        # changing the first operation applies all operations again
+        websocket.send_json({'action': 'update', 'operation': operation('h', 'x', 0)})
+        response = websocket.receive_json()
+        assert response['results']['analytical'] == pytest.approx([0, 0, 0, 1])
+        assert response['recomputed'] == 2
+
+        websocket.send_json({'action': 'move', 'id': 'cx', 'index': 0})
+        assert websocket.receive_json()['results']['analytical'] == pytest.approx([0, 1, 0, 0])
+
+        websocket.send_json({'action': 'remove', 'id': 'h'})
+        response = websocket.receive_json()
+        assert response['results']['analytical'] == pytest.approx([1, 0, 0, 0])
+        assert response['recomputed'] == 0
+
+
+def test_set_replaces_the_circuit(client):
+    with client.websocket_connect('/api/quantum/session') as websocket:
+        websocket.send_json({'action': 'set', 'circuit': {'numQubits': 1, 'operations': [operation('x', 'x', 0)]}})
+        session = websocket.receive_json()['session']
+        websocket.send_json({'action': 'set', 'circuit': {'numQubits': 2, 'operations': [operation('x', 'x', 1)]}})
+        response = websocket.receive_json()
+        assert response['session'] == session
+        assert response['results']['analytical'] == pytest.approx([0, 0, 1, 0])
+
+
+def test_invalid_changes_leave_the_session_untouched(client):
+    with client.websocket_connect('/api/quantum/session') as websocket:
+        websocket.send_json({'action': 'set', 'circuit': {'numQubits': 1, 'operations': [operation('x', 'x', 0)]}})
+        session = websocket.receive_json()['session']
+
+        for message in [
+            {'action': 'remove', 'id': 'unknown'},
+            {'action': 'update', 'operation': operation('unknown', 'h', 0)},
+            {'action': 'add', 'operation': operation('ry', 'ry', 0, parameters=['unknown'])},
+            {'action': 'rotate'}
+        ]:
+            websocket.send_json(message)
+            response = websocket.receive_json()
+            assert response['session'] == session and 'error' in response
+
+        websocket.send_json({'action': 'add', 'operation': operation('h', 'h', 0)})
+        assert websocket.receive_json()['results']['analytical'] == pytest.approx([0.5, 0.5])
+
+
+def test_sessions_are_resumed_by_id(client):
+    with client.websocket_connect('/api/quantum/session') as websocket:
+        websocket.send_json({'action': 'set', 'circuit': {'numQubits': 1, 'operations': [operation('x', 'x', 0)]}})
+        session = websocket.receive_json()['session']
+
+    with client.websocket_connect('/api/quantum/session?session={}'.format(session)) as websocket:
+        websocket.send_json({'action': 'add', 'operation': operation('x2', 'x', 0)})
+        response = websocket.receive_json()
+        assert response['session'] == session
+        assert response['results']['analytical'] == pytest.approx([1, 0])
+        assert response['recomputed'] == 1
+
+    # unknown (e.g. evicted) sessions start empty under the given id
+    with client.websocket_connect('/api/quantum/session?session=evicted') as websocket:
+        websocket.send_json({'action': 'remove', 'id': 'x'})
+        assert 'error' in websocket.receive_json()
+
+
+def test_duplicate_operation_ids_are_rejected(client):
+    with client.websocket_connect('/api/quantum/session') as websocket:
+        websocket.send_json({'action': 'set', 'circuit': {'numQubits': 1, 'operations': [operation('a', 'x', 0)]}})
+        websocket.receive_json()
+
+        websocket.send_json({'action': 'add', 'operation': operation('a', 'h', 0)})
+        assert 'error' in websocket.receive_json()
+        websocket.send_json({'action': 'set', 'circuit': {'numQubits': 1, 'operations': [operation('b', 'x', 0), operation('b', 'h', 0)]}})
+        assert 'error' in websocket.receive_json()
+
+        # the first operation is kept and can still be removed
+        websocket.send_json({'action': 'add', 'operation': operation('b', 'x', 0)})
+        assert websocket.receive_json()['results']['analytical'] == pytest.approx([1, 0])
+        websocket.send_json({'action': 'remove', 'id': 'a'})
+        assert websocket.receive_json()['results']['analytical'] == pytest.approx([0, 1])
+
+
+def test_cached_states_are_limited():
+    # two states of 4 qubits fit
+    session = EditorSession('limited', max_memory=2 * 16 * 2 ** 4)
+    session.apply(SessionMessage.parse_obj({'action': 'set', 'circuit': {'numQubits': 4, 'operations': [operation(str(i), 'h', i % 4) for i in range(8)]}}))
+    _, _, recomputed = session.probabilities()
+    assert recomputed == 8 and session.memory <= session.max_memory
+
+    # changes of the last operation reuse the kept states
+    session.apply(SessionMessage.parse_obj({'action': 'update', 'operation': operation('7', 'x', 3)}))
+    assert session.probabilities()[2] == 1
+
+    # changes of dropped states apply all operations again
+    session.apply(SessionMessage.parse_obj({'action': 'update', 'operation': operation('0', 'x', 0)}))
+    _, changed, recomputed = session.probabilities()
+    assert recomputed == 8 and session.memory <= session.max_memory
+    assert changed == pytest.approx([0.25 if i & 6 == 0 else 0 for i in range(16)])
+
+    with pytest.raises(ValueError):
+        session.apply(SessionMessage.parse_obj({'action': 'set', 'circuit': {'numQubits': 6, 'operations': []}}))
+    assert session.num_qubits == 4
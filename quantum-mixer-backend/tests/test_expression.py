@@ -0,0 +1,11 @@
+import pytest
+from sympy.parsing.sympy_parser import parse_expr
+from quantum_mixer_backend.quantum.expression import evaluate_expression
+
+@pytest.mark.parametrize('expression', [
+    '0', '1.5', 'pi', 'PI', 'pi/2', '-pi/4', '2*pi/3', '(1+2)*pi', ' 3 * (pi - 1) / 2 ', '1e-3', '+0.25*pi',
+    # not supported by the fast evaluator, evaluated by sympy
+    'pi**2', 'sqrt(2)', 'sin(pi/4)'
+])
+def test_evaluate_expression_matches_sympy(expression):
+    assert evaluate_expression(expression) == pytest.approx(float(parse_expr(expression.lower()).evalf()))
@@ -0,0 +1,84 @@
+import asyncio
+import os
+from urllib.parse import parse_qs, urlparse
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from quantum_mixer_backend.usecases import qoffee
+from quantum_mixer_backend.usecases.qoffee import QoffeeUsecase
+from quantum_mixer_backend.usecases.qoffee.homeconnect import HomeConnectClient
+from quantum_mixer_backend.usecases.state_store import MemoryStateStore
+from quantum_mixer_backend.usecases.qoffee.standin import create_app, COFFEE_MACHINE
+
+def create_client(standin, **kwargs) -> HomeConnectClient:
+    return HomeConnectClient(
+        base_url='http://homeconnect',
+        client_id='client',
+        client_secret='secret',
+        redirect_uri='http://localhost/callback',
+        scope=['IdentifyAppliance', 'CoffeeMaker'],
+        transport=httpx.ASGITransport(app=standin),
+        **kwargs
+    )
+
+
+def test_appliances_are_cached_until_login():
+    standin = create_app()
+    client = create_client(standin)
+
+    async def run():
+        await client.fetch_token('code')
+        for _ in range(3):
+            appliances = await client.get_appliances()
+        assert appliances['data']['homeappliances'] == [COFFEE_MACHINE]
+        assert standin.state.appliance_requests == 1
+        await client.fetch_token('code')
+        await client.get_appliances()
+        assert standin.state.appliance_requests == 2
+        await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_requests_time_out():
+    client = create_client(create_app(latency=1), timeout=0.05)
+
+    async def run():
+        await client.fetch_token('code')
+        with pytest.raises(HTTPException) as e:
+            await client.put('/api/homeappliances/{}/programs/active'.format(COFFEE_MACHINE['haId']), {'data': {}})
+        assert e.value.status_code == 504
+        await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_requests_require_login():
+    client = create_client(create_app())
+
+    async def run():
+        with pytest.raises(HTTPException) as e:
+            await client.get_appliances()
+        assert e.value.status_code == 401
+        await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_login_callback_requires_state_of_login():
+    usecase = QoffeeUsecase.from_file(os.path.join(os.path.dirname(qoffee.__file__), 'usecase.yml'), MemoryStateStore())
+    standin = create_app()
+    usecase.client = create_client(standin, store=usecase.store, token_key=usecase.state_key('token'))
+    app = FastAPI()
+    usecase.set_endpoints(app, '/api/usecase/qoffee')
+    client = TestClient(app)
+
+    state = parse_qs(urlparse(client.get('/api/usecase/qoffee/auth/login', follow_redirects=False).headers['location']).query)['state'][0]
+    assert client.get('/api/usecase/qoffee/auth/callback', params={'code': 'code'}, follow_redirects=False).status_code == 400
+    assert client.get('/api/usecase/qoffee/auth/callback', params={'code': 'code', 'state': 'other'}, follow_redirects=False).status_code == 400
+    assert usecase.client.token is None
+    response = client.get('/api/usecase/qoffee/auth/callback', params={'code': 'code', 'state': state}, follow_redirects=False)
+    assert response.status_code == 307 and usecase.client.token is not None
+    # the state can not be used twice
+    assert client.get('/api/usecase/qoffee/auth/callback', params={'code': 'code', 'state': state}, follow_redirects=False).status_code == 400
@@ -0,0 +1,25 @@
+from loadtest import run_load_test, find_degradation, percentile
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3.0], 0.95) == 3
+
+
+def test_find_degradation():
+    stage = lambda concurrency, p95: {'concurrency': concurrency, 'endpoints': {'all': {'p95': p95}}}
+    assert find_degradation([stage(1, 0.1), stage(2, 0.15), stage(4, 0.3)], factor=2) == {'all': 4}
+    assert find_degradation([stage(1, 0.1), stage(2, 0.15)], factor=2) == {'all': None}
+
+
+def test_load_test_in_process():
+    lines = []
+    results = run_load_test(concurrencies=[1, 2], duration=0.1, think=0, standin_latency=0, log=lines.append)
+    assert not any('Login to HomeConnect failed' in line for line in lines)
+    assert [stage['concurrency'] for stage in results['stages']] == [1, 2]
+    for stage in results['stages']:
+        assert stage['endpoints']['all']['errors'] == 0
+        assert stage['endpoints']['POST /api/quantum/probabilities']['requests'] > 0
+    assert 'all' in results['degradation']
@@ -0,0 +1,30 @@
+from quantum_mixer_backend.metrics import Metrics, request_timings
+
+def test_stage_records_histogram_and_request_timings():
+    metrics = Metrics(prefix='test')
+    timings = []
+    token = request_timings.set(timings)
+    try:
+        with metrics.stage('parse'):
+            pass
+    finally:
+        request_timings.reset(token)
+    assert [stage for stage, _ in timings] == ['parse']
+    rendered = metrics.render()
+    assert 'test_stage_seconds_count{stage="parse"} 1' in rendered
+    assert 'test_stage_seconds_bucket{stage="parse",le="+Inf"} 1' in rendered
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False, prefix='test')
+    with metrics.stage('parse'):
+        pass
+    assert 'stage="parse"' not in metrics.render()
+
+
+def test_collectors_are_read_on_export():
+    metrics = Metrics(prefix='test')
+    values = [1]
+    metrics.add_gauge('pending', 'Pending jobs', lambda: values[0])
+    values[0] = 3
+    assert 'test_pending 3' in metrics.render()
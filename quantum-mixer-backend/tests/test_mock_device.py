@@ -0,0 +1,70 @@
+import pytest
+from qiskit import QuantumCircuit
+from qiskit.test.mock import FakeMontreal
+from quantum_mixer_backend.quantum import mock_device
+from quantum_mixer_backend.quantum.mock_device import MockDevice
+
+def ghz(num_qubits: int) -> QuantumCircuit:
+    qc = QuantumCircuit(num_qubits, num_qubits)
+    qc.h(0)
+    for q in range(1, num_qubits):
+        qc.cx(q - 1, q)
+    qc.measure(range(num_qubits), range(num_qubits))
+    return qc
+
+
+def distribution(counts: dict, num_shots: int) -> dict:
+    return {bits: count / num_shots for bits, count in counts.items()}
+
+
+@pytest.fixture(scope='module')
+def backend():
+    return FakeMontreal()
+
+
+def test_transpiled_circuits_are_memoized_per_key(backend, monkeypatch):
+    calls = []
+    transpile = mock_device.transpile
+    def counting_transpile(circuits, target):
+        calls.append(len(circuits))
+        return transpile(circuits, target)
+    monkeypatch.setattr(mock_device, 'transpile', counting_transpile)
+
+    device = MockDevice(backend, max_transpiled=2)
+    first = device.transpile([ghz(2)], keys=['a'])[0]
+    assert device.transpile([ghz(2)], keys=['a'])[0] is first
+    assert calls == [1]
+
+    # circuits without a cached result are transpiled together
+    device.transpile([ghz(2), ghz(3), ghz(2)], keys=['a', 'b', 'c'])
+    assert calls == [1, 2]
+
+    # the least recently used key is evicted beyond max_transpiled
+    assert len(device._transpiled) == 2
+    device.transpile([ghz(2)], keys=['a'])
+    assert calls == [1, 2, 1]
+
+    # circuits without key are not memoized
+    device.transpile([ghz(2)])
+    assert calls == [1, 2, 1, 1]
+
+
+def test_compact_circuits_use_only_their_physical_qubits(backend):
+    device = MockDevice(backend)
+    compact, physical_qubits = device.transpile([ghz(3)])[0]
+    assert compact.num_qubits == len(physical_qubits) == 3
+    assert all(0 <= q < backend.configuration().n_qubits for q in physical_qubits)
+
+
+def test_compact_run_matches_the_fake_device(backend):
+    device = MockDevice(backend)
+    num_shots = 20000
+    circuits = [ghz(2), ghz(3)]
+    experiments = device.run_batch(circuits, shots=num_shots, seed_simulator=3)
+    for circuit, (result, i) in zip(circuits, experiments):
+        compact = distribution(result.get_counts(i), num_shots)
+        direct = distribution(backend.run(mock_device.transpile(circuit, backend), shots=num_shots, seed_simulator=5).result().get_counts(), num_shots)
+        for bits in set(compact) | set(direct):
+            assert compact.get(bits, 0) == pytest.approx(direct.get(bits, 0), abs=0.03)
+        # mostly all zeros or all ones
+        assert compact.get('0' * circuit.num_qubits, 0) + compact.get('1' * circuit.num_qubits, 0) > 0.8
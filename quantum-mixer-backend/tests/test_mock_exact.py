@@ -0,0 +1,64 @@
+import pickle
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from quantum_mixer_backend.quantum import build
+from quantum_mixer_backend.quantum.circuit_data import CircuitData, DeviceEnum
+from quantum_mixer_backend.quantum.circuit_executor import CircuitExecutor, CircuitTooLargeError, get_mock_device, sampler
+
+def bell_pair() -> CircuitData:
+    return CircuitData(numQubits=2, operations=[
+        {'id': 'h', 'type': 'h', 'targetQubits': [0], 'controlQubits': [], 'parameterValues': []},
+        {'id': 'cx', 'type': 'x', 'targetQubits': [1], 'controlQubits': [0], 'parameterValues': []}
+    ])
+
+
+def test_readout_confusion_columns_are_distributions():
+    confusion = get_mock_device().readout_confusion(0)
+    assert np.allclose(confusion.sum(axis=0), 1)
+    assert confusion[0, 0] > 0.5 and confusion[1, 1] > 0.5
+
+
+def test_exact_distribution_is_deterministic_and_cached():
+    executor = CircuitExecutor.from_circuit_data(bell_pair())
+    first = CircuitExecutor.probabilities_mock_exact_batch([executor])[0]
+    assert sampler.cached_distribution(executor.key, DeviceEnum.MOCK_EXACT) is first
+    second = CircuitExecutor.probabilities_mock_exact_batch([CircuitExecutor.from_circuit_data(bell_pair())])[0]
+    assert first is second
+    assert np.isclose(first.sum(), 1)
+    # mostly 00 and 11, with some noise on 01 and 10
+    assert first[0] + first[3] > 0.8
+    assert 0 < first[1] + first[2] < 0.2
+
+
+def test_exact_distribution_matches_sampled_mock_device():
+    executor = CircuitExecutor.from_circuit_data(bell_pair())
+    exact = CircuitExecutor.probabilities_mock_exact_batch([executor])[0]
+    sampled = executor._probabilities_backend(get_mock_device(), num_shots=20000)
+    assert np.allclose(exact, sampled, atol=0.02)
+
+
+def test_too_large_circuit_is_rejected():
+    app = FastAPI()
+    build(app, '/api/quantum')
+    circuit = {'numQubits': 12, 'operations': [
+        {'id': str(i), 'type': 'h', 'targetQubits': [i], 'controlQubits': [], 'parameterValues': []} for i in range(12)
+    ]}
+    with TestClient(app) as client:
+        response = client.post('/api/quantum/measurements', json=circuit, params={'device': 'mock_exact'})
+        assert response.status_code == 422
+        response = client.post('/api/quantum/probabilities', json=circuit, params={'devices': 'mock_exact', 'mode': 'top', 'k': 1})
+        assert response.json()['missing'] == ['mock_exact']
+
+
+def test_too_large_error_survives_process_pool():
+    error = pickle.loads(pickle.dumps(CircuitTooLargeError('too large')))
+    assert isinstance(error, CircuitTooLargeError) and str(error) == 'too large'
+
+
+def test_exact_device_only_runs_when_selected():
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        response = client.post('/api/quantum/probabilities', json=bell_pair().dict())
+        assert list(response.json()['results']) == ['analytical', 'qasm', 'mock']
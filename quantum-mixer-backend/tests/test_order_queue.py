@@ -0,0 +1,66 @@
+import asyncio
+from fastapi import HTTPException
+from quantum_mixer_backend.usecases.order_queue import OrderQueue
+from quantum_mixer_backend.usecases.state_store import SQLiteStateStore
+from quantum_mixer_backend.usecases.usecase_data import OrderData, OrderStatusEnum
+
+def test_orders_are_retried_and_deduplicated():
+    calls = []
+
+    async def dispatch(data: OrderData):
+        calls.append(data.items)
+        # the machine is busy on the first attempt
+        if len(calls) == 1:
+            raise HTTPException(status_code=409, detail='busy')
+
+    async def run():
+        queue = OrderQueue(dispatch, backoff=0.001)
+        order = queue.submit(OrderData(items=['010']), 'key')
+        assert queue.submit(OrderData(items=['010']), 'key') is order
+        statuses = [update.status for update in [u async for u in queue.subscribe(order.id)]]
+        assert statuses[-1] == OrderStatusEnum.COMPLETED
+        assert order.attempts == 2
+        assert calls == [['010'], ['010']]
+        await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_permanent_errors_are_not_retried():
+    async def dispatch(data: OrderData):
+        raise HTTPException(status_code=401, detail='not logged in')
+
+    async def run():
+        queue = OrderQueue(dispatch, backoff=0.001)
+        order = queue.submit(OrderData(items=['010']))
+        async for _ in queue.subscribe(order.id):
+            pass
+        assert order.status == OrderStatusEnum.FAILED
+        assert order.attempts == 1
+        assert order.error == 'not logged in'
+        await queue.stop()
+
+    asyncio.run(run())
+
+
+def test_orders_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    calls = []
+
+    async def dispatch(data: OrderData):
+        calls.append(data.items)
+
+    async def run():
+        first = OrderQueue(dispatch, store=SQLiteStateStore(path), poll_interval=0.01)
+        second = OrderQueue(dispatch, store=SQLiteStateStore(path), poll_interval=0.01)
+        order = first.submit(OrderData(items=['010']), 'key')
+        # a retry reaching the other worker returns the first order
+        assert second.submit(OrderData(items=['010']), 'key').id == order.id
+        statuses = [update.status async for update in second.subscribe(order.id)]
+        assert statuses[0] == OrderStatusEnum.QUEUED and statuses[-1] == OrderStatusEnum.COMPLETED
+        assert second.get(order.id).attempts == 1
+        assert calls == [['010']]
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,143 @@
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from quantum_mixer_backend.quantum import app as quantum_app, build, circuit_executor
+from quantum_mixer_backend.quantum.settings import settings
+
+CIRCUIT = {'numQubits': 2, 'operations': [
+    {'id': 'h', 'type': 'h', 'targetQubits': [0], 'controlQubits': [], 'parameterValues': []}
+]}
+
+@pytest.fixture(scope='module')
+def client():
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        yield client
+
+
+def test_measurements_without_shots(client):
+    response = client.post('/api/quantum/measurements', json=CIRCUIT, params={'shots': 0})
+    assert response.status_code == 200
+    assert response.json()['results'] == [] and response.json()['shots'] == 0
+    response = client.post('/api/quantum/measurements', json=CIRCUIT, params={'shots': 0, 'aggregate': True})
+    assert response.json()['counts'] == {}
+
+
+def test_negative_shots_are_rejected(client):
+    assert client.post('/api/quantum/measurements', json=CIRCUIT, params={'shots': -1}).status_code == 422
+    assert client.post('/api/quantum/measurements/batch', json=[CIRCUIT], params={'shots': -1}).status_code == 422
+
+
+def test_empty_batches(client):
+    assert client.post('/api/quantum/measurements/batch', json=[]).json() == []
+    assert client.post('/api/quantum/probabilities/batch', json=[]).json() == []
+
+
+def test_batch_size_is_limited(monkeypatch):
+    monkeypatch.setattr(settings, 'max_batch_size', 2)
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        for path in ['/api/quantum/probabilities/batch', '/api/quantum/measurements/batch']:
+            assert client.post(path, json=[CIRCUIT] * 2).status_code == 200
+            response = client.post(path, json=[CIRCUIT] * 3)
+            assert response.status_code == 422 and response.json()['detail'][0]['type'] == 'value_error.list.max_items'
+
+
+def test_busy_stages_are_reported_missing(monkeypatch):
+    # a single worker without queue, only the first stage of a request finds a free worker
+    monkeypatch.setattr(settings, 'pool_size', 1)
+    monkeypatch.setattr(settings, 'pool_queue_depth', 0)
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        response = client.post('/api/quantum/probabilities', json=CIRCUIT, params={'devices': 'analytical,qasm,mock'})
+        assert response.status_code == 200
+        item = response.json()
+        assert len(item['results']) == 1
+        assert sorted(list(item['results']) + item['missing']) == ['analytical', 'mock', 'qasm']
+        assert 'circuit' not in item
+
+
+def test_requests_count_one_cache_lookup():
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        for _ in range(2):
+            client.post('/api/quantum/probabilities', json=CIRCUIT, params={'devices': 'analytical'})
+        stats = client.get('/api/quantum/cache').json()
+        assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_only_selected_devices_and_parts_are_computed(client, monkeypatch):
+    devices = []
+    compute_device_probabilities = quantum_app.compute_device_probabilities
+    def record(executors, device):
+        devices.append(device)
+        return compute_device_probabilities(executors, device)
+    monkeypatch.setattr(quantum_app, 'compute_device_probabilities', record)
+    circuit = {'numQubits': 3, 'operations': [{'id': 'x', 'type': 'x', 'targetQubits': [2], 'controlQubits': [], 'parameterValues': []}]}
+
+    item = client.post('/api/quantum/probabilities', json=circuit, params={'devices': 'analytical', 'include': ''}).json()
+    assert list(item['results']) == ['analytical'] and devices == ['analytical']
+    assert 'circuit' not in item and 'qasm' not in item
+
+    item = client.post('/api/quantum/probabilities', json=circuit, params={'devices': 'analytical', 'include': 'circuit'}).json()
+    assert 'circuit' in item and 'qasm' not in item
+    # the analytical result is taken from the cache
+    assert devices == ['analytical']
+
+    items = client.post('/api/quantum/probabilities/batch', json=[circuit], params={'devices': 'analytical', 'include': 'qasm'}).json()
+    assert 'qasm' in items[0] and 'circuit' not in items[0]
+
+
+def test_invalid_selections_are_rejected(client):
+    for params in [{'devices': 'analytical,quantum'}, {'include': 'circuit,image'}]:
+        response = client.post('/api/quantum/probabilities', json=CIRCUIT, params=params)
+        assert response.status_code == 422 and 'Invalid value' in response.json()['detail']
+        assert client.post('/api/quantum/probabilities/batch', json=[CIRCUIT], params=params).status_code == 422
+
+
+def test_circuits_are_simplified_once_on_a_worker(client, monkeypatch):
+    threads = []
+    simplify_circuit_data = circuit_executor.simplify_circuit_data
+    def simplify(circuit_data):
+        threads.append(threading.current_thread().name)
+        return simplify_circuit_data(circuit_data)
+    monkeypatch.setattr(circuit_executor, 'simplify_circuit_data', simplify)
+
+    circuit = {'numQubits': 1, 'operations': [{'id': 'ry', 'type': 'ry', 'targetQubits': [0], 'controlQubits': [], 'parameterValues': ['sin(pi/7)']}]}
+    response = client.post('/api/quantum/probabilities', json=circuit, params={'devices': 'analytical'})
+    assert response.status_code == 200
+    assert len(threads) == 1 and threads[0].startswith('quantum-worker')
+
+
+@pytest.mark.parametrize('engine', ['aer', 'numpy'])
+def test_seeded_measurements_are_reproducible(client, monkeypatch, engine):
+    monkeypatch.setattr(settings, 'sampling_engine', engine)
+    circuit = {'numQubits': 2, 'operations': [
+        {'id': str(q), 'type': 'h', 'targetQubits': [q], 'controlQubits': [], 'parameterValues': []} for q in range(2)
+    ]}
+    for device in ['qasm', 'mock']:
+        params = {'shots': 50, 'device': device, 'seed': 7}
+        first = client.post('/api/quantum/measurements', json=circuit, params=params).json()['results']
+        assert client.post('/api/quantum/measurements', json=circuit, params=params).json()['results'] == first
+        assert client.post('/api/quantum/measurements', json=circuit, params={**params, 'seed': 8}).json()['results'] != first
+        batch = client.post('/api/quantum/measurements/batch', json=[circuit, circuit], params=params).json()
+        assert client.post('/api/quantum/measurements/batch', json=[circuit, circuit], params=params).json() == batch
+
+
+def test_batch_results_keep_the_order_of_circuits(client):
+    # single X gates on different qubits, some cached before, so they are computed out of order
+    circuits = [
+        {'numQubits': 3, 'operations': [{'id': 'x', 'type': 'x', 'targetQubits': [q], 'controlQubits': [], 'parameterValues': []}]}
+        for q in [2, 0, 1]
+    ]
+    client.post('/api/quantum/probabilities', json=circuits[1], params={'devices': 'analytical'})
+    results = client.post('/api/quantum/probabilities/batch', json=circuits, params={'devices': 'analytical', 'include': ''}).json()
+    assert [item['results']['analytical'].index(1) for item in results] == [4, 1, 2]
+
+    measurements = client.post('/api/quantum/measurements/batch', json=circuits, params={'shots': 3}).json()
+    assert [item['results'] for item in measurements] == [['100'] * 3, ['001'] * 3, ['010'] * 3]
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from quantum_mixer_backend.quantum.request_control import SingleFlight, RequestCanceller, ClientDisconnectedError, SupersededError
+
+
+class FakeRequest:
+    """
+    Request whose client disconnects when disconnected is set.
+    """
+
+    def __init__(self):
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+
+def test_single_flight_shares_computation():
+    async def main():
+        flights = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*[flights.run('circuit', compute) for _ in range(5)])
+        assert results == [42] * 5
+        assert len(calls) == 1 and flights.coalesced == 4 and len(flights) == 0
+
+    asyncio.run(main())
+
+
+def test_single_flight_cancels_computation_without_waiters():
+    async def main():
+        flights = SingleFlight()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def compute():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        first = asyncio.ensure_future(flights.run('circuit', compute))
+        second = asyncio.ensure_future(flights.run('circuit', compute))
+        await started.wait()
+        # one of two waiters leaves, the computation goes on
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        assert cancelled == []
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert cancelled == [1] and len(flights) == 0
+
+    asyncio.run(main())
+
+
+def test_newer_request_supersedes_older_one():
+    async def main():
+        canceller = RequestCanceller()
+        older = asyncio.ensure_future(canceller.run(FakeRequest(), asyncio.sleep(10), token='editor'))
+        await asyncio.sleep(0)
+        newer = await canceller.run(FakeRequest(), asyncio.sleep(0, 'new'), token='editor')
+        assert newer == 'new'
+        with pytest.raises(SupersededError):
+            await older
+        # other editors are not affected
+        assert await canceller.run(FakeRequest(), asyncio.sleep(0, 'other'), token='other') == 'other'
+
+    asyncio.run(main())
+
+
+def test_disconnect_cancels_work():
+    async def main():
+        canceller = RequestCanceller()
+        request = FakeRequest()
+        work = asyncio.ensure_future(asyncio.sleep(10))
+        pending = asyncio.ensure_future(canceller.run(request, work))
+        await asyncio.sleep(0)
+        request.disconnected.set()
+        with pytest.raises(ClientDisconnectedError):
+            await pending
+        await asyncio.sleep(0)
+        assert work.cancelled() and canceller.cancelled == 1
+
+    asyncio.run(main())
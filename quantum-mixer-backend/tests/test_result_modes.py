@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from quantum_mixer_backend.quantum.circuit_data import CircuitData, ResultModeEnum
+from quantum_mixer_backend.quantum.result_modes import format_bits, reduce_probabilities
+from quantum_mixer_backend.quantum.settings import settings
+
+# probabilities of 3 qubits, index i is the bit configuration of i (qubit 0 is the last bit)
+PROBABILITIES = np.array([0.5, 0, 0, 0.125, 0, 0.25, 0, 0.125])
+
+
+def test_sparse():
+    indices, values = reduce_probabilities(PROBABILITIES, 3, ResultModeEnum.SPARSE, epsilon=0.2)
+    assert format_bits(indices, 3) == ['000', '101']
+    assert values.tolist() == [0.5, 0.25]
+
+
+def test_top_k():
+    indices, values = reduce_probabilities(PROBABILITIES, 3, ResultModeEnum.TOP, k=2)
+    assert format_bits(indices, 3) == ['000', '101']
+    assert values.tolist() == [0.5, 0.25]
+    assert len(reduce_probabilities(PROBABILITIES, 3, ResultModeEnum.TOP, k=100)[0]) == 8
+
+
+def test_marginal():
+    # qubits 2 and 0, from the highest qubit
+    indices, values = reduce_probabilities(PROBABILITIES, 3, ResultModeEnum.MARGINAL, qubits=[2, 0])
+    assert format_bits(indices, 2) == ['00', '01', '10', '11']
+    assert values.tolist() == [0.5, 0.125, 0, 0.375]
+    indices, values = reduce_probabilities(PROBABILITIES, 3, ResultModeEnum.MARGINAL, qubits=[1])
+    assert values.tolist() == [0.75, 0.25]
+
+
+def test_max_qubits():
+    CircuitData(numQubits=settings.max_qubits, operations=[])
+    with pytest.raises(ValidationError):
+        CircuitData(numQubits=settings.max_qubits + 1, operations=[])
+    with pytest.raises(ValidationError):
+        CircuitData(numQubits=2, operations=[{'id': 'a', 'type': 'x', 'targetQubits': [2], 'controlQubits': [], 'parameterValues': []}])
@@ -0,0 +1,26 @@
+import numpy as np
+from quantum_mixer_backend.quantum.sampling import Sampler
+
+def test_same_seed_gives_same_shots():
+    probabilities = np.array([0.5, 0.25, 0.25, 0])
+    first = Sampler.sample(probabilities, 100, seed=7, memory=True)
+    second = Sampler.sample(probabilities, 100, seed=7, memory=True)
+    assert np.array_equal(first, second)
+    assert 3 not in first
+
+
+def test_counts_follow_distribution():
+    probabilities = np.array([0.5, 0.375, 0, 0.125])
+    counts = Sampler.sample(probabilities, 100000, seed=1)
+    assert counts.sum() == 100000
+    assert np.allclose(counts / 100000, probabilities, atol=0.01)
+
+
+def test_distribution_is_computed_once_per_key():
+    sampler = Sampler(max_entries=4)
+    calls = []
+    compute = lambda: calls.append(1) or [0.5, 0.5]
+    sampler.distribution('circuit', 'qasm', compute)
+    sampler.distribution('circuit', 'qasm', compute)
+    assert len(calls) == 1
+    assert sampler.cached_distribution('circuit', 'mock') is None
@@ -0,0 +1,60 @@
+import random
+import numpy as np
+import pytest
+from quantum_mixer_backend.quantum import parse_circuit_data
+from quantum_mixer_backend.quantum.cache import circuit_hash
+from quantum_mixer_backend.quantum.circuit_data import CircuitData, OperationData
+from quantum_mixer_backend.quantum.circuit_executor import CircuitExecutor
+from quantum_mixer_backend.quantum.simplify import simplify_circuit_data
+from quantum_mixer_backend.quantum.statevector_engine import simulate_statevector
+
+# few gates on few qubits, so random circuits contain many pairs to simplify
+GATES = [('h', 0, 1), ('x', 0, 1), ('z', 0, 1), ('ry', 0, 1), ('i', 0, 1), ('swap', 0, 2), ('x', 1, 1), ('z', 1, 1), ('ry', 1, 1), ('swap', 1, 2)]
+ANGLES = ['pi/2', 'pi', '-pi/2', '2*pi', '0', '0.3']
+
+
+def operation(id: str, type: str, targets: list[int], controls: list[int] = [], parameters: list[str] = []) -> OperationData:
+    return OperationData(id=id, type=type, targetQubits=targets, controlQubits=controls, parameterValues=parameters)
+
+
+def random_circuit_data(rng: random.Random, num_qubits: int, num_operations: int) -> CircuitData:
+    operations = []
+    for i in range(num_operations):
+        gate_type, num_controls, num_targets = rng.choice([g for g in GATES if g[1] + g[2] <= num_qubits])
+        qubits = rng.sample(range(num_qubits), num_controls + num_targets)
+        operations.append(operation(str(i), gate_type, qubits[num_controls:], qubits[:num_controls], [rng.choice(ANGLES)] if gate_type == 'ry' else []))
+    return CircuitData(numQubits=num_qubits, operations=operations)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_simplified_circuit_is_equivalent(seed):
+    rng = random.Random(seed)
+    circuit_data = random_circuit_data(rng, rng.randint(1, 3), rng.randint(0, 30))
+    simplified = simplify_circuit_data(circuit_data)
+    assert len(simplified.operations) <= len(circuit_data.operations)
+    expected = simulate_statevector(parse_circuit_data(circuit_data))
+    actual = simulate_statevector(parse_circuit_data(simplified))
+    # equal up to a global phase
+    assert np.isclose(abs(np.vdot(expected, actual)), 1)
+
+
+def test_pairs_cancel_and_rotations_merge():
+    circuit_data = CircuitData(numQubits=3, operations=[
+        operation('a', 'h', [0]), operation('b', 'i', [1]), operation('c', 'x', [2]), operation('d', 'h', [0]),
+        operation('e', 'swap', [1, 2]), operation('f', 'swap', [2, 1]),
+        operation('g', 'ry', [1], [0], ['pi/4']), operation('h', 'ry', [1], [0], ['pi/4'])
+    ])
+    assert [(o.type, o.targetQubits, o.parameterValues) for o in simplify_circuit_data(circuit_data).operations] == [
+        ('ry', [1], ['1.570796326795']),
+        ('x', [2], [])
+    ]
+
+
+def test_equivalent_circuits_share_key_and_keep_drawing():
+    first = CircuitData(numQubits=2, operations=[operation('a', 'x', [0]), operation('b', 'h', [1]), operation('c', 'z', [1], [0])])
+    second = CircuitData(numQubits=2, operations=[operation('b', 'h', [1]), operation('x', 'x', [0]), operation('y', 'x', [0]), operation('a', 'x', [0]), operation('c', 'z', [0], [1])])
+    assert circuit_hash(simplify_circuit_data(first)) == circuit_hash(simplify_circuit_data(second))
+    executor = CircuitExecutor.from_circuit_data(second)
+    assert executor.key == CircuitExecutor.from_circuit_data(first).key
+    assert len(executor.circuit.data) == 3
+    assert len(executor.display_circuit.data) == 5
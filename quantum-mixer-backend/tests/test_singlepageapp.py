@@ -0,0 +1,36 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from quantum_mixer_backend.frontend.singlepageapp import SinglePageApplication
+
+def create_client(tmp_path) -> TestClient:
+    (tmp_path / 'index.html').write_text('<html>{}</html>'.format('x' * 2000))
+    (tmp_path / 'main.0123456789abcdef.js').write_text('console.log(1);')
+    (tmp_path / 'main.0123456789abcdef.js.br').write_bytes(b'compressed')
+    app = FastAPI()
+    app.mount('/', SinglePageApplication(directory=tmp_path))
+    return TestClient(app)
+
+
+def test_unknown_paths_fall_back_to_index(tmp_path):
+    client = create_client(tmp_path)
+    response = client.get('/some/route', headers={'accept-encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['cache-control'] == 'no-cache'
+    assert response.text.startswith('<html>')
+
+
+def test_index_is_revalidated_with_etag(tmp_path):
+    client = create_client(tmp_path)
+    etag = client.get('/').headers['etag']
+    response = client.get('/', headers={'if-none-match': etag})
+    assert response.status_code == 304
+
+
+def test_hashed_files_are_immutable_and_precompressed(tmp_path):
+    client = create_client(tmp_path)
+    response = client.get('/main.0123456789abcdef.js', headers={'accept-encoding': 'br'})
+    assert response.headers['cache-control'] == 'public, max-age=31536000, immutable'
+    assert response.headers['content-encoding'] == 'br'
+    assert response.content == b'compressed'
+    assert client.get('/main.0123456789abcdef.js', headers={'accept-encoding': 'identity'}).text == 'console.log(1);'
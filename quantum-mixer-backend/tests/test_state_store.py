@@ -0,0 +1,71 @@
+import pytest
+from quantum_mixer_backend.usecases.state_store import StateStore, MemoryStateStore, SQLiteStateStore, create_state_store
+from quantum_mixer_backend.usecases.usecase import Usecase
+from quantum_mixer_backend.usecases.usecase_data import UsecaseData, UsecasePreferences, UsecaseBitMappingItem, UsecaseMeasurementRange
+
+
+def create_usecase(store, name='Mint'):
+    data = UsecaseData(id='test', name='Test', description='', numQubits=1, loginRequired=False, hasOrder=False, externalLinks=[])
+    preferences = UsecasePreferences(
+        bitMapping=[UsecaseBitMappingItem(bits='0', name=name), UsecaseBitMappingItem(bits='1', name='Lime')],
+        numMeasurements=UsecaseMeasurementRange(min=1, max=10, default=5)
+    )
+    return Usecase(data, preferences, store)
+
+
+def test_memory_store_notifies_listeners():
+    store = MemoryStateStore()
+    changes = []
+    store.add_listener(lambda key, value: changes.append((key, value)))
+    store.set('a', {'b': 1})
+    assert store.get('a') == {'b': 1}
+    assert store.get('missing', 2) == 2
+    assert changes == [('a', {'b': 1})]
+
+
+def test_sqlite_stores_share_state(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    first, second = SQLiteStateStore(path), create_state_store('sqlite', path)
+    changes = []
+    second.add_listener(lambda key, value: changes.append((key, value)))
+
+    first.set('token', {'access_token': 'x'})
+    assert second.get('token') == {'access_token': 'x'}
+    assert changes == [('token', {'access_token': 'x'})]
+
+    # unchanged values are not notified again
+    second.refresh()
+    assert len(changes) == 1
+    first.set('token', None)
+    assert second.get('token') is None
+
+
+def test_usecase_preferences_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    first = create_usecase(SQLiteStateStore(path))
+    # the stored preferences win over the ones of the file
+    second = create_usecase(SQLiteStateStore(path), name='Basil')
+    assert second.get_bit_mapping_item('0').name == 'Mint'
+
+    preferences = first.preferences.copy(deep=True)
+    preferences.bitMapping[0].name = 'Basil'
+    first.set_preferences(preferences)
+    assert second.preferences.bitMapping[0].name == 'Basil'
+    assert second.get_bit_mapping_item('0').name == 'Basil'
+
+
+def test_stores_set_defaults_and_delete(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    for first, second in [(MemoryStateStore(),) * 2, (SQLiteStateStore(path), SQLiteStateStore(path))]:
+        assert first.setdefault('orders:key', 'a') == 'a'
+        assert second.setdefault('orders:key', 'b') == 'a'
+        assert second.keys('orders:') == ['orders:key']
+        first.delete('orders:key')
+        assert second.get('orders:key') is None and second.keys('orders:') == []
+        first.set('orders:key', 'c')
+        assert second.get('orders:key') == 'c'
+
+
+def test_state_store_is_abstract():
+    with pytest.raises(TypeError):
+        StateStore()
@@ -0,0 +1,37 @@
+import random
+import numpy as np
+import pytest
+from qiskit import execute
+from qiskit_aer import StatevectorSimulator
+from quantum_mixer_backend.quantum import parse_circuit_data
+from quantum_mixer_backend.quantum.circuit_data import CircuitData, OperationData
+from quantum_mixer_backend.quantum.statevector_engine import simulate_statevector
+
+# (type, number of controls, number of targets, number of parameters) supported by the parser
+GATES = [
+    ('h', 0, 1, 0), ('x', 0, 1, 0), ('z', 0, 1, 0), ('ry', 0, 1, 1), ('i', 0, 1, 0), ('swap', 0, 2, 0),
+    ('h', 1, 1, 0), ('x', 1, 1, 0), ('z', 1, 1, 0), ('ry', 1, 1, 1), ('swap', 1, 2, 0),
+    ('x', 2, 1, 0), ('z', 2, 1, 0)
+]
+
+def random_circuit_data(rng: random.Random, num_qubits: int, num_operations: int) -> CircuitData:
+    operations = []
+    for i in range(num_operations):
+        gate_type, num_controls, num_targets, num_params = rng.choice([g for g in GATES if g[1] + g[2] <= num_qubits])
+        qubits = rng.sample(range(num_qubits), num_controls + num_targets)
+        operations.append(OperationData(
+            id=str(i),
+            type=gate_type,
+            targetQubits=qubits[num_controls:],
+            controlQubits=qubits[:num_controls],
+            parameterValues=['{}*pi'.format(rng.uniform(-2, 2)) for _ in range(num_params)]
+        ))
+    return CircuitData(numQubits=num_qubits, operations=operations)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_statevector_engine_matches_aer(seed):
+    rng = random.Random(seed)
+    qc = parse_circuit_data(random_circuit_data(rng, rng.randint(1, 5), rng.randint(0, 20)))
+    expected = execute(qc, StatevectorSimulator()).result().get_statevector(qc)
+    assert np.allclose(simulate_statevector(qc), np.asarray(expected))
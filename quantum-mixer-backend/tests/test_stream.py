@@ -0,0 +1,75 @@
+import asyncio
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from quantum_mixer_backend.quantum import build
+from quantum_mixer_backend.quantum.settings import settings
+
+CIRCUIT = {'numQubits': 1, 'operations': [
+    {'id': 'x', 'type': 'x', 'targetQubits': [0], 'controlQubits': [], 'parameterValues': []}
+]}
+
+def parse_events(text: str) -> list[tuple[str, dict]]:
+    """
+    Server-sent events as (event, data) pairs.
+    """
+    events = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+def test_shots_are_streamed_in_chunks(monkeypatch):
+    monkeypatch.setattr(settings, 'stream_max_chunk_size', 4)
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        response = client.post('/api/quantum/measurements/stream', json=CIRCUIT, params={'shots': 10, 'chunk_size': 3})
+        assert response.headers['content-type'].startswith('text/event-stream')
+        events = parse_events(response.text)
+        assert [len(data['results']) for _, data in events[:-1]] == [3, 3, 3, 1]
+        assert [data['shots'] for _, data in events[:-1]] == [3, 6, 9, 10]
+        assert all(data['results'] == ['1'] * len(data['results']) for _, data in events[:-1])
+        assert events[-1] == ('end', {'shots': 10})
+
+        # chunks are limited to stream_max_chunk_size
+        events = parse_events(client.post('/api/quantum/measurements/stream', json=CIRCUIT, params={'shots': 10, 'chunk_size': 10 ** 9}).text)
+        assert [len(data['results']) for _, data in events[:-1]] == [4, 4, 2]
+
+
+def test_stream_stops_on_disconnect():
+    app = FastAPI()
+    build(app, '/api/quantum')
+
+    async def main():
+        # the test client only returns complete responses, so the endless stream is run on the ASGI interface
+        chunks = []
+        disconnected = asyncio.Event()
+        body = [{'type': 'http.request', 'body': json.dumps(CIRCUIT).encode(), 'more_body': False}]
+
+        async def receive():
+            if len(body) > 0:
+                return body.pop()
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message.get('body'):
+                chunks.append(message['body'])
+                if len(chunks) == 3:
+                    disconnected.set()
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+            'path': '/api/quantum/measurements/stream', 'raw_path': b'/api/quantum/measurements/stream',
+            'query_string': b'shots=0&chunk_size=5', 'root_path': '', 'server': ('testserver', 80), 'client': ('testclient', 50000),
+            'headers': [(b'content-type', b'application/json')]
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=10)
+        return chunks
+
+    chunks = asyncio.run(main())
+    # the stream ends without an end event once the client is gone
+    assert len(chunks) == 3
+    assert all(chunk.startswith(b'data: ') for chunk in chunks)
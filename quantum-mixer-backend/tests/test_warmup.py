@@ -0,0 +1,57 @@
+import importlib
+import subprocess
+import sys
+from fastapi.testclient import TestClient
+from quantum_mixer_backend import warmup as warmup_module
+from quantum_mixer_backend.quantum import circuit_executor
+from quantum_mixer_backend.quantum.circuit_data import CircuitData
+from quantum_mixer_backend.warmup import Warmup
+
+# the package exports the FastAPI app under the name of its module
+backend_app = importlib.import_module('quantum_mixer_backend.app')
+
+CIRCUIT = CircuitData.parse_obj({'numQubits': 1, 'operations': [
+    {'id': 'h', 'type': 'h', 'targetQubits': [0], 'controlQubits': [], 'parameterValues': []}
+]})
+
+def test_ready_after_warmup(monkeypatch):
+    # the app is not started, so its warmup does not run in the background
+    monkeypatch.setattr(backend_app, 'warmup', Warmup([CIRCUIT]))
+    client = TestClient(backend_app.app)
+    response = client.get('/api/ready')
+    assert response.status_code == 503 and response.json()['ready'] is False
+
+    backend_app.warmup.run()
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.json()['ready'] is True and response.json()['error'] is None
+
+
+def test_failed_warmup_is_not_ready(monkeypatch):
+    def fail(circuit_datas):
+        raise RuntimeError('no backend')
+    monkeypatch.setattr(warmup_module, 'create_executors', fail)
+    monkeypatch.setattr(backend_app, 'warmup', Warmup([CIRCUIT]))
+    backend_app.warmup.run()
+    response = TestClient(backend_app.app).get('/api/ready')
+    assert response.status_code == 503
+    assert response.json()['ready'] is False and response.json()['error'] == 'no backend'
+
+
+def test_disabled_warmup_is_ready():
+    assert Warmup([CIRCUIT], enabled=False).status()['ready'] is True
+
+
+def test_backends_are_created_on_first_use(monkeypatch):
+    # importing the app does not load Aer or the fake device
+    loaded = subprocess.run(
+        [sys.executable, '-c', 'import sys, quantum_mixer_backend.app; print("qiskit_aer" in sys.modules, "qiskit.test.mock" in sys.modules)'],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert loaded == ['False', 'False']
+
+    monkeypatch.setattr(circuit_executor, '_backends', {})
+    calls = []
+    monkeypatch.setattr(circuit_executor, '_create_backend_qasm', lambda: calls.append(1) or object())
+    backend = circuit_executor.get_backend_qasm()
+    assert circuit_executor.get_backend_qasm() is backend and len(calls) == 1
@@ -0,0 +1,111 @@
+import struct
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from quantum_mixer_backend.quantum import build
+from quantum_mixer_backend.quantum.wire_format import BINARY_MEDIA_TYPE, NO_STRING, encode_measurements
+
+CIRCUIT = {'numQubits': 2, 'operations': [
+    {'id': 'h', 'type': 'h', 'targetQubits': [0], 'controlQubits': [], 'parameterValues': []},
+    {'id': 'ry', 'type': 'ry', 'targetQubits': [1], 'controlQubits': [], 'parameterValues': ['pi/3']}
+]}
+
+
+class Reader:
+    """
+    Decoder of the binary encoding, as documented in wire_format.py.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def read(self, fmt: str) -> tuple:
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def bytes(self, length: int) -> bytes:
+        value = self.data[self.offset:self.offset + length]
+        self.offset += length
+        return value
+
+    def string(self):
+        length, = self.read('<I')
+        return None if length == NO_STRING else self.bytes(length).decode('utf-8')
+
+    def array(self, dtype: str, count: int) -> np.ndarray:
+        return np.frombuffer(self.bytes(count * np.dtype(dtype).itemsize), dtype=dtype)
+
+    def probabilities(self) -> dict:
+        assert self.bytes(4) == b'QMP1'
+        num_qubits, num_devices = self.read('<BB')
+        results = {}
+        for _ in range(num_devices):
+            device = self.string()
+            results[device] = self.array('<f4', 2 ** num_qubits)
+        num_missing, = self.read('<B')
+        missing = [self.string() for _ in range(num_missing)]
+        return {'numQubits': num_qubits, 'results': results, 'missing': missing, 'circuit': self.string(), 'qasm': self.string()}
+
+    def batch(self) -> list[bytes]:
+        assert self.bytes(4) == b'QMB1'
+        num_items, = self.read('<I')
+        items = []
+        for _ in range(num_items):
+            length, = self.read('<I')
+            items.append(self.bytes(length))
+        return items
+
+
+def assert_same(decoded: dict, expected: dict):
+    assert decoded['numQubits'] == len(expected['bits'][0])
+    assert list(decoded['results']) == list(expected['results'])
+    for device, probabilities in expected['results'].items():
+        assert decoded['results'][device] == pytest.approx(probabilities, abs=1e-7)
+    assert decoded['missing'] == expected['missing']
+    assert decoded['circuit'] == expected.get('circuit') and decoded['qasm'] == expected.get('qasm')
+
+
+@pytest.fixture(scope='module')
+def client():
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        yield client
+
+
+def test_probabilities_match_json(client):
+    params = {'devices': 'analytical'}
+    expected = client.post('/api/quantum/probabilities', json=CIRCUIT, params=params).json()
+    response = client.post('/api/quantum/probabilities', json=CIRCUIT, params=params, headers={'accept': BINARY_MEDIA_TYPE})
+    assert response.headers['content-type'] == BINARY_MEDIA_TYPE
+    reader = Reader(response.content)
+    assert_same(reader.probabilities(), expected)
+    assert reader.offset == len(response.content)
+
+
+def test_batch_framing(client):
+    circuits = [CIRCUIT, {'numQubits': 1, 'operations': []}]
+    params = {'devices': 'analytical', 'include': ''}
+    expected = client.post('/api/quantum/probabilities/batch', json=circuits, params=params).json()
+    response = client.post('/api/quantum/probabilities/batch', json=circuits, params=params, headers={'accept': BINARY_MEDIA_TYPE})
+    items = Reader(response.content).batch()
+    assert len(items) == len(expected)
+    for item, expected_item in zip(items, expected):
+        assert_same(Reader(item).probabilities(), expected_item)
+
+
+def test_measurements_layout():
+    reader = Reader(encode_measurements(np.array([3, 0, 3]), 2, 'qasm'))
+    assert reader.bytes(4) == b'QMM1'
+    assert reader.read('<BI') == (2, 3)
+    assert reader.string() == 'qasm'
+    assert reader.read('<B') == (0,)
+    assert reader.array('<u4', 3).tolist() == [3, 0, 3]
+
+    reader = Reader(encode_measurements(np.array([3, 0, 3]), 2, 'qasm', aggregate=True))
+    reader.bytes(4), reader.read('<BI'), reader.string()
+    assert reader.read('<B') == (1,)
+    assert reader.array('<u4', 4).tolist() == [1, 0, 0, 2]
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from quantum_mixer_backend.quantum import build
+from quantum_mixer_backend.quantum.settings import settings
+from quantum_mixer_backend.quantum.worker_pool import WorkerPool, WorkerTimeoutError
+
+
+def test_crashed_process_pool_is_replaced():
+    async def main():
+        pool = WorkerPool(kind='process', size=1, queue_depth=1, timeout=30)
+        try:
+            with pytest.raises(HTTPException) as e:
+                await pool.run(os._exit, 1)
+            assert e.value.status_code == 503
+            assert await pool.run(abs, -3) == 3
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_full_pool_rejects_jobs():
+    async def main():
+        pool = WorkerPool(kind='thread', size=1, queue_depth=1, timeout=30)
+        release = threading.Event()
+        # one running and one queued job fill the pool
+        jobs = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as e:
+            await pool.run(abs, -1)
+        assert e.value.status_code == 503 and e.value.headers['Retry-After'] == '1'
+        assert pool.pending == 2
+        release.set()
+        assert await asyncio.gather(*jobs) == [True, True]
+        assert pool.pending == 0 and await pool.run(abs, -1) == 1
+        pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_local_jobs_run_in_this_process_within_the_limits():
+    async def main():
+        pool = WorkerPool(kind='process', size=1, queue_depth=0, timeout=30)
+        release = threading.Event()
+        try:
+            # threading.Event can not be sent to another process
+            job = asyncio.ensure_future(pool.run(release.wait, local=True))
+            await asyncio.sleep(0)
+            with pytest.raises(HTTPException) as e:
+                await pool.run(abs, -1)
+            assert e.value.status_code == 503
+            release.set()
+            assert await job is True
+            assert await pool.run(os.getpid, local=True) == os.getpid()
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_slow_jobs_time_out_and_keep_their_slot():
+    async def main():
+        pool = WorkerPool(kind='thread', size=1, queue_depth=0, timeout=30)
+        release = threading.Event()
+        with pytest.raises(WorkerTimeoutError) as e:
+            await pool.run(release.wait, timeout=0.01)
+        assert e.value.status_code == 504
+        # the job still runs, so the worker is not free yet
+        assert pool.pending == 1
+        release.set()
+        await asyncio.sleep(0.05)
+        assert pool.pending == 0
+        pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_timed_out_devices_are_reported_missing(monkeypatch):
+    monkeypatch.setattr(settings, 'stage_timeout', 1e-6)
+    app = FastAPI()
+    build(app, '/api/quantum')
+    with TestClient(app) as client:
+        # large enough not to finish before the timeout
+        circuit = {'numQubits': 16, 'operations': [
+            {'id': str(i), 'type': 'h', 'targetQubits': [i], 'controlQubits': [], 'parameterValues': []} for i in range(16)
+        ]}
+        response = client.post('/api/quantum/probabilities', json=circuit, params={'devices': 'analytical', 'include': '', 'mode': 'top', 'k': 1})
+        assert response.status_code == 200
+        assert response.json()['results'] == {} and response.json()['missing'] == ['analytical']
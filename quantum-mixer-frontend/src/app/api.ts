@@ -37,3 +37,12 @@ export interface UsecasePreferences {
 export interface OrderData {
   items: string[]
 }
+
+export interface OrderStatus {
+  id: string,
+  items: string[],
+  status: 'queued' | 'dispatching' | 'retrying' | 'completed' | 'failed',
+  attempts: number,
+  error?: string,
+  idempotencyKey?: string
+}
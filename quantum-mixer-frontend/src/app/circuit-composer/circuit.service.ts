@@ -3,16 +3,19 @@ import { Circuit } from './model/circuit';
 import { ComposerSlotViewData, ComposerViewData } from './model/composer';
 import { ReplaySubject } from 'rxjs';
 import { API_BASE_URL } from '../api';
+import { randomId } from '../common/utils';
 
 export enum DeviceType {
   ANALYTICAL = 'analytical',
   MOCK       = 'mock',
+  MOCK_EXACT = 'mock_exact',
   QASM       = 'qasm'
 }
 
 export interface ProbabilitiesResponse {
   bits: string[],
-  results: {[key in DeviceType]: number[]},
+  results: {[key in DeviceType]?: number[]},
+  missing?: DeviceType[],
   circuit: string,
   qasm: string
 }
@@ -20,7 +23,8 @@ export interface ProbabilitiesResponse {
 export interface MeasurementResponse {
   shots: number,
   device: DeviceType,
-  results: string[]
+  results?: string[],
+  counts?: {[bits: string]: number}
 }
 
 @Injectable({
@@ -33,6 +37,10 @@ export class CircuitService {
   public viewData: ComposerViewData | undefined;
   public probabilities: ReplaySubject<ProbabilitiesResponse> = new ReplaySubject();
 
+  // identifies this editor, the server cancels its requests superseded by a newer one
+  private readonly editorSession: string = randomId();
+  private probabilitiesRequest: AbortController | undefined;
+
   constructor() {
     this.circuit.change.subscribe(_ => {
       this.buildViewData();
@@ -80,17 +88,28 @@ export class CircuitService {
 
 
   private async fetchProbabilities(): Promise<void> {
+    // probabilities of the previous circuit are not needed anymore
+    this.probabilitiesRequest?.abort();
+    const request = this.probabilitiesRequest = new AbortController();
     fetch(`${API_BASE_URL}/api/quantum/probabilities`, {
       method: 'POST',
       headers: {
-        'Content-Type': 'application/json'
+        'Content-Type': 'application/json',
+        'X-Editor-Session': this.editorSession
       },
-      body: JSON.stringify(this.circuit.export())
+      body: JSON.stringify(this.circuit.export()),
+      signal: request.signal
     }).then(async res => {
+      // superseded by a newer request
+      if (res.status === 409) {
+        return;
+      }
       const data = await res.json();
       this.probabilities.next(<any>data);
     }, error => {
-      console.error(`Error fetching probabilities from server`, error);
+      if (error.name !== 'AbortError') {
+        console.error(`Error fetching probabilities from server`, error);
+      }
     });
 
   }
@@ -9,3 +9,13 @@ export function cssRelValue(value?: number): string {
   }
   return `calc(${value} * var(--qo-qubit-height))`;
 }
+
+/**
+ * Random hexadecimal id. crypto.randomUUID only exists in secure contexts (HTTPS or localhost),
+ * crypto.getRandomValues also works on plain HTTP (e.g. a kiosk in the local network).
+ * @returns
+ */
+export function randomId(): string {
+  const bytes = crypto.getRandomValues(new Uint8Array(16));
+  return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+}
@@ -2,6 +2,10 @@ import { Component, OnDestroy, OnInit } from '@angular/core';
 import { UsecaseService } from '../../usecase/usecase.service';
 import { CircuitService, DeviceType } from '../../circuit-composer/circuit.service';
 import { Unsubscribable } from 'rxjs';
+import { randomId } from '../../common/utils';
+
+// interval of polling the status of a queued order until it is completed or failed
+const ORDER_POLL_INTERVAL = 1000;
 
 @Component({
   selector: 'app-measurement',
@@ -12,6 +16,8 @@ export class MeasurementComponent implements OnInit, OnDestroy {
 
   public status: 'ready' | 'loading' | 'measured' | 'ordered' | 'error' = 'ready';
   public data: {bit: string, icon?: string, display: string}[] = [];
+  // one key per measurement, so ordering its result again does not place a second order
+  private orderKey: string = '';
 
   public numMeasurementsDefault: number = 1;
   public numMeasurementsMin: number = 1;
@@ -20,6 +26,8 @@ export class MeasurementComponent implements OnInit, OnDestroy {
 
   public error: string | null = null;
   private _sub: Unsubscribable | null = null;
+  // stops polling of the order status
+  private _destroyed: boolean = false;
 
   public device: DeviceType = DeviceType.QASM;
 
@@ -37,6 +45,7 @@ export class MeasurementComponent implements OnInit, OnDestroy {
   }
 
   ngOnDestroy(): void {
+    this._destroyed = true;
     if(this._sub) {
       this._sub.unsubscribe();
     }
@@ -53,10 +62,11 @@ export class MeasurementComponent implements OnInit, OnDestroy {
       return;
     }
     this.data = [];
+    this.orderKey = randomId();
     this.status = 'loading';
     try {
       const data = await this.circuitService.measure(this.numMeasurements, this.device);
-      data.results.map((result, i) => {
+      (data.results || []).map((result, i) => {
         const bitMapping = this.usecaseService.getBitMapping(result);
         this.data.push({
           bit: result,
@@ -78,8 +88,24 @@ export class MeasurementComponent implements OnInit, OnDestroy {
   async order() {
     this.status = 'loading';
     const data = this.data.map(d => d.bit);
-    await this.usecaseService.order(data);
-    this.status = 'ordered';
+    try {
+      // orders are queued, wait until the coffee machine accepted or rejected it
+      let order = await this.usecaseService.order(data, this.orderKey);
+      while(order && order.status != 'completed' && order.status != 'failed') {
+        await new Promise(resolve => setTimeout(resolve, ORDER_POLL_INTERVAL));
+        if(this._destroyed) {
+          return;
+        }
+        order = await this.usecaseService.getOrder(order.id);
+      }
+      if(order && order.status == 'failed') {
+        throw order.error || 'Order failed';
+      }
+      this.status = 'ordered';
+    } catch (error) {
+      this.status = 'error';
+      this.error = error as any;
+    }
   }
 
   reset() {
@@ -9,12 +9,14 @@ import { CircuitService, DeviceType, ProbabilitiesResponse } from '../../circuit
 const DeviceNames: {[key in DeviceType]: string} = {
   [DeviceType.ANALYTICAL]: 'Theory',
   [DeviceType.MOCK]: 'Real Device',
+  [DeviceType.MOCK_EXACT]: 'Real Device (exact)',
   [DeviceType.QASM]: 'Simulator'
 }
 
 const DeviceColors: {[key in DeviceType]: string} = {
   [DeviceType.ANALYTICAL]: '#3498db',
   [DeviceType.MOCK]: '#8e44ad',
+  [DeviceType.MOCK_EXACT]: '#c0392b',
   [DeviceType.QASM]: '#2ecc71',
 }
 
@@ -49,7 +51,7 @@ export class ProbabilitiesChartComponent implements OnInit, OnDestroy  {
       this.data = {
         labels: res.bits,
         datasets: Object.keys(res.results).map((key, i) => {
-          const data = res.results[<DeviceType>key];
+          const data = res.results[<DeviceType>key] || [];
           return {
             label: DeviceNames[<DeviceType>key],
             data: data,
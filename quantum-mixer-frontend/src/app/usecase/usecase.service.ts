@@ -1,6 +1,6 @@
 import { Injectable } from '@angular/core';
 import { CircuitData } from '../circuit-composer/model/circuit';
-import { API_BASE_URL, OrderData, UsecaseBitMappingItem, UsecaseData, UsecasePreferences } from '../api';
+import { API_BASE_URL, OrderData, OrderStatus, UsecaseBitMappingItem, UsecaseData, UsecasePreferences } from '../api';
 import { ReplaySubject } from 'rxjs';
 
 @Injectable({
@@ -20,17 +20,23 @@ export class UsecaseService {
     this.loadUsecases();
   }
 
-  private async fetch<R, T>(path: string, method: 'GET'|'POST' = 'GET', data: T | null = null): Promise<R> {
+  private async fetch<R, T>(path: string, method: 'GET'|'POST' = 'GET', data: T | null = null, headers: {[key: string]: string} = {}): Promise<R> {
     return new Promise((resolve, reject) => {
       fetch(`${API_BASE_URL}${path}`, {
         method: method,
         headers: {
-          'Content-Type': 'application/json'
+          'Content-Type': 'application/json',
+          ...headers
         },
         body: data ? JSON.stringify(data) : undefined
       }).then(async res => {
-        const data: R = await res.json();
-        resolve(data);
+        const data = await res.json();
+        // error responses (e.g. 400 / 422 of an order) carry a detail message instead of data
+        if(!res.ok) {
+          reject(data && data.detail ? data.detail : res.statusText);
+          return;
+        }
+        resolve(data as R);
       }, error => {
         reject(error);
       })
@@ -72,15 +78,27 @@ export class UsecaseService {
     }
   }
 
-  public async order(data: string[]): Promise<boolean> {
+  /**
+   * Queue an order. Orders with the same idempotency key (e.g. of a double click) are only placed once.
+   */
+  public async order(data: string[], idempotencyKey: string): Promise<OrderStatus | null> {
     if(!this._usecase) {
-      return false;
+      return null;
     }
-    return this.fetch<boolean, OrderData>(`/api/usecase/${this._usecase.id}/order`, 'POST', {
+    return this.fetch<OrderStatus, OrderData>(`/api/usecase/${this._usecase.id}/order`, 'POST', {
       items: data
+    }, {
+      'Idempotency-Key': idempotencyKey
     });
   }
 
+  public async getOrder(id: string): Promise<OrderStatus | null> {
+    if(!this._usecase) {
+      return null;
+    }
+    return this.fetch<OrderStatus, null>(`/api/usecase/${this._usecase.id}/order/${id}`);
+  }
+
   public async setPreferences(pref: UsecasePreferences) {
     if(!this._usecase) {
       return;